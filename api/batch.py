@@ -0,0 +1,120 @@
+"""
+Ejecución de las sub-peticiones de ``/api/batch/``.
+
+Cada sub-petición se construye como una ``WSGIRequest`` y se despacha
+directamente a la vista resuelta, con el usuario ya autenticado por la
+petición batch (el token JWT se verifica una sola vez).
+"""
+
+import json
+import logging
+import threading
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import connections
+from django.http import Http404
+from django.urls import Resolver404, resolve
+from rest_framework.response import Response
+
+from config import metrics
+from config.db_routers import request_routing
+from config.middleware import rewrap_connections
+
+
+logger = logging.getLogger(__name__)
+_merge_lock = threading.Lock()
+
+# Cabeceras de la petición batch que se copian a cada sub-petición.
+INHERITED_META = (
+    'SERVER_NAME', 'SERVER_PORT', 'SCRIPT_NAME', 'REMOTE_ADDR', 'wsgi.url_scheme',
+    'HTTP_HOST', 'HTTP_USER_AGENT', 'HTTP_ACCEPT_LANGUAGE', 'HTTP_X_FORWARDED_PROTO',
+)
+
+
+def build_sub_request(parent, item):
+    """Construir la ``WSGIRequest`` de una sub-petición."""
+    url = urlsplit(item['path'])
+    body = b''
+    if 'body' in item:
+        body = json.dumps(item['body']).encode()
+    environ = {key: parent.META[key] for key in INHERITED_META if key in parent.META}
+    environ.update({
+        'REQUEST_METHOD': item['method'],
+        'PATH_INFO': url.path,
+        'QUERY_STRING': url.query,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'HTTP_ACCEPT': 'application/json',
+        'wsgi.input': BytesIO(body),
+    })
+    request = WSGIRequest(environ)
+    request.user = parent.user
+    # DRF usa ForcedAuthentication con estos atributos: no se vuelve a
+    # verificar el token ni a cargar el usuario.
+    request._force_auth_user = parent.user
+    request._force_auth_token = parent.auth
+    return request
+
+
+def execute_sub_request(parent, item):
+    """Ejecutar una sub-petición y retornar su estado y cuerpo."""
+    request = build_sub_request(parent, item)
+    result = {'status': 404, 'body': {'detail': 'Not found.'}}
+    if 'id' in item:
+        result['id'] = item['id']
+    try:
+        match = resolve(request.path_info)
+    except Resolver404:
+        return result
+    request.resolver_match = match
+
+    with request_routing(request.method, parent.user.pk):
+        try:
+            response = match.func(request, *match.args, **match.kwargs)
+        except Http404:
+            return result
+        except PermissionDenied:
+            result.update(status=403, body={'detail': 'Permission denied.'})
+            return result
+        except Exception:
+            # Un fallo inesperado solo afecta a su sub-petición, no al batch.
+            logger.exception('Error en la sub-petición %s %s', request.method, request.path_info)
+            result.update(status=500, body={'detail': 'Internal server error.'})
+            return result
+
+    result['status'] = response.status_code
+    if isinstance(response, Response):
+        # Los datos ya serializados: se renderizan una sola vez en la respuesta batch.
+        result['body'] = response.data
+    elif response.get('Content-Type', '').startswith('application/json'):
+        result['body'] = json.loads(response.content or b'null')
+    else:
+        result['body'] = response.content.decode(response.charset or 'utf-8')
+    return result
+
+
+def execute_in_thread(parent, item):
+    """
+    Variante para el pool de hilos: cada hilo abre sus propias conexiones
+    y debe cerrarlas al terminar.
+
+    Se ejecuta con una copia del contexto de la petición batch
+    (``contextvars.copy_context().run``), así que las consultas cuentan en
+    sus métricas y en el muestreo de consultas lentas. Cada hilo acumula en
+    sus propias estadísticas y las suma a las del batch al terminar.
+    """
+    parent_stats = metrics.current_request_stats.get()
+    stats = metrics.RequestStats()
+    if parent_stats is not None:
+        metrics.current_request_stats.set(stats)
+    try:
+        with rewrap_connections():
+            return execute_sub_request(parent, item)
+    finally:
+        connections.close_all()
+        if parent_stats is not None:
+            with _merge_lock:
+                parent_stats.merge(stats)
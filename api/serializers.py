@@ -1,9 +1,11 @@
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth.models import User
-from tasks.models import Task
+from tasks import serializers as tasks_serializers
+from tasks.serializers import MeasuredSerializerMixin
 
 
-class UserSimpleSerializer(serializers.ModelSerializer):
+class UserSimpleSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     """Serializador simple de usuario."""
     class Meta:
         model = User
@@ -11,11 +13,29 @@ class UserSimpleSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(tasks_serializers.TaskSerializer):
     """Serializador de tareas con usuario."""
     user = UserSimpleSerializer(read_only=True)
-    
-    class Meta:
-        model = Task
-        fields = ['id', 'user', 'title', 'description', 'status', 'priority', 'due_date', 'created_at', 'updated_at']
-        read_only_fields = ['id', 'user', 'created_at', 'updated_at']
+
+
+class BatchSubRequestSerializer(serializers.Serializer):
+    """Una sub-petición de /api/batch/."""
+    id = serializers.CharField(required=False, max_length=100)
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'], default='GET')
+    path = serializers.RegexField(r'^/api/', max_length=500)
+    body = serializers.JSONField(required=False)
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    """Cuerpo de /api/batch/."""
+    requests = BatchSubRequestSerializer(many=True, allow_empty=False)
+    parallel = serializers.BooleanField(default=False)
+
+    def validate_requests(self, value):
+        limit = settings.BATCH_MAX_REQUESTS
+        if len(value) > limit:
+            raise serializers.ValidationError(f'Máximo {limit} sub-peticiones por batch.')
+        for item in value:
+            if item['path'].split('?')[0].rstrip('/') == '/api/batch':
+                raise serializers.ValidationError('No se permiten batches anidados.')
+        return value
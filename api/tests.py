@@ -1,3 +1,458 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from io import StringIO
+from itertools import count
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import batch
+from api.serializers import TaskSerializer
+from config import metrics
+from config.slow_queries import SNAPSHOT_PREFIX, SlowQuerySampler, normalize_sql, sampler
+from tasks.authentication import MeasuredJWTAuthentication
+from tasks.models import Task
+from tasks.testing import Budget, EndpointBudgetMixin, seed
+
+
+def csv_upload(context):
+    return {'file': SimpleUploadedFile('tareas.csv', b'title,priority\nA,high\nB,low\n', content_type='text/csv')}
+
+
+# Consultas: autenticación (1) + las del endpoint. Latencia: múltiplo de GET /api/users/me/,
+# con ~1.5x de margen sobre lo medido; by_status y by_priority serializan sin
+# paginar cientos de tareas de seed_0.
+API_BUDGETS = [
+    Budget('users-list', 'get', '/api/users/', queries=3, latency=3),
+    Budget('users-retrieve', 'get', '/api/users/{user}/', queries=2, latency=3),
+    Budget('users-me', 'get', '/api/users/me/', queries=1, latency=3),
+    Budget('tasks-list', 'get', '/api/tasks/', queries=3, latency=4),
+    Budget('tasks-list-archived', 'get', '/api/tasks/?include_archived=true', queries=5, latency=5),
+    Budget('tasks-create', 'post', '/api/tasks/', queries=2, latency=3, data={'title': 'Nueva'}, status=201),
+    Budget('tasks-retrieve', 'get', '/api/tasks/{task}/', queries=2, latency=3),
+    Budget('tasks-update', 'put', '/api/tasks/{task}/', queries=3, latency=3, data={'title': 'Editada'}),
+    Budget('tasks-partial-update', 'patch', '/api/tasks/{task}/', queries=3, latency=3, data={'priority': 'low'}),
+    Budget('tasks-by-status', 'get', '/api/tasks/by_status/?status=pending', queries=2, latency=12),
+    Budget('tasks-by-priority', 'get', '/api/tasks/by_priority/?priority=high', queries=2, latency=8),
+    Budget('tasks-mark-completed', 'patch', '/api/tasks/{task}/mark_completed/', queries=3, latency=4),
+    Budget('tasks-reopen', 'patch', '/api/tasks/{task}/reopen/', queries=3, latency=4),
+    Budget('tasks-start', 'patch', '/api/tasks/{task}/start/', queries=3, latency=4),
+    Budget('tasks-transition', 'post', '/api/tasks/transition/', queries=2, latency=3, data={
+        'transition': 'complete', 'priority': 'high',
+    }),
+    Budget('tasks-import', 'post', '/api/tasks/import/', queries=4, data=csv_upload, status=201, format='multipart'),
+    Budget('tasks-destroy', 'delete', '/api/tasks/{doomed}/', queries=3, status=204),
+    Budget('batch', 'post', '/api/batch/', queries=3, latency=5, data={'requests': [
+        {'path': '/api/users/me/'}, {'path': '/api/tasks/'},
+    ]}),
+]
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class APIPerformanceBudgetTests(EndpointBudgetMixin, TestCase):
+    """
+    Presupuestos de consultas y latencia de la app api sobre datos de seed_data.
+    """
+    baseline = Budget('baseline', 'get', '/api/users/me/', queries=1)
+
+    @classmethod
+    def setUpTestData(cls):
+        seed()
+        # seed_0 es uno de los usuarios "ballena" (cientos de tareas).
+        cls.user = User.objects.get(username='seed_0')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+
+    def test_endpoints_within_budget(self):
+        context = {
+            'user': self.user.pk,
+            'task': Task.objects.create(user=self.user, title='Objetivo').pk,
+            'doomed': Task.objects.create(user=self.user, title='A borrar').pk,
+        }
+        self.assertBudgets(API_BUDGETS, self.client, context)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class SharedTaskViewSetTests(TestCase):
+    """
+    Los dos montajes usan el mismo ViewSet base y conservan sus respuestas.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user('shared', password='pass12345')
+        Task.objects.create(user=self.user, title='Compartida', status='pending')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+
+    def test_list_shapes(self):
+        full = self.client.get('/api/tasks/').json()['results'][0]
+        short = self.client.get('/api/tasks-auth/tasks/').json()['results'][0]
+        self.assertEqual(full['user'], {
+            'id': self.user.pk, 'username': 'shared', 'email': '', 'first_name': '', 'last_name': '',
+        })
+        self.assertEqual(set(short), {'id', 'title', 'status', 'priority', 'due_date', 'created_at'})
+
+    def test_filter_errors(self):
+        for path, message in (
+            ('/api/tasks/by_status/', 'status parameter required'),
+            ('/api/tasks-auth/tasks/by_status/', 'Status parameter is required'),
+            ('/api/tasks/by_priority/', 'priority parameter required'),
+            ('/api/tasks-auth/tasks/by_priority/', 'Priority parameter is required'),
+        ):
+            response = self.client.get(path)
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json(), {'error': message})
+        response = self.client.get('/api/tasks-auth/tasks/by_status/?status=pending')
+        self.assertEqual([task['title'] for task in response.json()], ['Compartida'])
+
+
+def series_count(name, route, method='GET'):
+    """Observaciones de una serie de este proceso (todas las de sus hilos)."""
+    values = metrics.registry.snapshot().get((name, (route, method)))
+    return sum(values[:-1]) if values else 0
+
+
+@override_settings(DATABASE_REPLICAS=[], METRICS_TOKEN='', METRICS_ALLOWED_IPS=['127.0.0.1'])
+class MetricsTests(TestCase):
+    """
+    MetricsMiddleware, tiempo de serialización y endpoint ``/metrics``.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user('metrics', password='pass12345')
+        self.task = Task.objects.create(user=self.user, title='Medida')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+
+    def test_middleware_observes_every_histogram_by_route(self):
+        names = [metric.name for metric in (
+            metrics.REQUEST_LATENCY, metrics.REQUEST_DB_TIME,
+            metrics.REQUEST_DB_QUERIES, metrics.REQUEST_SERIALIZATION_TIME,
+        )]
+        before = [series_count(name, 'api:api-task-list') for name in names]
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 200)
+        after = [series_count(name, 'api:api-task-list') for name in names]
+        self.assertEqual([b - a for a, b in zip(before, after)], [1, 1, 1, 1])
+        queries = metrics.registry.snapshot()[('http_request_db_queries', ('api:api-task-list', 'GET'))]
+        self.assertGreater(queries[-1], 0)
+
+    def test_serialization_counts_outermost_to_representation_once(self):
+        stats = metrics.RequestStats()
+        token = metrics.current_request_stats.set(stats)
+        try:
+            # Cada lectura del reloj avanza un segundo: el usuario anidado no suma.
+            with patch('tasks.serializers.time') as clock:
+                clock.perf_counter.side_effect = count()
+                TaskSerializer(self.task).data
+        finally:
+            metrics.current_request_stats.reset(token)
+        self.assertEqual(stats.serialization_time, 1)
+
+    def test_renderer_time_is_added_to_the_request(self):
+        from tasks.renderers import MeasuredJSONRenderer
+
+        stats = metrics.RequestStats()
+        token = metrics.current_request_stats.set(stats)
+        try:
+            with patch('tasks.renderers.time') as clock:
+                clock.perf_counter.side_effect = [10, 10.25]
+                MeasuredJSONRenderer().render({'ok': True})
+        finally:
+            metrics.current_request_stats.reset(token)
+        self.assertEqual(stats.serialization_time, 0.25)
+
+    def test_exposition_format(self):
+        buckets = [0] * (len(metrics.LATENCY_BUCKETS) + 2)
+        buckets[0], buckets[2], buckets[-1] = 1, 2, 0.05
+        text = metrics.render_exposition({('http_request_duration_seconds', ('api:x', 'GET')): buckets})
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        self.assertIn('http_request_duration_seconds_bucket{route="api:x",method="GET",le="0.005"} 1', text)
+        self.assertIn('http_request_duration_seconds_bucket{route="api:x",method="GET",le="0.025"} 3', text)
+        self.assertIn('http_request_duration_seconds_bucket{route="api:x",method="GET",le="+Inf"} 3', text)
+        self.assertIn('http_request_duration_seconds_count{route="api:x",method="GET"} 3', text)
+        self.assertIn('http_request_duration_seconds_sum{route="api:x",method="GET"} 0.05', text)
+        self.assertIn('# HELP jwt_verification_seconds', text)
+
+    def test_metrics_endpoint_access(self):
+        self.client.get('/api/tasks/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'http_request_duration_seconds_count{route="api:api-task-list",method="GET"}', response.content)
+        self.assertEqual(self.client.get('/metrics', REMOTE_ADDR='10.0.0.1').status_code, 403)
+        with self.settings(METRICS_TOKEN='secreto'):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            response = APIClient().get('/metrics', HTTP_AUTHORIZATION='Bearer secreto', REMOTE_ADDR='10.0.0.1')
+            self.assertEqual(response.status_code, 200)
+
+    def test_snapshots_are_merged_and_removed_per_process(self):
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_MULTIPROC_DIR=directory):
+            metrics.write_process_snapshot(directory, 'metrics', [
+                ['http_request_duration_seconds', ['api:otro', 'GET'], [1] + [0] * 11 + [0.001]],
+            ])
+            own = f'metrics-{os.getpid()}.json'
+            os.rename(os.path.join(directory, own), os.path.join(directory, 'metrics-1.json'))
+            for name in ('metrics-2.json', 'slow-queries-1.json', '.metrics-tmp1234', 'README'):
+                open(os.path.join(directory, name), 'w').close()
+            self.assertIn(('http_request_duration_seconds', ('api:otro', 'GET')), metrics.registry.collect())
+
+            metrics.remove_process_snapshots(directory, 1)
+            self.assertEqual(sorted(os.listdir(directory)), ['.metrics-tmp1234', 'README', 'metrics-2.json'])
+            metrics.remove_process_snapshots(directory)
+            self.assertEqual(os.listdir(directory), ['README'])
+
+
+@override_settings(DATABASE_REPLICAS=[], SLOW_QUERY_THRESHOLD_MS=1e-6, SLOW_QUERY_SAMPLE_RATE=1.0)
+class SlowQueryTests(TestCase):
+    """
+    Muestreo de consultas lentas: normalización, buffer, atribución, comando y endpoint.
+    """
+    def setUp(self):
+        sampler.clear()
+        self.addCleanup(sampler.clear)
+        self.user = User.objects.create_user('slow', password='pass12345')
+        self.admin = User.objects.create_user('slow-admin', password='pass12345', is_staff=True)
+        Task.objects.create(user=self.user, title='Lenta', status='pending')
+        self.client = APIClient()
+
+    def authenticate(self, user):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+    def test_normalize_sql_collapses_literals_and_in_lists(self):
+        self.assertEqual(
+            normalize_sql(
+                "SELECT *  FROM t\n WHERE a = 'x''y' AND b IN (1, 2, 3) "
+                "AND c IN (%s,%s) AND d = %s AND e = 1.5 LIMIT 21"
+            ),
+            'SELECT * FROM t WHERE a = ? AND b IN (...) AND c IN (...) AND d = ? AND e = ? LIMIT ?',
+        )
+        self.assertEqual(normalize_sql('SELECT "t"."id" FROM "t" WHERE "t"."id" = ?'),
+                         'SELECT "t"."id" FROM "t" WHERE "t"."id" = ?')
+
+    def test_buffer_keeps_only_the_latest_samples(self):
+        buffer = SlowQuerySampler(maxlen=2)
+        for number in range(3):
+            buffer.record(f'SELECT {number}', 0.5, 1, 'default')
+        self.assertEqual([sample['duration_ms'] for sample in buffer.samples], [500.0, 500.0])
+        self.assertEqual(len(buffer.samples), 2)
+        self.assertEqual({sample['origin'] for sample in buffer.samples}, {'unknown'})
+
+    def test_queries_are_attributed_to_view_and_action(self):
+        self.authenticate(self.user)
+        self.client.get('/api/tasks/by_status/?status=pending')
+        self.client.get('/api/tasks-auth/tasks/')
+        origins = {sample['origin'] for sample in sampler.samples}
+        self.assertIn('api:api-task-by-status#by_status', origins)
+        self.assertIn('tasks:task-list#list', origins)
+        self.assertTrue(all(sample['database'] == 'default' for sample in sampler.samples))
+
+    def test_command_output(self):
+        samples = [
+            {'sql': 'SELECT ?', 'duration_ms': 30.0, 'rows': 3, 'database': 'default',
+             'origin': 'api:api-task-list#list', 'timestamp': 2.0},
+            {'sql': 'SELECT ?', 'duration_ms': 10.0, 'rows': 5, 'database': 'replica',
+             'origin': 'api:api-task-list#list', 'timestamp': 1.0},
+            {'sql': 'UPDATE t', 'duration_ms': 5.0, 'rows': None, 'database': 'default',
+             'origin': 'api:api-task-start#start', 'timestamp': 3.0},
+        ]
+        with tempfile.TemporaryDirectory() as directory, self.settings(METRICS_MULTIPROC_DIR=directory):
+            with open(os.path.join(directory, f'{SNAPSHOT_PREFIX}-1.json'), 'w') as handle:
+                json.dump(samples, handle)
+
+            out = StringIO()
+            call_command('slow_queries', stdout=out)
+            lines = out.getvalue().splitlines()
+            self.assertEqual(lines[0], '      40.0 ms total      2x  max=30.0 ms  rows=5  api:api-task-list#list')
+            self.assertEqual(lines[1], '    SELECT ?')
+            self.assertIn('api:api-task-start#start', lines[2])
+
+            out = StringIO()
+            call_command('slow_queries', '--recent', '--origin', 'api:api-task-list', stdout=out)
+            self.assertEqual(out.getvalue().splitlines()[0],
+                             '      30.0 ms  rows=3  [default] api:api-task-list#list')
+
+            out = StringIO()
+            call_command('slow_queries', '--json', '--limit', '1', stdout=out)
+            self.assertEqual([row['count'] for row in json.loads(out.getvalue())], [2])
+
+            out = StringIO()
+            call_command('slow_queries', '--clear', stdout=out)
+            self.assertIn('1 archivos de muestras eliminados', out.getvalue())
+            out = StringIO()
+            call_command('slow_queries', stdout=out)
+            self.assertEqual(out.getvalue(), 'No hay consultas lentas registradas.\n')
+
+        err = StringIO()
+        with self.settings(METRICS_MULTIPROC_DIR=''):
+            call_command('slow_queries', stderr=err)
+        self.assertIn('METRICS_MULTIPROC_DIR no está configurado', err.getvalue())
+
+    def test_endpoint_is_admin_only(self):
+        self.assertEqual(self.client.get('/api/internal/slow-queries/').status_code, 401)
+        self.authenticate(self.user)
+        self.assertEqual(self.client.get('/api/internal/slow-queries/').status_code, 403)
+        self.client.get('/api/tasks/')
+
+        self.authenticate(self.admin)
+        response = self.client.get('/api/internal/slow-queries/?origin=api:api-task-list&limit=1')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['threshold_ms'], 1e-6)
+        self.assertEqual(len(data['recent']), 1)
+        self.assertEqual(data['summary'][0]['origin'], 'api:api-task-list#list')
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class APIBypassMiddlewareTests(TestCase):
+    """
+    ``/api/`` omite sesión, CSRF y mensajes; ``/admin/`` los sigue aplicando.
+    """
+    def setUp(self):
+        self.admin = User.objects.create_user('bypass', password='pass12345', is_staff=True, is_superuser=True)
+        self.client = Client(enforce_csrf_checks=True)
+
+    def test_api_skips_session_and_csrf(self):
+        response = self.client.post(
+            '/api/tasks-auth/auth/login/', {'username': 'bypass', 'password': 'pass12345'},
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(hasattr(response.wsgi_request, 'session'))
+        self.assertFalse(hasattr(response.wsgi_request, '_messages'))
+        self.assertEqual(dict(response.cookies), {})
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+
+        token = response.json()['access']
+        response = self.client.post(
+            '/api/tasks/', {'title': 'Sin CSRF'}, content_type='application/json',
+            HTTP_AUTHORIZATION=f'Bearer {token}',
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_admin_enforces_csrf_and_session(self):
+        response = self.client.post('/admin/login/', {'username': 'bypass', 'password': 'pass12345'})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(self.client.get('/admin/').status_code, 302)
+
+        response = self.client.get('/admin/login/')
+        self.assertTrue(hasattr(response.wsgi_request, 'session'))
+        self.assertTrue(hasattr(response.wsgi_request, '_messages'))
+        csrf_token = response.cookies['csrftoken'].value
+        response = self.client.post('/admin/login/', {
+            'username': 'bypass', 'password': 'pass12345', 'csrfmiddlewaretoken': csrf_token,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('sessionid', response.cookies)
+        self.assertEqual(self.client.get('/admin/').status_code, 200)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class BatchTests(TestCase):
+    """
+    ``/api/batch/``: validación, autenticación única y errores por sub-petición.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user('batch', password='pass12345')
+        self.task = Task.objects.create(user=self.user, title='En batch')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+
+    def batch(self, *items, **extra):
+        return self.client.post('/api/batch/', {'requests': list(items), **extra}, format='json')
+
+    def test_sub_requests_share_one_authentication(self):
+        with patch('tasks.authentication.MeasuredJWTAuthentication.get_validated_token',
+                   autospec=True, side_effect=MeasuredJWTAuthentication.get_validated_token) as verify:
+            response = self.batch(
+                {'id': 'me', 'path': '/api/users/me/'},
+                {'path': f'/api/tasks/{self.task.pk}/'},
+                {'method': 'PATCH', 'path': f'/api/tasks/{self.task.pk}/mark_completed/'},
+            )
+        self.assertEqual(verify.call_count, 1)
+        responses = response.json()['responses']
+        self.assertEqual([item['status'] for item in responses], [200, 200, 200])
+        self.assertEqual(responses[0]['id'], 'me')
+        self.assertEqual(responses[0]['body']['username'], 'batch')
+        self.assertEqual(responses[2]['body']['status'], 'completed')
+
+    def test_validation(self):
+        response = self.batch({'path': '/api/batch/'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('No se permiten batches anidados.', str(response.json()))
+        self.assertEqual(self.batch({'path': '/admin/'}).status_code, 400)
+        with self.settings(BATCH_MAX_REQUESTS=2):
+            response = self.batch(*[{'path': '/api/tasks/'}] * 3)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Máximo 2 sub-peticiones por batch.', str(response.json()))
+        self.assertEqual(APIClient().post('/api/batch/', {'requests': [{'path': '/api/tasks/'}]},
+                                          format='json').status_code, 401)
+
+    def test_failures_stay_in_their_sub_request(self):
+        with patch('api.views.TaskViewSet.retrieve', side_effect=RuntimeError('boom')):
+            with self.assertLogs('api.batch', 'ERROR'):
+                response = self.batch(
+                    {'path': '/api/no-existe/'},
+                    {'method': 'POST', 'path': '/api/tasks/', 'body': {'priority': 'urgente'}},
+                    {'path': f'/api/tasks/{self.task.pk}/'},
+                    {'method': 'POST', 'path': '/api/tasks/', 'body': {'title': 'Creada'}},
+                )
+        self.assertEqual(response.status_code, 200)
+        responses = response.json()['responses']
+        self.assertEqual([item['status'] for item in responses], [404, 400, 500, 201])
+        self.assertIn('title', responses[1]['body'])
+        self.assertEqual(responses[2]['body'], {'detail': 'Internal server error.'})
+        self.assertTrue(Task.objects.filter(user=self.user, title='Creada').exists())
+
+
+@override_settings(DATABASE_REPLICAS=[], SLOW_QUERY_THRESHOLD_MS=1e-6)
+class ParallelBatchTests(TransactionTestCase):
+    """
+    Batches de solo lectura en hilos (fuera de una transacción, como en producción).
+    """
+    def setUp(self):
+        sampler.clear()
+        self.addCleanup(sampler.clear)
+        self.user = User.objects.create_user('parallel', password='pass12345')
+        for index in range(3):
+            Task.objects.create(user=self.user, title=f'Paralela {index}')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+
+    def run_batch(self, parallel):
+        queries = metrics.registry.snapshot().get(('http_request_db_queries', ('api:batch', 'POST')), [0])[-1]
+        samples = len(sampler.samples)
+        response = self.client.post('/api/batch/', {'parallel': parallel, 'requests': [
+            {'path': '/api/tasks/'}, {'path': '/api/tasks/?priority=medium'}, {'path': '/api/users/me/'},
+        ]}, format='json')
+        self.assertEqual([item['status'] for item in response.json()['responses']], [200, 200, 200])
+        after = metrics.registry.snapshot()[('http_request_db_queries', ('api:batch', 'POST'))][-1]
+        return response, after - queries, len(sampler.samples) - samples
+
+    def test_parallel_reads_are_measured_like_sequential_ones(self):
+        with patch('api.views.execute_in_thread', wraps=batch.execute_in_thread) as in_thread:
+            parallel, parallel_queries, parallel_samples = self.run_batch(True)
+        self.assertEqual(in_thread.call_count, 3)
+        sequential, sequential_queries, sequential_samples = self.run_batch(False)
+
+        self.assertEqual(parallel.json(), sequential.json())
+        self.assertEqual(parallel.json()['responses'][0]['body']['count'], 3)
+        self.assertGreater(sequential_queries, 3)
+        self.assertEqual(parallel_queries, sequential_queries)
+        self.assertEqual(parallel_samples, sequential_samples)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import UserViewSet, TaskViewSet
+from .views import UserViewSet, TaskViewSet, BatchView
 
 # Crear router para los viewsets
 router = DefaultRouter()
@@ -10,5 +10,6 @@ router.register(r'tasks', TaskViewSet, basename='api-task')
 app_name = 'api'
 
 urlpatterns = [
+    path('batch/', BatchView.as_view(), name='batch'),
     path('', include(router.urls)),
 ]
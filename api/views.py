@@ -1,77 +1,59 @@
-from rest_framework import viewsets, status
-from rest_framework.decorators import action
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.contrib.auth.models import User
-from tasks.models import Task
-from .serializers import UserSimpleSerializer, TaskSerializer
+from rest_framework.views import APIView
+from django.conf import settings
+from django.db import connections
+from config.db_routers import SAFE_METHODS
+from tasks.viewsets import BaseTaskViewSet, BaseUserViewSet
+from .batch import execute_in_thread, execute_sub_request
+from .serializers import UserSimpleSerializer, TaskSerializer, BatchRequestSerializer
 
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(BaseUserViewSet):
     """
     ViewSet para ver usuarios.
     Permite ver información de usuarios autenticados.
     """
-    queryset = User.objects.all()
     serializer_class = UserSimpleSerializer
-    permission_classes = [IsAuthenticated]
-    
-    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
-    def me(self, request):
-        """Obtener información del usuario autenticado."""
-        serializer = self.get_serializer(request.user)
-        return Response(serializer.data)
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(BaseTaskViewSet):
     """
     ViewSet para gestionar tareas.
     Permite CRUD completo de tareas del usuario autenticado.
     """
     serializer_class = TaskSerializer
+
+
+class BatchView(APIView):
+    """
+    Ejecutar varias peticiones de la API en una sola llamada.
+    El token se verifica una vez; cada sub-petición retorna su propio estado.
+    Los batches de solo lectura con "parallel": true se ejecutan en hilos.
+    """
     permission_classes = [IsAuthenticated]
-    
-    def get_queryset(self):
-        """Retorna solo las tareas del usuario autenticado."""
-        return Task.objects.filter(user=self.request.user)
-    
-    def perform_create(self, serializer):
-        """Asigna el usuario autenticado como propietario de la tarea."""
-        serializer.save(user=self.request.user)
-    
-    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
-    def by_status(self, request):
-        """Filtrar tareas por estado."""
-        status_filter = request.query_params.get('status')
-        if not status_filter:
-            return Response(
-                {'error': 'status parameter required'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        tasks = self.get_queryset().filter(status=status_filter)
-        serializer = self.get_serializer(tasks, many=True)
-        return Response(serializer.data)
-    
-    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
-    def by_priority(self, request):
-        """Filtrar tareas por prioridad."""
-        priority_filter = request.query_params.get('priority')
-        if not priority_filter:
-            return Response(
-                {'error': 'priority parameter required'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        tasks = self.get_queryset().filter(priority=priority_filter)
-        serializer = self.get_serializer(tasks, many=True)
-        return Response(serializer.data)
-    
-    @action(detail=True, methods=['patch'], permission_classes=[IsAuthenticated])
-    def mark_completed(self, request, pk=None):
-        """Marcar una tarea como completada."""
-        task = self.get_object()
-        task.status = 'completed'
-        task.save()
-        serializer = self.get_serializer(task)
-        return Response(serializer.data)
+
+    def post(self, request):
+        serializer = BatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.validated_data['requests']
+
+        read_only = all(item['method'] in SAFE_METHODS for item in items)
+        # Otros hilos no verían una transacción abierta en este (p. ej. en los tests).
+        in_transaction = any(conn.in_atomic_block for conn in connections.all(initialized_only=True))
+        if serializer.validated_data['parallel'] and read_only and not in_transaction and len(items) > 1:
+            workers = min(settings.BATCH_MAX_WORKERS, len(items))
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                # Una copia del contexto por sub-petición: métricas y muestreo siguen en los hilos.
+                futures = [
+                    pool.submit(contextvars.copy_context().run, execute_in_thread, request, item)
+                    for item in items
+                ]
+                responses = [future.result() for future in futures]
+        else:
+            # Con escrituras el orden importa: se ejecutan una tras otra.
+            responses = [execute_sub_request(request, item) for item in items]
+        return Response({'responses': responses})
@@ -0,0 +1,139 @@
+"""
+Enrutado de lecturas a réplicas de la base de datos.
+
+Solo las peticiones HTTP seguras (GET, HEAD, OPTIONS) leen de las réplicas de
+``DATABASE_REPLICAS``; todo lo demás (escrituras, peticiones que escriben,
+comandos de gestión) usa ``default``. Después de que un usuario escribe, sus
+lecturas quedan fijadas al primario durante ``REPLICA_PIN_SECONDS`` para que
+siempre vea sus propios cambios aunque la réplica vaya con retraso. El
+registro y el login también fijan al usuario: su primera lectura autenticada
+no debe llegar a una réplica que aún no lo tiene.
+
+Cada petición elige una sola réplica, para no mezclar lecturas de réplicas
+con distinto retraso.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+PRIMARY = 'default'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RoutingState:
+    """
+    Estado de enrutado de una petición.
+    """
+    __slots__ = ('use_replica', 'user_id', 'pinned', 'wrote', 'replica')
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.user_id = None
+        self.pinned = None
+        self.wrote = False
+        self.replica = None
+
+
+routing_state = ContextVar('replica_routing_state', default=None)
+
+
+@contextmanager
+def request_routing(method, user_id=None):
+    """
+    Estado de enrutado para una petición HTTP (o una sub-petición de batch).
+
+    Al salir, si la petición escribió, fija al usuario al primario.
+    """
+    state = RoutingState(use_replica=method in SAFE_METHODS)
+    if user_id is not None:
+        state.user_id = str(user_id)
+    token = routing_state.set(state)
+    try:
+        yield state
+    finally:
+        routing_state.reset(token)
+        if state.wrote and state.user_id is not None:
+            pin_to_primary(state.user_id)
+
+
+def replica_aliases():
+    return getattr(settings, 'DATABASE_REPLICAS', ())
+
+
+def _pin_key(user_id):
+    return f'replica-pin:{user_id}'
+
+
+def pin_to_primary(user_id):
+    """Fijar las lecturas del usuario al primario durante un tiempo."""
+    cache.set(_pin_key(user_id), True, getattr(settings, 'REPLICA_PIN_SECONDS', 5))
+
+
+def is_pinned(user_id):
+    return bool(cache.get(_pin_key(user_id)))
+
+
+def set_routing_user(user_id):
+    """
+    Asociar la petición en curso al usuario autenticado.
+
+    La llama la autenticación JWT antes de cargar el usuario, para que esa
+    misma consulta ya respete el pin al primario.
+    """
+    state = routing_state.get()
+    if state is not None:
+        state.user_id = str(user_id)
+
+
+def pin_request_user(user_id):
+    """
+    Fijar al primario al usuario que se registra o inicia sesión.
+
+    Esas peticiones no están autenticadas, así que hasta ahora la petición no
+    sabía a qué usuario fijar.
+    """
+    state = routing_state.get()
+    if state is not None:
+        state.user_id = str(user_id)
+        state.wrote = True
+
+
+class PrimaryReplicaRouter:
+    """
+    Router de Django: escrituras al primario, lecturas seguras a réplicas.
+    """
+    def db_for_read(self, model, **hints):
+        state = routing_state.get()
+        replicas = replica_aliases()
+        if state is None or not replicas or not state.use_replica or state.wrote:
+            return PRIMARY
+        if state.user_id is not None:
+            if state.pinned is None:
+                state.pinned = is_pinned(state.user_id)
+            if state.pinned:
+                return PRIMARY
+        if state.replica is None:
+            state.replica = random.choice(replicas)
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return PRIMARY
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {PRIMARY, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Las réplicas de MySQL se replican desde el primario; migrate solo se
+        # ejecuta contra default salvo que se pida --database explícitamente.
+        return None
@@ -0,0 +1,71 @@
+"""
+Vistas de la documentación OpenAPI.
+
+Importan drf-spectacular: config.urls las carga en su primera petición
+(``LazyView``), no al arrancar.
+"""
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from drf_spectacular.views import SpectacularAPIView
+
+from .schema import schema_cache
+
+
+def accepts_gzip(accept_encoding):
+    """
+    Si ``Accept-Encoding`` admite gzip, respetando los valores ``q``.
+
+    ``gzip;q=0`` lo rechaza; ``*`` vale para gzip si este no aparece.
+    """
+    qualities = {}
+    for item in accept_encoding.split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding] = quality
+    for coding in ('gzip', 'x-gzip', '*'):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    ``SpectacularAPIView`` que sirve el esquema precalculado con ETag y gzip.
+
+    Las peticiones con ``?lang=`` o ``?version=`` usan la generación normal.
+    """
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('lang') or request.GET.get('version'):
+            return super().get(request, *args, **kwargs)
+
+        renderer, media_type = self.perform_content_negotiation(request)
+        rendered = schema_cache.get(renderer.format)
+
+        if rendered.etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            use_gzip = accepts_gzip(request.headers.get('Accept-Encoding', ''))
+            response = HttpResponse(
+                rendered.compressed if use_gzip else rendered.content,
+                content_type=f'{media_type}; charset=utf-8',
+            )
+            if use_gzip:
+                response['Content-Encoding'] = 'gzip'
+            response['Content-Disposition'] = (
+                f'inline; filename="{self._get_filename(request, None)}"'
+            )
+        response['ETag'] = rendered.etag
+        response['Cache-Control'] = 'public, max-age=0, must-revalidate'
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        return response
@@ -0,0 +1,302 @@
+"""
+Métricas de rendimiento en formato de exposición de Prometheus.
+
+Cada hilo acumula sus observaciones en su propio diccionario, de modo que
+registrar una métrica en el camino caliente no toma ningún lock. Al exponer
+``/metrics`` se suman los diccionarios de todos los hilos y, si
+``METRICS_MULTIPROC_DIR`` está configurado, las instantáneas que cada worker
+de gunicorn vuelca periódicamente a ese directorio.
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250)
+HASH_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0)
+
+
+class Histogram:
+    """
+    Histograma acumulativo con etiquetas fijas.
+    """
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        registry.register(self)
+
+    def observe(self, value, *labelvalues):
+        """Registrar una observación en el shard del hilo actual."""
+        shard = registry.shard()
+        series = shard.get((self.name, labelvalues))
+        if series is None:
+            # [conteo por bucket..., conteo +Inf, suma]
+            series = shard[(self.name, labelvalues)] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, *labelvalues):
+        """Medir la duración de un bloque."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labelvalues)
+
+
+class Registry:
+    """
+    Registro de métricas del proceso con un shard por hilo.
+    """
+    def __init__(self):
+        self.metrics = {}
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+
+    def shard(self):
+        """Retornar el diccionario de series del hilo actual."""
+        try:
+            return self._local.series
+        except AttributeError:
+            series = self._local.series = {}
+            # Solo se toma el lock la primera vez que un hilo observa algo.
+            with self._shards_lock:
+                self._shards.append(series)
+            return series
+
+    def snapshot(self):
+        """Sumar los shards de todos los hilos del proceso."""
+        with self._shards_lock:
+            shards = list(self._shards)
+        merged = {}
+        for shard in shards:
+            for key, values in list(shard.items()):
+                _merge_series(merged, key, values)
+        return merged
+
+    def maybe_flush(self):
+        """
+        Volcar la instantánea del proceso a disco si pasó el intervalo.
+        """
+        directory = getattr(settings, 'METRICS_MULTIPROC_DIR', '')
+        if not directory:
+            return
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5.0)
+        if time.monotonic() - self._last_flush < interval:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = time.monotonic()
+            self.flush(directory)
+        finally:
+            self._flush_lock.release()
+
+    def flush(self, directory):
+        """Escribir la instantánea del proceso de forma atómica."""
+        payload = [
+            [name, list(labels), values]
+            for (name, labels), values in self.snapshot().items()
+        ]
+        write_process_snapshot(directory, 'metrics', payload)
+
+    def collect(self):
+        """
+        Combinar las métricas de este proceso con las de los demás workers.
+        """
+        merged = self.snapshot()
+        directory = getattr(settings, 'METRICS_MULTIPROC_DIR', '')
+        for payload in read_process_snapshots(directory, 'metrics', include_own=False):
+            for name, labels, values in payload:
+                _merge_series(merged, (name, tuple(labels)), values)
+        return merged
+
+
+def write_process_snapshot(directory, prefix, payload):
+    """
+    Escribir ``payload`` como JSON en ``<directory>/<prefix>-<pid>.json``.
+
+    La escritura pasa por un archivo temporal y ``os.replace`` para que los
+    lectores nunca vean un archivo a medio escribir.
+    """
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f'.{prefix}-')
+    with os.fdopen(fd, 'w') as handle:
+        json.dump(payload, handle)
+    os.replace(tmp_path, os.path.join(directory, f'{prefix}-{os.getpid()}.json'))
+
+
+def read_process_snapshots(directory, prefix, include_own=True):
+    """Leer las instantáneas ``<prefix>-<pid>.json`` de todos los procesos."""
+    if not directory or not os.path.isdir(directory):
+        return
+    own_file = f'{prefix}-{os.getpid()}.json'
+    for filename in sorted(os.listdir(directory)):
+        if not filename.startswith(f'{prefix}-') or not filename.endswith('.json'):
+            continue
+        if filename == own_file and not include_own:
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as handle:
+                yield json.load(handle)
+        except (OSError, ValueError):
+            continue
+
+
+_SNAPSHOT_RE = re.compile(r'^\.?[a-z-]+-(\w+)(?:\.json)?$')
+
+
+def remove_process_snapshots(directory, pid=None):
+    """
+    Borrar las instantáneas de ``pid``, o las de todos los procesos.
+
+    gunicorn.conf.py lo llama al arrancar el maestro y al terminar cada
+    worker: si no, ``/metrics`` seguiría sumando los workers muertos.
+    """
+    if not directory or not os.path.isdir(directory):
+        return
+    for filename in os.listdir(directory):
+        match = _SNAPSHOT_RE.match(filename)
+        if match is None:
+            continue
+        if pid is not None and (filename.startswith('.') or match.group(1) != str(pid)):
+            continue
+        try:
+            os.remove(os.path.join(directory, filename))
+        except OSError:
+            pass
+
+
+def _merge_series(merged, key, values):
+    current = merged.get(key)
+    if current is None:
+        merged[key] = list(values)
+    else:
+        for index, value in enumerate(values):
+            current[index] += value
+
+
+registry = Registry()
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'Latencia de las peticiones HTTP.',
+    ('route', 'method'),
+)
+REQUEST_DB_TIME = Histogram(
+    'http_request_db_seconds',
+    'Tiempo acumulado en la base de datos por petición.',
+    ('route', 'method'),
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries',
+    'Número de consultas SQL por petición.',
+    ('route', 'method'),
+    buckets=QUERY_COUNT_BUCKETS,
+)
+REQUEST_SERIALIZATION_TIME = Histogram(
+    'http_request_serialization_seconds',
+    'Tiempo de serialización (to_representation) y renderizado de la respuesta.',
+    ('route', 'method'),
+)
+TOKEN_VERIFICATION_TIME = Histogram(
+    'jwt_verification_seconds',
+    'Tiempo de verificación del token JWT.',
+)
+PASSWORD_HASHING_TIME = Histogram(
+    'password_hashing_seconds',
+    'Tiempo de hashing de contraseñas.',
+    ('operation',),
+    buckets=HASH_BUCKETS,
+)
+
+
+class RequestStats:
+    """
+    Acumulador de tiempos de una sola petición.
+    """
+    __slots__ = ('db_time', 'db_queries', 'serialization_time')
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.db_queries = 0
+        self.serialization_time = 0.0
+
+    def merge(self, other):
+        """Sumar las estadísticas de ``other`` (p. ej. las de otro hilo)."""
+        self.db_time += other.db_time
+        self.db_queries += other.db_queries
+        self.serialization_time += other.serialization_time
+
+
+current_request_stats = ContextVar('current_request_stats', default=None)
+# Dentro de un to_representation ya medido (los anidados no se suman dos veces).
+serializing = ContextVar('metrics_serializing', default=False)
+
+
+def render_exposition(series):
+    """Generar el texto en formato de exposición de Prometheus."""
+    by_metric = {}
+    for (name, labels), values in series.items():
+        by_metric.setdefault(name, []).append((labels, values))
+
+    lines = []
+    for name, metric in registry.metrics.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} histogram')
+        for labels, values in sorted(by_metric.get(name, ())):
+            base = [f'{label}="{_escape(value)}"' for label, value in zip(metric.labelnames, labels)]
+            cumulative = 0
+            for bound, count in zip(metric.buckets + ('+Inf',), values[:-1]):
+                cumulative += count
+                le = bound if bound == '+Inf' else repr(float(bound))
+                bucket_labels = ','.join(base + ['le="%s"' % le])
+                lines.append(f'{name}_bucket{{{bucket_labels}}} {cumulative}')
+            label_text = '{%s}' % ','.join(base) if base else ''
+            lines.append(f'{name}_count{label_text} {cumulative}')
+            lines.append(f'{name}_sum{label_text} {values[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def metrics_view(request):
+    """
+    Endpoint interno ``/metrics``.
+
+    Si ``METRICS_TOKEN`` está definido se exige ``Authorization: Bearer
+    <token>``; si no, solo se aceptan las IPs de ``METRICS_ALLOWED_IPS``.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if token:
+        if request.headers.get('Authorization') != f'Bearer {token}':
+            return HttpResponseForbidden()
+    elif request.META.get('REMOTE_ADDR') not in getattr(settings, 'METRICS_ALLOWED_IPS', ()):
+        return HttpResponseForbidden()
+
+    return HttpResponse(
+        render_exposition(registry.collect()),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
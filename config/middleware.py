@@ -0,0 +1,187 @@
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.contrib.messages.middleware import MessageMiddleware
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.middleware.csrf import CsrfViewMiddleware
+
+from . import metrics
+from .db_routers import replica_aliases, request_routing
+from .slow_queries import current_origin, sampler
+
+
+# Fábricas (alias -> execute_wrapper) instaladas por la petición en curso.
+connection_wrappers = ContextVar('connection_wrappers', default=())
+
+
+@contextmanager
+def wrap_connections(factory):
+    """
+    Instalar ``factory(alias)`` como ``execute_wrapper`` en las conexiones de
+    este hilo y recordarla en ``connection_wrappers``.
+    """
+    token = connection_wrappers.set((*connection_wrappers.get(), factory))
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(factory(connection.alias)))
+            yield
+    finally:
+        connection_wrappers.reset(token)
+
+
+@contextmanager
+def rewrap_connections():
+    """
+    En otro hilo que trabaja para la petición (con su contexto copiado):
+    instalar los mismos wrappers en las conexiones de ese hilo, que son otras.
+    """
+    with ExitStack() as stack:
+        for connection in connections.all():
+            for factory in connection_wrappers.get():
+                stack.enter_context(connection.execute_wrapper(factory(connection.alias)))
+        yield
+
+
+class MetricsMiddleware:
+    """
+    Mide latencia, consultas SQL, tiempo de base de datos y de serialización
+    por ruta y método HTTP.
+    """
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        stats = metrics.RequestStats()
+        token = metrics.current_request_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            with wrap_connections(lambda alias: self._db_wrapper):
+                response = self.get_response(request)
+        finally:
+            metrics.current_request_stats.reset(token)
+
+        elapsed = time.perf_counter() - start
+        route = self._route(request)
+        method = request.method
+        metrics.REQUEST_LATENCY.observe(elapsed, route, method)
+        metrics.REQUEST_DB_TIME.observe(stats.db_time, route, method)
+        metrics.REQUEST_DB_QUERIES.observe(stats.db_queries, route, method)
+        metrics.REQUEST_SERIALIZATION_TIME.observe(stats.serialization_time, route, method)
+        metrics.registry.maybe_flush()
+        return response
+
+    @staticmethod
+    def _db_wrapper(execute, sql, params, many, context):
+        # Las estadísticas del contexto: un hilo de /api/batch/ tiene las suyas.
+        stats = metrics.current_request_stats.get()
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if stats is not None:
+                stats.db_time += time.perf_counter() - start
+                stats.db_queries += 1
+
+    @staticmethod
+    def _route(request):
+        """Usar el nombre de la vista para acotar la cardinalidad."""
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return 'unmatched'
+        return match.view_name or match.route
+
+
+class SlowQueryMiddleware:
+    """
+    Instala el muestreador de consultas lentas y anota cada consulta con la
+    vista y la acción de DRF que la originó.
+
+    Con ``SLOW_QUERY_THRESHOLD_MS`` en 0 el middleware se desactiva por
+    completo y no añade ningún coste.
+    """
+    def __init__(self, get_response):
+        threshold_ms = getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 0)
+        if threshold_ms <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = threshold_ms / 1000
+        self.sample_rate = getattr(settings, 'SLOW_QUERY_SAMPLE_RATE', 1.0)
+
+    def __call__(self, request):
+        token = current_origin.set(request.path_info)
+        try:
+            with wrap_connections(lambda alias: sampler.execute_wrapper(self.threshold, self.sample_rate, alias)):
+                response = self.get_response(request)
+        finally:
+            current_origin.reset(token)
+        sampler.maybe_flush()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        origin = request.resolver_match.view_name or request.path_info
+        # Los ViewSets de DRF exponen el mapeo método -> acción en la vista.
+        action = getattr(view_func, 'actions', {}).get(request.method.lower())
+        if action:
+            origin = f'{origin}#{action}'
+        current_origin.set(origin)
+
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Permite leer de réplicas en peticiones seguras y fija al usuario al
+    primario después de que escribe.
+    """
+    def __init__(self, get_response):
+        if not replica_aliases():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with request_routing(request.method):
+            return self.get_response(request)
+
+
+class APIBypassMixin:
+    """
+    Omite el middleware en las rutas de ``LEAN_MIDDLEWARE_PREFIXES``.
+
+    Esas rutas se autentican solo con JWT, así que no necesitan sesión, CSRF,
+    mensajes ni el usuario de sesión. El resto (``/admin/``, Swagger, etc.)
+    pasa por el middleware original de Django sin cambios.
+    """
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.lean_prefixes = tuple(getattr(settings, 'LEAN_MIDDLEWARE_PREFIXES', ()))
+
+    def __call__(self, request):
+        if request.path_info.startswith(self.lean_prefixes):
+            return self.get_response(request)
+        return super().__call__(request)
+
+
+class APIBypassSessionMiddleware(APIBypassMixin, SessionMiddleware):
+    pass
+
+
+class APIBypassCsrfViewMiddleware(APIBypassMixin, CsrfViewMiddleware):
+    def process_view(self, request, callback, callback_args, callback_kwargs):
+        if request.path_info.startswith(self.lean_prefixes):
+            return None
+        return super().process_view(request, callback, callback_args, callback_kwargs)
+
+
+class APIBypassAuthenticationMiddleware(APIBypassMixin, AuthenticationMiddleware):
+    pass
+
+
+class APIBypassMessageMiddleware(APIBypassMixin, MessageMiddleware):
+    pass
@@ -0,0 +1,19 @@
+"""
+Extensiones de drf-spectacular para el esquema OpenAPI.
+
+``DEFAULT_SCHEMA_CLASS`` apunta a ``AutoSchema``, así que este módulo (y con
+él drf-spectacular) se importa solo cuando algo genera el esquema, y las
+extensiones quedan registradas antes de usarse.
+"""
+
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
+from drf_spectacular.openapi import AutoSchema as SpectacularAutoSchema
+
+
+class MeasuredJWTScheme(SimpleJWTScheme):
+    """Documentar la autenticación JWT medida igual que la de SimpleJWT."""
+    target_class = 'tasks.authentication.MeasuredJWTAuthentication'
+
+
+class AutoSchema(SpectacularAutoSchema):
+    """``AutoSchema`` de drf-spectacular con las extensiones de este módulo."""
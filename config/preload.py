@@ -0,0 +1,62 @@
+"""
+Arranque de los workers con ``preload_app`` de gunicorn (gunicorn.conf.py).
+
+El proceso maestro importa la aplicación y hace el trabajo de la primera
+petición que no depende de ella (URLconf, índices de ``reverse()``, ajustes
+de DRF y SimpleJWT). Los workers lo heredan con el fork y comparten esas
+páginas de memoria copy-on-write mientras nadie las escriba.
+
+El recolector de basura sí las escribe: cada recolección toca la cabecera de
+todos los objetos que recorre, y la primera de cada worker copiaría casi toda
+la memoria heredada. Por eso el maestro desactiva el GC mientras carga y
+congela los objetos (``gc.freeze``) justo antes del fork y lo vuelve a
+activar: ni el maestro ni los workers recorren ya lo congelado, y el maestro,
+que vive tanto como el servidor, no se queda sin recolector.
+"""
+
+import gc
+
+from django.db import connections
+from django.urls import get_resolver
+
+
+# Ajustes que se dejan sin resolver: importarlos carga drf-spectacular.
+LAZY_SETTINGS = {'DEFAULT_SCHEMA_CLASS'}
+
+
+def _populate(resolver):
+    """Construir los índices de ``reverse()`` de la URLconf y de cada namespace."""
+    resolver.reverse_dict
+    for _, namespace_resolver in resolver.namespace_dict.values():
+        _populate(namespace_resolver)
+
+
+def warm_up():
+    """
+    Hacer en este proceso lo que, si no, haría la primera petición de cada worker.
+    """
+    from rest_framework.settings import api_settings
+    from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+    _populate(get_resolver())
+    # Los APISettings importan las clases configuradas al leerlas por primera vez.
+    for settings_object in (api_settings, jwt_settings):
+        for name in settings_object.defaults:
+            if name not in LAZY_SETTINGS:
+                getattr(settings_object, name)
+
+
+def before_fork():
+    """
+    En el maestro, antes de crear los workers: sin conexiones y objetos congelados.
+    """
+    # Un socket heredado lo usarían varios procesos a la vez.
+    connections.close_all()
+    gc.freeze()
+    # Lo congelado no se recorre: reactivar el GC no toca las páginas compartidas.
+    gc.enable()
+
+
+def after_fork():
+    """En cada worker nada más crearlo."""
+    gc.enable()
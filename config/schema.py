@@ -0,0 +1,179 @@
+"""
+Esquema OpenAPI precalculado.
+
+Generar el esquema introspecciona todos los ViewSets y serializadores de
+``api`` y ``tasks``, así que se genera una sola vez por versión del código y
+se guarda en memoria y en ``SCHEMA_CACHE_DIR``. Cada formato (YAML y JSON) se
+sirve ya renderizado, comprimido con gzip y con su ETag.
+
+Este módulo no importa drf-spectacular (solo al generar): servir o precargar
+un esquema ya generado no lo necesita. Las vistas de documentación están en
+config.docs y la URLconf las importa en su primera petición (``LazyView``).
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.module_loading import import_string
+
+
+RENDERERS = {
+    'yaml': 'drf_spectacular.renderers.OpenApiYamlRenderer',
+    'json': 'drf_spectacular.renderers.OpenApiJsonRenderer',
+}
+# Módulos cuyo contenido define el esquema.
+SOURCE_PACKAGES = ('api', 'tasks', 'config')
+
+
+@lru_cache(maxsize=None)
+def code_version():
+    """
+    Versión del código que invalida el esquema cacheado.
+
+    Usa ``CODE_VERSION`` (o ``SOURCE_VERSION``, que define Heroku en el build)
+    si existe; si no, un hash del código fuente de las apps del proyecto.
+    """
+    version = getattr(settings, 'CODE_VERSION', '') or os.environ.get('SOURCE_VERSION', '')
+    if version:
+        return version[:16]
+
+    digest = hashlib.sha256()
+    digest.update(repr(sorted(getattr(settings, 'SPECTACULAR_SETTINGS', {}).items())).encode())
+    for package in SOURCE_PACKAGES:
+        root = settings.BASE_DIR / package
+        for path in sorted(root.rglob('*.py')):
+            if 'migrations' in path.parts:
+                continue
+            digest.update(str(path.relative_to(settings.BASE_DIR)).encode())
+            digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+class RenderedSchema:
+    """
+    Un formato del esquema listo para servir.
+    """
+    __slots__ = ('content', 'compressed', 'etag')
+
+    def __init__(self, content):
+        self.content = content
+        self.compressed = gzip.compress(content, compresslevel=9)
+        self.etag = '"%s"' % hashlib.sha256(content).hexdigest()[:32]
+
+
+class SchemaCache:
+    """
+    Caché en memoria y en disco del esquema, indexada por versión del código.
+    """
+    def __init__(self):
+        self._rendered = {}
+        self._lock = threading.Lock()
+
+    def directory(self):
+        return getattr(settings, 'SCHEMA_CACHE_DIR', settings.BASE_DIR / '.schema_cache')
+
+    def path(self, fmt):
+        return os.path.join(self.directory(), f'openapi-{code_version()}.{fmt}')
+
+    def get(self, fmt):
+        """Retornar el esquema renderizado, generándolo solo si no existe."""
+        key = (code_version(), fmt)
+        rendered = self._rendered.get(key)
+        if rendered is not None:
+            return rendered
+        with self._lock:
+            rendered = self._rendered.get(key)
+            if rendered is None:
+                content = self.load(fmt)
+                if content is None:
+                    self.generate()
+                    return self._rendered[key]
+                rendered = self._rendered[key] = RenderedSchema(content)
+        return rendered
+
+    def generate(self):
+        """
+        Generar el esquema y guardar todos los formatos en memoria y disco.
+        """
+        from drf_spectacular.settings import spectacular_settings
+
+        generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+        schema = generator.get_schema(request=None, public=True)
+        version = code_version()
+        for fmt, renderer_path in RENDERERS.items():
+            content = import_string(renderer_path)().render(schema, renderer_context={})
+            self._rendered[(version, fmt)] = RenderedSchema(content)
+            self._store(fmt, content)
+        self._remove_stale(version)
+        return schema
+
+    def load(self, fmt):
+        """Leer de disco el esquema ``fmt`` de esta versión (``None`` si no existe)."""
+        try:
+            with open(self.path(fmt), 'rb') as handle:
+                return handle.read()
+        except OSError:
+            return None
+
+    def _remove_stale(self, version):
+        """Borrar los esquemas de versiones anteriores del código."""
+        directory = self.directory()
+        if not os.path.isdir(directory):
+            return
+        for filename in os.listdir(directory):
+            if filename.startswith('openapi-') and not filename.startswith(f'openapi-{version}.'):
+                try:
+                    os.remove(os.path.join(directory, filename))
+                except OSError:
+                    pass
+
+    def _store(self, fmt, content):
+        path = self.path(fmt)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f'{path}.{os.getpid()}.tmp'
+            with open(tmp_path, 'wb') as handle:
+                handle.write(content)
+            os.replace(tmp_path, path)
+        except OSError:
+            # Sin disco escribible el esquema sigue cacheado en memoria.
+            pass
+
+
+schema_cache = SchemaCache()
+
+
+def warm_schema_cache():
+    """Cargar o generar el esquema antes de atender la primera petición."""
+    for fmt in RENDERERS:
+        schema_cache.get(fmt)
+
+
+class LazyView:
+    """
+    Vista que importa la clase ``path`` (una APIView) en su primera petición.
+
+    Expone ``cls`` e ``initkwargs`` como ``as_view()``, así que los generadores
+    de esquemas la siguen viendo como la vista que envuelve.
+    """
+    csrf_exempt = True
+
+    def __init__(self, path, **initkwargs):
+        self.path = path
+        self.initkwargs = initkwargs
+
+    @cached_property
+    def cls(self):
+        return import_string(self.path)
+
+    @cached_property
+    def view(self):
+        return self.cls.as_view(**self.initkwargs)
+
+    def __call__(self, request, *args, **kwargs):
+        return self.view(request, *args, **kwargs)
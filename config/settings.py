@@ -12,7 +12,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 
 from pathlib import Path
 from datetime import timedelta
-from decouple import config
+from decouple import config, Csv
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,16 +47,23 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'config.middleware.MetricsMiddleware',
+    'config.middleware.SlowQueryMiddleware',
+    'config.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
+    'config.middleware.APIBypassSessionMiddleware',
     'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
+    'config.middleware.APIBypassCsrfViewMiddleware',
+    'config.middleware.APIBypassAuthenticationMiddleware',
+    'config.middleware.APIBypassMessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Rutas autenticadas solo con JWT: omiten sesión, CSRF, mensajes y el
+# AuthenticationMiddleware de sesión (ver config.middleware.APIBypassMixin).
+LEAN_MIDDLEWARE_PREFIXES = ['/api/']
+
 ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
@@ -91,6 +98,65 @@ DATABASES = {
     }
 }
 
+# Réplicas de solo lectura: mismas credenciales que default, otro host.
+for index, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv()), start=1):
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+
+# Shards de tareas: default más un shard por host de DB_SHARD_HOSTS.
+# Después de añadir shards hay que ejecutar rebalance_task_shards.
+for index, host in enumerate(config('DB_SHARD_HOSTS', default='', cast=Csv()), start=1):
+    DATABASES[f'shard_{index}'] = {**DATABASES['default'], 'HOST': host}
+
+TASK_SHARDS = [alias for alias in DATABASES if alias.startswith('shard_')]
+if TASK_SHARDS:
+    TASK_SHARDS.insert(0, 'default')
+# Ids de tareas únicos entre shards: el shard N usa N, N + paso, N + 2 * paso...
+# El paso es el máximo de shards; los hosts nuevos se añaden al final de DB_SHARD_HOSTS.
+TASK_ID_STEP = config('TASK_ID_STEP', default=16, cast=int)
+
+DATABASE_ROUTERS = [
+    'tasks.sharding.TaskShardRouter',
+    'config.db_routers.PrimaryReplicaRouter',
+]
+# Segundos que un usuario lee del primario después de escribir.
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=5, cast=int)
+
+
+# Batch API (/api/batch/)
+BATCH_MAX_REQUESTS = config('BATCH_MAX_REQUESTS', default=20, cast=int)
+# Hilos para ejecutar en paralelo los batches de solo lectura.
+BATCH_MAX_WORKERS = config('BATCH_MAX_WORKERS', default=4, cast=int)
+
+
+# Cache
+# Con varios workers el pin de réplicas necesita una caché compartida
+# (p. ej. CACHE_BACKEND=django.core.cache.backends.redis.RedisCache).
+
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default=''),
+    }
+}
+
+
+# Password hashing
+# El hasher medido usa el mismo algoritmo pbkdf2_sha256 que el de Django.
+
+PASSWORD_HASHERS = [
+    'tasks.hashers.MeasuredPBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -129,6 +195,9 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
+# Archivos generados (p. ej. exportaciones de tareas)
+MEDIA_ROOT = config('MEDIA_ROOT', default=str(BASE_DIR / 'media'))
+
 # WhiteNoise configuration
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
@@ -141,14 +210,18 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # Django REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'tasks.authentication.MeasuredJWTAuthentication',
+    ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'tasks.renderers.MeasuredJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_SCHEMA_CLASS': 'config.openapi.AutoSchema',
 }
 
 
@@ -169,8 +242,17 @@ SIMPLE_JWT = {
     'JTI_IN_BLACKLIST_CLAIM': 'jti',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'AUTH_HEADER_TYPES': ('Bearer',),
+    # Tokens de login con el claim de perfil (ver tasks.claims).
+    'TOKEN_OBTAIN_SERIALIZER': 'tasks.serializers.ProfileTokenObtainPairSerializer',
 }
 
+# GET users/me/ desde el claim de perfil del token, sin consultar la base.
+# En la app tasks responde con task_summary (recuento por estado) en vez de la lista de tareas.
+ME_FROM_TOKEN = config('ME_FROM_TOKEN', default=False, cast=bool)
+# Cuánto recuerda la caché la versión vigente del perfil de cada usuario.
+PROFILE_VERSION_CACHE_SECONDS = config('PROFILE_VERSION_CACHE_SECONDS', default=300, cast=int)
+TASK_SUMMARY_CACHE_SECONDS = config('TASK_SUMMARY_CACHE_SECONDS', default=30, cast=int)
+
 
 # drf-spectacular Configuration
 SPECTACULAR_SETTINGS = {
@@ -179,3 +261,49 @@ SPECTACULAR_SETTINGS = {
     'VERSION': '1.0.0',
     
 }
+
+# Esquema OpenAPI precalculado (config/schema.py)
+SCHEMA_CACHE_DIR = config('SCHEMA_CACHE_DIR', default=str(BASE_DIR / '.schema_cache'))
+# Versión del código; si está vacía se calcula un hash del código fuente.
+CODE_VERSION = config('CODE_VERSION', default='')
+SCHEMA_PRECOMPUTE_ON_STARTUP = config('SCHEMA_PRECOMPUTE_ON_STARTUP', default=not DEBUG, cast=bool)
+
+# Arranque de los workers (config/preload.py, gunicorn.conf.py): URLconf y
+# ajustes de DRF cargados al importar config.wsgi, en el maestro con preload.
+WARM_UP_ON_STARTUP = config('WARM_UP_ON_STARTUP', default=not DEBUG, cast=bool)
+
+
+# Métricas de rendimiento (endpoint /metrics)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+# Directorio compartido por los workers de gunicorn; vacío = solo este proceso.
+METRICS_MULTIPROC_DIR = config('METRICS_MULTIPROC_DIR', default='')
+METRICS_FLUSH_INTERVAL = config('METRICS_FLUSH_INTERVAL', default=5.0, cast=float)
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_ALLOWED_IPS = config('METRICS_ALLOWED_IPS', default='127.0.0.1,::1', cast=Csv())
+
+# Archivado de tareas completadas (python manage.py archive_tasks)
+TASK_ARCHIVE_AFTER_DAYS = config('TASK_ARCHIVE_AFTER_DAYS', default=30, cast=int)
+
+# Recordatorios de due_date (python manage.py run_reminders)
+TASK_REMINDER_SINK = config('TASK_REMINDER_SINK', default='tasks.reminders.LoggingSink')
+# Segundos de antelación del recordatorio respecto a due_date.
+TASK_REMINDER_LEAD_SECONDS = config('TASK_REMINDER_LEAD_SECONDS', default=900, cast=int)
+
+# Cola de trabajos en segundo plano (python manage.py run_jobs)
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=3, cast=int)
+# Segundos que un trabajo reclamado queda bloqueado si su worker deja de renovarlo.
+JOB_VISIBILITY_TIMEOUT = config('JOB_VISIBILITY_TIMEOUT', default=300, cast=int)
+# Espera antes del primer reintento; se duplica en cada intento.
+JOB_RETRY_BACKOFF = config('JOB_RETRY_BACKOFF', default=10, cast=int)
+
+# Idempotency-Key en escrituras de tareas (ver tasks.idempotency)
+# Segundos que se guarda la respuesta para los reintentos.
+IDEMPOTENCY_KEY_TTL = config('IDEMPOTENCY_KEY_TTL', default=86400, cast=int)
+# Segundos tras los que una petición que no terminó deja de bloquear su clave
+# (las importaciones la prolongan tras cada lote mientras siguen en curso).
+IDEMPOTENCY_LOCK_SECONDS = config('IDEMPOTENCY_LOCK_SECONDS', default=60, cast=int)
+
+# Muestreo de consultas lentas (0 = desactivado, sin coste)
+SLOW_QUERY_THRESHOLD_MS = config('SLOW_QUERY_THRESHOLD_MS', default=0, cast=float)
+SLOW_QUERY_SAMPLE_RATE = config('SLOW_QUERY_SAMPLE_RATE', default=1.0, cast=float)
+SLOW_QUERY_BUFFER_SIZE = config('SLOW_QUERY_BUFFER_SIZE', default=500, cast=int)
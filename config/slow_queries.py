@@ -0,0 +1,164 @@
+"""
+Muestreo de consultas SQL lentas con atribución a la vista que las originó.
+
+Las consultas que superan ``SLOW_QUERY_THRESHOLD_MS`` se guardan en un buffer
+circular acotado por proceso. Si ``METRICS_MULTIPROC_DIR`` está configurado,
+cada worker vuelca su buffer a ese directorio para que el comando
+``slow_queries`` y el endpoint de administración vean todos los procesos.
+"""
+
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+
+from django.conf import settings
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .metrics import read_process_snapshots, write_process_snapshot
+
+
+SNAPSHOT_PREFIX = 'slow-queries'
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_RE = re.compile(r'%s|\?')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_sql(sql):
+    """
+    Reemplazar literales y listas ``IN`` para agrupar consultas equivalentes.
+    """
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _PLACEHOLDER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(...)', sql)
+    return _WHITESPACE_RE.sub(' ', sql).strip()
+
+
+current_origin = ContextVar('slow_query_origin', default=None)
+
+
+class SlowQuerySampler:
+    """
+    Buffer circular de consultas lentas del proceso.
+    """
+    def __init__(self, maxlen=500):
+        self.samples = deque(maxlen=maxlen)
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+        self._dirty = False
+
+    def record(self, sql, duration, rows, database):
+        # deque.append es atómico, no hace falta lock.
+        self.samples.append({
+            'sql': normalize_sql(sql),
+            'duration_ms': round(duration * 1000, 3),
+            'rows': rows,
+            'database': database,
+            'origin': current_origin.get() or 'unknown',
+            'timestamp': time.time(),
+        })
+        self._dirty = True
+
+    def execute_wrapper(self, threshold, sample_rate, database):
+        """Crear un ``execute_wrapper`` de Django para una conexión."""
+        def wrapper(execute, sql, params, many, context):
+            start = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                duration = time.perf_counter() - start
+                if duration >= threshold and (sample_rate >= 1 or random.random() < sample_rate):
+                    rowcount = getattr(context.get('cursor'), 'rowcount', -1)
+                    self.record(sql, duration, rowcount if rowcount >= 0 else None, database)
+        return wrapper
+
+    def maybe_flush(self):
+        """Volcar el buffer a disco si cambió y pasó el intervalo."""
+        directory = getattr(settings, 'METRICS_MULTIPROC_DIR', '')
+        if not directory or not self._dirty:
+            return
+        interval = getattr(settings, 'METRICS_FLUSH_INTERVAL', 5.0)
+        if time.monotonic() - self._last_flush < interval:
+            return
+        if not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = time.monotonic()
+            self._dirty = False
+            write_process_snapshot(directory, SNAPSHOT_PREFIX, list(self.samples))
+        finally:
+            self._flush_lock.release()
+
+    def clear(self):
+        self.samples.clear()
+        self._dirty = True
+
+
+sampler = SlowQuerySampler(maxlen=getattr(settings, 'SLOW_QUERY_BUFFER_SIZE', 500))
+
+
+def collect_samples():
+    """
+    Retornar las muestras de este proceso y de los demás workers, de la más
+    reciente a la más antigua.
+    """
+    samples = list(sampler.samples)
+    directory = getattr(settings, 'METRICS_MULTIPROC_DIR', '')
+    for payload in read_process_snapshots(directory, SNAPSHOT_PREFIX, include_own=False):
+        samples.extend(payload)
+    samples.sort(key=lambda sample: sample['timestamp'], reverse=True)
+    return samples
+
+
+def summarize(samples):
+    """Agrupar las muestras por SQL normalizado y origen."""
+    groups = {}
+    for sample in samples:
+        key = (sample['sql'], sample['origin'])
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = {
+                'sql': sample['sql'],
+                'origin': sample['origin'],
+                'count': 0,
+                'total_ms': 0.0,
+                'max_ms': 0.0,
+                'max_rows': None,
+            }
+        group['count'] += 1
+        group['total_ms'] = round(group['total_ms'] + sample['duration_ms'], 3)
+        group['max_ms'] = max(group['max_ms'], sample['duration_ms'])
+        if sample['rows'] is not None:
+            group['max_rows'] = max(group['max_rows'] or 0, sample['rows'])
+    return sorted(groups.values(), key=lambda group: group['total_ms'], reverse=True)
+
+
+class SlowQueryView(APIView):
+    """
+    Endpoint de administración con las consultas lentas muestreadas.
+    Query params: ?origin=api:api-task-by-status&limit=50
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        samples = collect_samples()
+        origin = request.query_params.get('origin')
+        if origin:
+            samples = [sample for sample in samples if sample['origin'].startswith(origin)]
+        try:
+            limit = int(request.query_params.get('limit', 50))
+        except ValueError:
+            limit = 50
+        return Response({
+            'threshold_ms': getattr(settings, 'SLOW_QUERY_THRESHOLD_MS', 0),
+            'summary': summarize(samples)[:limit],
+            'recent': samples[:limit],
+        })
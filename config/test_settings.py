@@ -0,0 +1,43 @@
+"""
+Settings para ejecutar los tests sin MySQL.
+
+    python manage.py test --settings=config.test_settings
+
+Usa bases SQLite: ``default`` como primario, ``replica`` como réplica
+independiente (sin replicación) y ``shard_1``/``shard_2`` para los tests de
+sharding, que activan ``TASK_SHARDS`` con ``override_settings``.
+"""
+
+import os
+
+os.environ.setdefault('SECRET_KEY', 'test-secret-key-not-for-production-use-only')
+for variable in ('DB_ENGINE', 'DB_NAME', 'DB_USER', 'DB_PASSWORD', 'DB_HOST', 'DB_PORT'):
+    os.environ.setdefault(variable, '')
+
+from .settings import *  # noqa: E402,F401,F403
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_default.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_replica.sqlite3',
+    },
+    'shard_1': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_shard_1.sqlite3',
+    },
+    'shard_2': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'test_shard_2.sqlite3',
+    },
+}
+DATABASE_REPLICAS = ['replica']
+TASK_SHARDS = []
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+SCHEMA_PRECOMPUTE_ON_STARTUP = False
+WARM_UP_ON_STARTUP = False
+METRICS_MULTIPROC_DIR = ''
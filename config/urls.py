@@ -16,15 +16,21 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView, SpectacularRedocView
+from .metrics import metrics_view
+from .schema import LazyView
+from .slow_queries import SlowQueryView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
     path('api/tasks-auth/', include('tasks.urls')),
     
-    # Swagger y ReDoc
-    path('swagger/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
-    path('redoc/', SpectacularRedocView.as_view(url_name='schema'), name='redoc'),
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
+    # Swagger y ReDoc (drf-spectacular se importa en la primera petición)
+    path('swagger/', LazyView('drf_spectacular.views.SpectacularSwaggerView', url_name='schema'), name='swagger-ui'),
+    path('redoc/', LazyView('drf_spectacular.views.SpectacularRedocView', url_name='schema'), name='redoc'),
+    path('api/schema/', LazyView('config.docs.CachedSpectacularAPIView'), name='schema'),
+    
+    # Métricas internas (formato Prometheus)
+    path('metrics', metrics_view, name='metrics'),
+    path('api/internal/slow-queries/', SlowQueryView.as_view(), name='slow-queries'),
 ]
@@ -14,3 +14,15 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
 application = get_wsgi_application()
+
+from django.conf import settings  # noqa: E402
+
+if settings.SCHEMA_PRECOMPUTE_ON_STARTUP:
+    from config.schema import warm_schema_cache
+
+    warm_schema_cache()
+
+if settings.WARM_UP_ON_STARTUP:
+    from config.preload import warm_up
+
+    warm_up()
@@ -0,0 +1,59 @@
+"""
+Configuración de gunicorn (Procfile).
+
+Con ``preload_app`` el maestro importa la aplicación una vez y los workers la
+heredan con el fork, compartiendo la memoria copy-on-write: ver
+config/preload.py. ``GUNICORN_PRELOAD=false`` vuelve a cargar la aplicación
+en cada worker (p. ej. para recargar el código con HUP). El número de workers
+sigue saliendo de ``WEB_CONCURRENCY``.
+
+Las instantáneas de métricas de ``METRICS_MULTIPROC_DIR`` se borran al
+arrancar el maestro y al terminar cada worker, para que ``/metrics`` no siga
+sumando procesos muertos ni los de despliegues anteriores.
+"""
+
+import gc
+import os
+
+import decouple
+
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', 'true').lower() in ('1', 'true', 'yes', 'on')
+
+if preload_app:
+    # Sin recolecciones mientras se importa la aplicación en el maestro: no
+    # quedan huecos en las páginas que heredarán los workers. before_fork lo
+    # reactiva tras gc.freeze().
+    gc.disable()
+
+# Gunicorn lee como ajuste cada nombre global: no usar ``config``.
+metrics_dir = decouple.config('METRICS_MULTIPROC_DIR', default='')
+
+
+def on_starting(server):
+    if metrics_dir:
+        from config.metrics import remove_process_snapshots
+
+        remove_process_snapshots(metrics_dir)
+
+
+def when_ready(server):
+    # El maestro ya cargó la aplicación y aún no ha creado los workers.
+    if preload_app:
+        from config.preload import before_fork
+
+        before_fork()
+
+
+def post_fork(server, worker):
+    if preload_app:
+        from config.preload import after_fork
+
+        after_fork()
+
+
+def child_exit(server, worker):
+    if metrics_dir:
+        from config.metrics import remove_process_snapshots
+
+        remove_process_snapshots(metrics_dir, worker.pid)
@@ -0,0 +1,321 @@
+"""
+Prueba de carga de la API con los flujos de test_api.py.
+
+Cada usuario virtual se registra (o hace login si ya existe) y después
+ejecuta iteraciones de: crear tarea, listar, filtrar por estado, marcar como
+completada y, cada cierto número de iteraciones, refrescar el token.
+
+Con ``--rate`` las iteraciones llegan a ese ritmo (llegadas de Poisson,
+modelo abierto) aunque el servidor vaya lento; sin él, ``--concurrency``
+iteraciones se ejecutan en bucle cerrado. El resultado es un JSON con
+throughput, percentiles de latencia y tasa de errores por endpoint, para
+poder comparar ejecuciones.
+
+Uso:
+    python manage.py runserver
+    python load_test.py --users 20 --concurrency 10 --duration 30 --output run.json
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import httpx
+
+
+BASE_URL = "http://localhost:8000"
+API_PREFIX = "/api/tasks-auth"
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(sorted_values, pct):
+    """Percentil por interpolación lineal sobre valores ya ordenados."""
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100
+    low = int(k)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (k - low)
+
+
+class Stats:
+    """Latencias y resultados por endpoint."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(lambda: defaultdict(int))
+        self.schedule_delays = []
+
+    def record(self, name, elapsed, status=None, error=None):
+        self.latencies[name].append(elapsed)
+        if error is not None:
+            self.errors[name][error] += 1
+        else:
+            self.statuses[name][str(status)] += 1
+
+    def summary(self, elapsed):
+        endpoints = {}
+        total = failed = 0
+        for name in sorted(self.latencies):
+            latencies = sorted(self.latencies[name])
+            statuses = dict(self.statuses[name])
+            errors = dict(self.errors[name])
+            count = len(latencies)
+            bad = sum(errors.values()) + sum(
+                n for code, n in statuses.items() if not code.startswith(('2', '3'))
+            )
+            total += count
+            failed += bad
+            endpoints[name] = {
+                "requests": count,
+                "throughput_rps": round(count / elapsed, 2) if elapsed else None,
+                "error_rate": round(bad / count, 4) if count else 0,
+                "status_codes": statuses,
+                "errors": errors,
+                "latency_ms": latency_summary(latencies),
+            }
+        return {
+            "elapsed_s": round(elapsed, 3),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else None,
+            "error_rate": round(failed / total, 4) if total else 0,
+            "latency_ms": latency_summary(sorted(
+                value for values in self.latencies.values() for value in values
+            )),
+            # Retraso entre la llegada programada de una iteración y su inicio:
+            # si crece, el cliente (o --concurrency) es el cuello de botella.
+            "schedule_delay_ms": latency_summary(sorted(self.schedule_delays)),
+            "endpoints": endpoints,
+        }
+
+
+def latency_summary(sorted_seconds):
+    if not sorted_seconds:
+        return {}
+    summary = {f"p{pct}": round(percentile(sorted_seconds, pct) * 1000, 2) for pct in PERCENTILES}
+    summary["min"] = round(sorted_seconds[0] * 1000, 2)
+    summary["max"] = round(sorted_seconds[-1] * 1000, 2)
+    summary["mean"] = round(sum(sorted_seconds) / len(sorted_seconds) * 1000, 2)
+    return summary
+
+
+class VirtualUser:
+    """Usuario virtual con los flujos de TaskAPIClient, sobre un cliente asíncrono."""
+
+    def __init__(self, client, stats, username, password):
+        self.client = client
+        self.stats = stats
+        self.username = username
+        self.password = password
+        self.access_token = None
+        self.refresh_token = None
+        self.task_ids = []
+        self.iterations = 0
+
+    def auth_headers(self):
+        return {"Authorization": f"Bearer {self.access_token}"}
+
+    async def request(self, name, method, url, **kwargs):
+        """Ejecutar y medir una petición; retorna la respuesta o None si falló."""
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, API_PREFIX + url, **kwargs)
+        except httpx.HTTPError as exc:
+            self.stats.record(name, time.perf_counter() - start, error=type(exc).__name__)
+            return None
+        self.stats.record(name, time.perf_counter() - start, status=response.status_code)
+        return response
+
+    async def register(self):
+        response = await self.request("register", "POST", "/auth/register/", json={
+            "username": self.username,
+            "email": f"{self.username}@example.com",
+            "password": self.password,
+        })
+        if response is not None and response.status_code == 201:
+            data = response.json()
+            self.access_token = data["access"]
+            self.refresh_token = data["refresh"]
+            return True
+        return False
+
+    async def login(self):
+        response = await self.request("login", "POST", "/auth/login/", json={
+            "username": self.username,
+            "password": self.password,
+        })
+        if response is not None and response.status_code == 200:
+            data = response.json()
+            self.access_token = data["access"]
+            self.refresh_token = data["refresh"]
+            return True
+        return False
+
+    async def refresh(self):
+        response = await self.request("refresh", "POST", "/auth/refresh/", json={
+            "refresh": self.refresh_token,
+        })
+        if response is not None and response.status_code == 200:
+            data = response.json()
+            self.access_token = data["access"]
+            self.refresh_token = data.get("refresh", self.refresh_token)
+
+    async def setup(self):
+        """Registrar al usuario; si ya existe (ejecución anterior), hacer login."""
+        return await self.register() or await self.login()
+
+    async def iteration(self, refresh_every):
+        """Una iteración del escenario."""
+        self.iterations += 1
+        headers = self.auth_headers()
+        response = await self.request("create_task", "POST", "/tasks/", headers=headers, json={
+            "title": f"Tarea de carga {uuid.uuid4().hex[:8]}",
+            "description": "Creada por load_test.py",
+            "priority": random.choice(["low", "medium", "high"]),
+            "status": random.choice(["pending", "in_progress"]),
+        })
+        if response is not None and response.status_code == 201:
+            self.task_ids.append(response.json()["id"])
+
+        await self.request("list_tasks", "GET", "/tasks/", headers=headers)
+        await self.request(
+            "by_status", "GET", "/tasks/by_status/",
+            headers=headers, params={"status": random.choice(["pending", "in_progress", "completed"])},
+        )
+        if self.task_ids:
+            task_id = self.task_ids.pop(random.randrange(len(self.task_ids)))
+            await self.request("mark_completed", "PATCH", f"/tasks/{task_id}/mark_completed/", headers=headers)
+        if refresh_every and self.iterations % refresh_every == 0:
+            await self.refresh()
+
+
+async def run_closed(users, args, stats, deadline):
+    """--concurrency trabajadores ejecutando iteraciones sin pausa."""
+    remaining = [args.iterations] if args.iterations else None
+
+    async def worker():
+        while time.perf_counter() < deadline:
+            if remaining is not None:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            await random.choice(users).iteration(args.refresh_every)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def run_open(users, args, stats, deadline):
+    """Iteraciones que llegan a --rate por segundo, con --concurrency en vuelo como máximo."""
+    semaphore = asyncio.Semaphore(args.concurrency)
+    tasks = set()
+    scheduled = time.perf_counter()
+    count = 0
+
+    async def run_one(arrival):
+        async with semaphore:
+            stats.schedule_delays.append(time.perf_counter() - arrival)
+            await random.choice(users).iteration(args.refresh_every)
+
+    while scheduled < deadline and (not args.iterations or count < args.iterations):
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        task = asyncio.create_task(run_one(scheduled))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        count += 1
+        scheduled += random.expovariate(args.rate)
+    if tasks:
+        await asyncio.gather(*tasks)
+
+
+async def main(args):
+    setup_stats = Stats()
+    stats = Stats()
+    started_at = datetime.now(timezone.utc).isoformat()
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    timeout = httpx.Timeout(args.timeout)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=timeout) as client:
+        users = [
+            VirtualUser(client, setup_stats, f"{args.prefix}{index}", args.password)
+            for index in range(args.users)
+        ]
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def setup(user):
+            async with semaphore:
+                return await user.setup()
+
+        setup_start = time.perf_counter()
+        ready = await asyncio.gather(*(setup(user) for user in users))
+        setup_elapsed = time.perf_counter() - setup_start
+        users = [user for user, ok in zip(users, ready) if ok]
+        if not users:
+            sys.exit("Ningún usuario pudo registrarse ni hacer login; ¿está el servidor en marcha?")
+        for user in users:
+            user.stats = stats
+
+        start = time.perf_counter()
+        deadline = start + args.duration
+        if args.rate:
+            await run_open(users, args, stats, deadline)
+        else:
+            await run_closed(users, args, stats, deadline)
+        elapsed = time.perf_counter() - start
+
+    report = {
+        "started_at": started_at,
+        "config": {
+            "base_url": args.base_url,
+            "users": args.users,
+            "active_users": len(users),
+            "concurrency": args.concurrency,
+            "rate": args.rate,
+            "duration_s": args.duration,
+            "iterations": args.iterations,
+            "refresh_every": args.refresh_every,
+            "python": platform.python_version(),
+        },
+        "setup": setup_stats.summary(setup_elapsed)["endpoints"],
+        "results": stats.summary(elapsed),
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+    else:
+        print(output)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--base-url", default=BASE_URL, help=f"Servidor a probar (por defecto {BASE_URL})")
+    parser.add_argument("--users", type=int, default=10, help="Usuarios virtuales")
+    parser.add_argument("--concurrency", type=int, default=10, help="Iteraciones en vuelo como máximo")
+    parser.add_argument("--rate", type=float, default=0, help="Iteraciones por segundo (0 = bucle cerrado)")
+    parser.add_argument("--duration", type=float, default=30, help="Segundos de carga")
+    parser.add_argument("--iterations", type=int, default=0, help="Limitar el número total de iteraciones")
+    parser.add_argument("--refresh-every", type=int, default=10, help="Refrescar el token cada N iteraciones de un usuario")
+    parser.add_argument("--timeout", type=float, default=30, help="Timeout por petición en segundos")
+    parser.add_argument("--prefix", default="load_user_", help="Prefijo de los usernames")
+    parser.add_argument("--password", default="LoadTest!2024pw", help="Contraseña de los usuarios virtuales")
+    parser.add_argument("--seed", type=int, default=None, help="Semilla para repetir la misma secuencia")
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto, stdout)")
+    args = parser.parse_args(argv)
+    if args.users < 1 or args.concurrency < 1:
+        parser.error("--users y --concurrency deben ser >= 1")
+    return args
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    random.seed(arguments.seed)
+    asyncio.run(main(arguments))
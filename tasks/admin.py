@@ -1,15 +1,162 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
 from django.contrib import admin
-from .models import Task
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.paginator import Paginator
+from django.db import connections, router
+from django.db.models import Max, Min, QuerySet
+from django.utils import timezone
+from django.utils.functional import cached_property
+
+from .models import Task, TaskQuerySet
+from .sharding import task_shards
+
+
+def estimate_rows(model, using):
+    """
+    Filas de la tabla según las estadísticas de la base, sin recorrerla.
+
+    Retorna ``None`` si la base no da una estimación (SQLite, tabla sin analizar).
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    if connection.vendor == 'postgresql':
+        sql = 'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass'
+    elif connection.vendor == 'mysql':
+        sql = (
+            'SELECT table_rows FROM information_schema.tables '
+            'WHERE table_schema = DATABASE() AND table_name = %s'
+        )
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    if row is None or row[0] is None or row[0] < 0:
+        return None
+    return int(row[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator del admin que no hace ``COUNT(*)`` sobre tablas grandes.
+
+    Sin filtros usa la estimación de filas de la base; con filtros (búsqueda,
+    list_filter) cuenta como mucho ``count_limit`` filas, así que solo se
+    puede paginar hasta ahí.
+    """
+    # Por debajo de esta estimación se cuenta exacto.
+    exact_below = 10000
+    count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        if not queryset.query.where:
+            estimate = estimate_rows(queryset.model, queryset.db)
+            if estimate is not None and estimate >= self.exact_below:
+                return estimate
+            return queryset.count()
+        return queryset[:self.count_limit].count()
+
+
+def _next_bucket(start, kind):
+    if kind == 'year':
+        return start.replace(year=start.year + 1)
+    if kind == 'month':
+        return start.replace(year=start.year + start.month // 12, month=start.month % 12 + 1)
+    return start + timedelta(days=1)
+
+
+class DateProbeQuerySet(TaskQuerySet):
+    """
+    ``datetimes()`` para el ``date_hierarchy`` del admin sin recorrer la tabla.
+
+    Django calcula los años/meses/días con un ``DISTINCT`` sobre la fecha
+    truncada de todas las filas. Aquí se lee el mínimo y el máximo (índice) y
+    se comprueba cada periodo con un ``EXISTS`` acotado por rango.
+    """
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        if kind not in ('year', 'month', 'day'):
+            return super().datetimes(field_name, kind, order, tzinfo)
+        if settings.USE_TZ and tzinfo is None:
+            tzinfo = timezone.get_current_timezone()
+        bounds = self.aggregate(first=Min(field_name), last=Max(field_name))
+        if bounds['first'] is None:
+            return []
+        if settings.USE_TZ:
+            bounds = {key: timezone.localtime(value, tzinfo).replace(tzinfo=None) for key, value in bounds.items()}
+
+        first = bounds['first']
+        start = datetime(first.year, 1 if kind == 'year' else first.month, 1 if kind != 'day' else first.day)
+        found = []
+        while start <= bounds['last']:
+            end = _next_bucket(start, kind)
+            period = (start, end)
+            if settings.USE_TZ:
+                period = tuple(timezone.make_aware(value, tzinfo) for value in period)
+            if self.filter(**{f'{field_name}__gte': period[0], f'{field_name}__lt': period[1]}).exists():
+                found.append(period[0])
+            start = end
+        return found[::-1] if order == 'DESC' else found
+
+
+class ShardListFilter(admin.SimpleListFilter):
+    """
+    Shard que lista el changelist (solo con ``TASK_SHARDS``); sin elegir, el primero.
+    """
+    title = 'shard'
+    parameter_name = 'shard'
+
+    def lookups(self, request, model_admin):
+        return [(alias, alias) for alias in task_shards()]
+
+    def value(self):
+        return super().value() or task_shards()[0]
+
+    def choices(self, changelist):
+        # Sin opción "Todos": cada consulta va a una sola base.
+        for alias, title in self.lookup_choices:
+            yield {
+                'selected': self.value() == alias,
+                'query_string': changelist.get_query_string({self.parameter_name: alias}),
+                'display': title,
+            }
+
+    def queryset(self, request, queryset):
+        if self.value() not in task_shards():
+            raise IncorrectLookupParameters(f'Shard desconocido: {self.value()}')
+        return queryset.using(self.value())
 
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
     """
     Administrador para el modelo Task.
+    
+    Pensado para tablas de millones de filas: sin ``COUNT(*)`` exactos, el
+    usuario en la misma consulta y búsquedas por prefijo que usan índices.
+
+    Con ``TASK_SHARDS`` el changelist lista un shard cada vez (filtro
+    ``shard``). En los shards sin la tabla auth_user no hay join con el
+    usuario: se muestra ``user_id`` y la búsqueda por username busca antes
+    los ids en la base de los usuarios.
     """
     list_display = ('title', 'user', 'status', 'priority', 'due_date', 'created_at')
     list_filter = ('status', 'priority', 'created_at')
-    search_fields = ('title', 'description', 'user__username')
+    list_select_related = ('user',)
+    # "^": LIKE 'texto%' en vez de '%texto%', que no puede usar índices.
+    search_fields = ('^title', '^user__username')
+    date_hierarchy = 'created_at'
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    # Sin raw_id_fields el formulario carga todos los usuarios en un <select>.
+    raw_id_fields = ('user',)
     readonly_fields = ('created_at', 'updated_at')
     
     fieldsets = (
@@ -24,10 +171,73 @@ class TaskAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """
+        Usar ``DateProbeQuerySet`` para el date_hierarchy.
+        """
+        queryset = super().get_queryset(request)
+        return DateProbeQuerySet(model=queryset.model, query=queryset.query, using=queryset._db, hints=queryset._hints)
+    
     def get_readonly_fields(self, request, obj=None):
         """
         Hacer readonly los campos de fecha de creación y actualización.
         """
         if obj:
-            return self.readonly_fields
+            # Con sharding, cambiar el usuario movería la tarea de shard: rebalance_task_shards.
+            return (*self.readonly_fields, 'user') if task_shards() else self.readonly_fields
         return []
+    
+    def shard(self, request):
+        """Alias que lista el changelist, o ``None`` sin sharding."""
+        if not task_shards():
+            return None
+        return request.GET.get(ShardListFilter.parameter_name) or task_shards()[0]
+    
+    def joins_users(self, request):
+        """Si la base que se lista tiene la tabla auth_user."""
+        alias = self.shard(request)
+        return alias is None or alias == router.db_for_write(User)
+    
+    def get_list_filter(self, request):
+        if task_shards():
+            return (ShardListFilter, *self.list_filter)
+        return self.list_filter
+    
+    def get_list_display(self, request):
+        if self.joins_users(request):
+            return self.list_display
+        return tuple('owner_id' if name == 'user' else name for name in self.list_display)
+    
+    def get_list_select_related(self, request):
+        return self.list_select_related if self.joins_users(request) else ()
+    
+    def get_search_fields(self, request):
+        if self.joins_users(request):
+            return self.search_fields
+        return tuple(field for field in self.search_fields if '__' not in field)
+    
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term and not self.joins_users(request):
+            user_ids = User.objects.filter(username__startswith=search_term).values_list('pk', flat=True)
+            results |= queryset.filter(user_id__in=list(user_ids[:1000]))
+        return results, may_have_duplicates
+    
+    def get_object(self, request, object_id, from_field=None):
+        """Con sharding, buscar la tarea en cada shard (los ids no se repiten)."""
+        if not task_shards():
+            return super().get_object(request, object_id, from_field)
+        field = self.model._meta.pk if from_field is None else self.model._meta.get_field(from_field)
+        try:
+            object_id = field.to_python(object_id)
+        except ValidationError:
+            return None
+        for alias in task_shards():
+            obj = self.get_queryset(request).using(alias).filter(**{field.name: object_id}).first()
+            if obj is not None:
+                return obj
+        return None
+    
+    @admin.display(description='user id', ordering='user_id')
+    def owner_id(self, obj):
+        return obj.user_id
@@ -0,0 +1,119 @@
+"""
+Archivado de tareas completadas en la tabla fría ``ArchivedTask``.
+
+Cada lote se mueve en su propia transacción (copiar y borrar), así que el
+proceso se puede interrumpir y volver a lanzar: continúa con las tareas que
+aún cumplen el criterio.
+"""
+
+import heapq
+import logging
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import ArchivedTask, Task
+from .sharding import task_shards
+
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_FIELDS = [
+    'id', 'user_id', 'title', 'description', 'status', 'priority',
+    'due_date', 'created_at', 'updated_at', 'completed_at',
+]
+
+
+def task_databases():
+    return task_shards() or ['default']
+
+
+def archive_batch(cutoff, batch_size, using, after=0):
+    """
+    Mover un lote de tareas completadas antes de ``cutoff`` con id mayor que ``after``.
+
+    Retorna ``(archivadas, cursor)``: ``cursor`` es el ``after`` del siguiente
+    lote, o ``None`` cuando no quedan tareas. Solo se borran de ``Task`` las
+    filas que quedaron en ``ArchivedTask``; si allí otra fila ya ocupa el id,
+    la tarea sigue activa y se avisa en el log.
+    """
+    with transaction.atomic(using=using):
+        rows = list(
+            Task.objects.using(using)
+            .filter(status='completed', completed_at__lt=cutoff, pk__gt=after)
+            .order_by('pk')
+            .select_for_update(skip_locked=True)
+            .values(*ARCHIVED_FIELDS)[:batch_size]
+        )
+        if not rows:
+            return 0, None
+        archived_at = timezone.now()
+        ArchivedTask.objects.using(using).bulk_create(
+            [ArchivedTask(archived_at=archived_at, **row) for row in rows],
+            ignore_conflicts=True,
+        )
+        stored = set(
+            ArchivedTask.objects.using(using)
+            .filter(pk__in=[row['id'] for row in rows])
+            .values_list('pk', 'user_id', 'created_at')
+        )
+        archived = [row['id'] for row in rows if (row['id'], row['user_id'], row['created_at']) in stored]
+        Task.objects.using(using).filter(pk__in=archived).delete()
+    if len(archived) < len(rows):
+        skipped = sorted({row['id'] for row in rows} - set(archived))
+        logger.warning('%s: tareas sin archivar, su id ya existe en ArchivedTask: %s', using, skipped)
+    return len(archived), (rows[-1]['id'] if len(rows) == batch_size else None)
+
+
+def archive_completed_tasks(days=None, batch_size=1000, databases=None, max_batches=None):
+    """
+    Archivar las tareas completadas hace más de ``days`` días en todos los shards.
+    """
+    if days is None:
+        days = settings.TASK_ARCHIVE_AFTER_DAYS
+    cutoff = timezone.now() - timedelta(days=days)
+    total = 0
+    for using in databases or task_databases():
+        batches = 0
+        after = 0
+        while max_batches is None or batches < max_batches:
+            archived, after = archive_batch(cutoff, batch_size, using, after)
+            total += archived
+            batches += 1
+            if after is None:
+                break
+    return total
+
+
+class CombinedTaskList:
+    """
+    Tareas activas y archivadas de un usuario como una sola lista ordenada
+    por ``-created_at``, paginable sin cargar las dos tablas completas.
+    """
+    def __init__(self, tasks, archived):
+        self.tasks = tasks
+        self.archived = archived
+
+    def count(self):
+        return self.tasks.count() + self.archived.count()
+
+    def __len__(self):
+        return self.count()
+
+    def _merge(self, tasks, archived):
+        return heapq.merge(tasks, archived, key=lambda task: task.created_at, reverse=True)
+
+    def __iter__(self):
+        return self._merge(self.tasks.iterator(), self.archived.iterator())
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return list(self[key:key + 1])[0]
+        start = key.start or 0
+        stop = key.stop
+        # Cada tabla aporta como mucho `stop` elementos a la página.
+        merged = self._merge(self.tasks[:stop], self.archived[:stop])
+        return list(islice(merged, start, stop))
@@ -0,0 +1,39 @@
+from django.conf import settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from config.db_routers import set_routing_user
+from config.metrics import TOKEN_VERIFICATION_TIME
+from .claims import current_profile
+
+
+class MeasuredJWTAuthentication(JWTAuthentication):
+    """
+    Autenticación JWT que registra el tiempo de verificación del token.
+    """
+    def get_validated_token(self, raw_token):
+        with TOKEN_VERIFICATION_TIME.time():
+            return super().get_validated_token(raw_token)
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is not None:
+            set_routing_user(user_id)
+        return super().get_user(validated_token)
+
+
+class ProfileClaimJWTAuthentication(MeasuredJWTAuthentication):
+    """
+    Para ``users/me/``: con ``ME_FROM_TOKEN`` y un claim de perfil vigente el
+    usuario sale del token (``TokenUser`` con ``profile_claim``), sin
+    consultar la base de datos; ver tasks.claims.
+    """
+    def get_user(self, validated_token):
+        if settings.ME_FROM_TOKEN:
+            profile = current_profile(validated_token)
+            if profile is not None:
+                user = TokenUser(validated_token)
+                user.profile_claim = profile
+                return user
+        return super().get_user(validated_token)
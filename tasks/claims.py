@@ -0,0 +1,145 @@
+"""
+Claim de perfil en los tokens JWT y resumen de tareas en memoria para
+``GET users/me/``.
+
+Los tokens de registro y login llevan en el claim ``profile`` los datos que
+muestra ``me`` y una versión: un hash de esos datos y de ``is_active``. La
+versión vigente de cada usuario se guarda en la caché (se actualiza al
+guardar el usuario). Con ``ME_FROM_TOKEN`` activo, ``me`` responde desde el
+claim si su versión coincide con la de la caché, sin cargar el usuario; si
+no coincide o la caché no la tiene, lee el usuario y recuerda su versión.
+
+Con varios workers la caché debe ser compartida (como para el pin de
+réplicas); con la caché local de cada proceso un cambio de perfil tarda
+hasta ``PROFILE_VERSION_CACHE_SECONDS`` en verse en los demás.
+"""
+
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .models import Task
+
+
+PROFILE_CLAIM = 'profile'
+PROFILE_FIELDS = ('username', 'email', 'first_name', 'last_name')
+
+
+def profile_fields(user):
+    return {field: getattr(user, field) for field in PROFILE_FIELDS}
+
+
+def profile_version(user):
+    data = json.dumps([*profile_fields(user).values(), user.is_active])
+    return hashlib.blake2b(data.encode(), digest_size=6).hexdigest()
+
+
+def _version_key(user_id):
+    return f'profile-version:{user_id}'
+
+
+def remember_version(user):
+    """Guardar en la caché la versión vigente del perfil del usuario."""
+    cache.set(_version_key(user.pk), profile_version(user), settings.PROFILE_VERSION_CACHE_SECONDS)
+
+
+def forget_version(user_id):
+    """Quitar de la caché la versión del perfil (usuario borrado)."""
+    cache.delete(_version_key(user_id))
+
+
+def current_profile(token):
+    """
+    Perfil del claim de ``token`` si sigue vigente, o ``None``.
+
+    La versión se actualiza con las señales ``post_save`` y ``post_delete``
+    de ``User``. ``User.objects.update()`` (p. ej. ``is_active=False``) no
+    las envía: hasta ``PROFILE_VERSION_CACHE_SECONDS`` los tokens ya
+    emitidos siguen sirviendo ``me`` desde el claim.
+    """
+    claim = token.get(PROFILE_CLAIM)
+    if not claim:
+        return None
+    user_id = token.get('user_id')
+    if cache.get(_version_key(user_id)) != claim.get('v'):
+        return None
+    return {field: claim.get(field, '') for field in PROFILE_FIELDS}
+
+
+class ProfileRefreshToken(RefreshToken):
+    """
+    ``RefreshToken`` con el claim de perfil (el access token lo copia).
+    """
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token[PROFILE_CLAIM] = {'v': profile_version(user), **profile_fields(user)}
+        remember_version(user)
+        return token
+
+
+def me_data(user):
+    """
+    Datos de ``me``: del claim si el usuario viene de él, si no del usuario cargado.
+    """
+    profile = getattr(user, 'profile_claim', None)
+    if profile is None:
+        remember_version(user)
+        profile = profile_fields(user)
+    return {'id': User._meta.pk.to_python(user.pk), **profile}
+
+
+class TaskSummaryCache:
+    """
+    Recuento de tareas por estado de cada usuario, en memoria del proceso.
+
+    Las escrituras de este proceso lo invalidan (tasks.signals y las
+    operaciones en bloque); las de otros procesos se ven al caducar, a los
+    ``TASK_SUMMARY_CACHE_SECONDS`` segundos.
+    """
+    def __init__(self, max_users=10000):
+        self.max_users = max_users
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self.entries.move_to_end(user_id)
+                return entry[1]
+        summary = self.load(user_id)
+        with self.lock:
+            self.entries[user_id] = (now + settings.TASK_SUMMARY_CACHE_SECONDS, summary)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_users:
+                self.entries.popitem(last=False)
+        return summary
+
+    def load(self, user_id):
+        counts = dict(
+            Task.objects.for_user(user_id).order_by().values_list('status').annotate(count=Count('pk'))
+        )
+        summary = {status: counts.get(status, 0) for status, _ in Task.STATUS_CHOICES}
+        summary['total'] = sum(counts.values())
+        return summary
+
+    def invalidate(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+task_summaries = TaskSummaryCache()
@@ -0,0 +1,21 @@
+from django.contrib.auth.hashers import PBKDF2PasswordHasher
+from django.utils.crypto import constant_time_compare
+
+from config.metrics import PASSWORD_HASHING_TIME
+
+
+class MeasuredPBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """
+    Hasher PBKDF2 que registra el tiempo de hashing en login y registro.
+
+    Conserva el mismo algoritmo, por lo que verifica los hashes existentes.
+    """
+    def encode(self, password, salt, iterations=None):
+        with PASSWORD_HASHING_TIME.time('encode'):
+            return super().encode(password, salt, iterations)
+
+    def verify(self, password, encoded):
+        with PASSWORD_HASHING_TIME.time('verify'):
+            decoded = self.decode(encoded)
+            encoded_2 = super().encode(password, decoded['salt'], decoded['iterations'])
+            return constant_time_compare(encoded, encoded_2)
@@ -0,0 +1,157 @@
+"""
+Soporte de la cabecera ``Idempotency-Key`` en las escrituras de tareas.
+
+La primera petición con una clave la reserva (fila ``IdempotencyKey`` sin
+respuesta) y, al terminar, guarda los bytes ya renderizados de la respuesta
+durante ``IDEMPOTENCY_KEY_TTL`` segundos. Un reintento con la misma clave
+recibe esos bytes tal cual, sin ejecutar la vista ni tocar ``Task``. Las
+claves son por usuario.
+
+- Misma clave mientras la primera sigue en curso: 409.
+- Misma clave con otra petición (método, ruta, cuerpo o archivos): 422.
+- Una petición larga (importación) prolonga su reserva con ``extend``: un
+  reintento no la toma mientras siga en curso.
+- Respuestas 5xx o excepciones no se guardan: la clave queda libre.
+"""
+
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import IntegrityError, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+
+HEADER = 'Idempotency-Key'
+MAX_KEY_LENGTH = 255
+
+
+def fingerprint(request):
+    """
+    Huella de la petición: método, ruta con query string y cuerpo.
+
+    En multipart (importación de archivos) el cuerpo son los campos ya
+    parseados: de cada archivo, su nombre, tamaño y sha256, leído por
+    trozos porque Django vuelca a disco las subidas grandes.
+    """
+    digest = hashlib.sha256(f'{request.method} {request.get_full_path()}\n'.encode())
+    if not request.content_type.startswith('multipart/'):
+        digest.update(request._request.body)
+        return digest.hexdigest()
+    for name, values in sorted(request.data.lists()):
+        for value in values:
+            if isinstance(value, UploadedFile):
+                digest.update(f'{name}={value.name}:{value.size}:{_file_digest(value)}\n'.encode())
+            else:
+                digest.update(f'{name}={value}\n'.encode())
+    return digest.hexdigest()
+
+
+def _file_digest(upload):
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    # La vista lo leerá de nuevo desde el principio.
+    upload.seek(0)
+    return digest.hexdigest()
+
+
+def _error(message, code):
+    return Response({'error': message}, status=code)
+
+
+def replay(record):
+    response = HttpResponse(record.content, status=record.status_code, content_type=record.content_type)
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+def begin(request, key):
+    """
+    Reservar ``key`` para esta petición.
+
+    Retorna ``(record, None)`` si la vista debe ejecutarse, o ``(None,
+    response)`` con la respuesta guardada o el error que corresponda.
+    """
+    if len(key) > MAX_KEY_LENGTH:
+        return None, _error(f'{HEADER} too long', status.HTTP_400_BAD_REQUEST)
+    now = timezone.now()
+    lock_until = now + timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+    digest = fingerprint(request)
+    keys = IdempotencyKey.objects.filter(user=request.user, key=key)
+    # Primero se lee: un reintento se responde con esta única consulta.
+    record = keys.first()
+    if record is None:
+        try:
+            with transaction.atomic():
+                return IdempotencyKey.objects.create(
+                    user=request.user, key=key, fingerprint=digest, expires_at=lock_until,
+                ), None
+        except IntegrityError:
+            # Otra petición con la misma clave la reservó a la vez.
+            return None, _error(f'a request with this {HEADER} is in progress', status.HTTP_409_CONFLICT)
+
+    if record.expires_at <= now:
+        # Caducada, o reservada por una petición que no terminó: se reutiliza.
+        taken = keys.filter(expires_at=record.expires_at).update(
+            fingerprint=digest, status_code=None, content=b'', content_type='', expires_at=lock_until,
+        )
+        if taken:
+            return keys.first(), None
+        return None, _error(f'a request with this {HEADER} is in progress', status.HTTP_409_CONFLICT)
+    if record.fingerprint != digest:
+        return None, _error(
+            f'{HEADER} already used with a different request', status.HTTP_422_UNPROCESSABLE_ENTITY
+        )
+    if record.status_code is None:
+        return None, _error(f'a request with this {HEADER} is in progress', status.HTTP_409_CONFLICT)
+    return None, replay(record)
+
+
+def finish(record, response):
+    """Guardar la respuesta renderizada, o liberar la clave si fue un 5xx."""
+    if response.status_code >= 500 or getattr(response, 'streaming', False):
+        release(record)
+        return
+    if hasattr(response, 'render') and not response.is_rendered:
+        response.render()
+    IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).update(
+        status_code=response.status_code,
+        content=response.content,
+        content_type=response.get('Content-Type', ''),
+        expires_at=timezone.now() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+    )
+
+
+def extend(record):
+    """
+    Prolongar la reserva de ``record`` mientras su petición sigue en curso.
+
+    Solo escribe cuando queda menos de la mitad de ``IDEMPOTENCY_LOCK_SECONDS``,
+    y solo si nadie tomó la clave tras caducar.
+    """
+    lock = timedelta(seconds=settings.IDEMPOTENCY_LOCK_SECONDS)
+    now = timezone.now()
+    if record.expires_at - now > lock / 2:
+        return
+    extended = IdempotencyKey.objects.filter(
+        pk=record.pk, status_code__isnull=True, expires_at=record.expires_at,
+    ).update(expires_at=now + lock)
+    if extended:
+        record.expires_at = now + lock
+
+
+def release(record):
+    IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).delete()
+
+
+def prune_expired():
+    """Borrar las claves caducadas; retorna cuántas."""
+    deleted, _ = IdempotencyKey.objects.filter(expires_at__lt=timezone.now()).delete()
+    return deleted
@@ -0,0 +1,119 @@
+"""
+Importación masiva de tareas desde CSV o NDJSON.
+
+El archivo se lee como un stream, fila a fila: las filas se validan con las
+reglas del serializador de tareas en lotes de ``batch_size`` y cada lote se
+inserta con ``bulk_create`` en el shard del usuario. La memoria usada depende
+del tamaño del lote, no del archivo.
+"""
+
+import csv
+import io
+import json
+from itertools import islice
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .claims import task_summaries
+from .models import Task
+from .sharding import shard_for_user
+
+
+FORMATS = ('csv', 'ndjson')
+# Errores de fila que se retornan; el resto solo se cuenta.
+MAX_REPORTED_ERRORS = 100
+
+
+def detect_format(name='', content_type=''):
+    """Deducir el formato por la extensión o el content type."""
+    name = (name or '').lower()
+    content_type = (content_type or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')) or 'ndjson' in content_type or 'jsonl' in content_type:
+        return 'ndjson'
+    if name.endswith('.csv') or 'csv' in content_type:
+        return 'csv'
+    return None
+
+
+def iter_rows(stream, fmt):
+    """
+    Recorrer las filas de un stream binario.
+
+    Produce ``(línea, datos)``; ``datos`` es un dict o, si la fila no se pudo
+    leer, una ``ValidationError``.
+    """
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'csv':
+            reader = csv.DictReader(text)
+            for row in reader:
+                # Columnas vacías = campo no enviado (p. ej. sin due_date).
+                yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}
+        else:
+            for line_number, line in enumerate(text, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    data = json.loads(line)
+                except ValueError as exc:
+                    yield line_number, ValidationError({'non_field_errors': [f'JSON inválido: {exc}']})
+                    continue
+                if not isinstance(data, dict):
+                    yield line_number, ValidationError({'non_field_errors': ['Se esperaba un objeto JSON.']})
+                    continue
+                yield line_number, data
+    finally:
+        # No cerrar el archivo subido al liberar el wrapper.
+        text.detach()
+
+
+def _build_task(user, data, now):
+    task = Task(user=user, **data)
+    if task.status == 'completed':
+        # bulk_create no pasa por Task.save().
+        task.completed_at = now
+    return task
+
+
+def import_tasks(stream, user, fmt, serializer_class, batch_size=500, on_error=None, on_batch=None):
+    """
+    Importar las tareas de ``stream`` para ``user``.
+
+    Retorna ``{'created', 'failed', 'errors'}``; ``errors`` contiene como mucho
+    ``MAX_REPORTED_ERRORS`` filas con sus errores. ``on_error(línea, errores)``
+    se llama para cada fila inválida y ``on_batch()`` tras cada lote.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f'Formato no soportado: {fmt}')
+    # Una sola instancia del serializador valida todas las filas.
+    serializer = serializer_class()
+    manager = Task.objects.db_manager(shard_for_user(user.pk) or 'default')
+    result = {'created': 0, 'failed': 0, 'errors': []}
+
+    rows = iter_rows(stream, fmt)
+    while True:
+        chunk = list(islice(rows, batch_size))
+        if not chunk:
+            return result
+        now = timezone.now()
+        tasks = []
+        for line_number, data in chunk:
+            try:
+                if isinstance(data, ValidationError):
+                    raise data
+                tasks.append(_build_task(user, serializer.run_validation(data), now))
+            except ValidationError as exc:
+                result['failed'] += 1
+                if len(result['errors']) < MAX_REPORTED_ERRORS:
+                    result['errors'].append({'line': line_number, 'errors': exc.detail})
+                if on_error is not None:
+                    on_error(line_number, exc.detail)
+        if tasks:
+            with transaction.atomic(using=manager.db):
+                manager.bulk_create(tasks, batch_size=batch_size)
+            result['created'] += len(tasks)
+            task_summaries.invalidate(user.pk)
+        if on_batch is not None:
+            on_batch()
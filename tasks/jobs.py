@@ -0,0 +1,267 @@
+"""
+Cola de trabajos en segundo plano guardada en la base de datos (``Job``).
+
+Las vistas encolan con ``enqueue`` y responden enseguida; el comando
+``run_jobs`` reclama lotes de trabajos y los ejecuta en un pool de hilos o
+de procesos. Un trabajo reclamado queda bloqueado hasta ``locked_until``
+(visibility timeout), que el worker renueva mientras lo ejecuta: si el
+worker muere, otro lo retoma al vencer. Los que fallan se reintentan con
+espera exponencial hasta ``max_attempts``; por eso los trabajos deben poder
+ejecutarse más de una vez.
+
+Con ``SELECT ... FOR UPDATE SKIP LOCKED`` (PostgreSQL, MySQL 8) cada worker
+se salta las filas que otro está reclamando. SQLite no bloquea filas: cada
+trabajo se reclama con un UPDATE condicional que solo gana un worker.
+"""
+
+import json
+import logging
+import os
+import socket
+import tempfile
+import time
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+from multiprocessing import get_context
+
+import django
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from . import idempotency
+from .archival import archive_completed_tasks
+from .models import Job, Task
+
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = ['id', 'title', 'description', 'status', 'priority', 'due_date', 'created_at', 'updated_at']
+
+
+def enqueue(func, user=None, delay=0, max_attempts=None, **payload):
+    """
+    Encolar ``func(**payload)``; ``func`` es un callable de módulo o su ruta.
+
+    El payload debe ser serializable a JSON. Dentro de una transacción, el
+    trabajo solo es visible para los workers después del commit.
+    """
+    name = func if isinstance(func, str) else f'{func.__module__}.{func.__qualname__}'
+    return Job.objects.create(
+        name=name,
+        payload=payload,
+        user=user,
+        run_at=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS,
+    )
+
+
+def available(now):
+    """Trabajos listos para reclamar: en cola o con el bloqueo vencido."""
+    return Q(status='queued', run_at__lte=now) | Q(status='running', locked_until__lt=now)
+
+
+def claim_jobs(worker, limit, timeout=None, using='default'):
+    """
+    Reclamar hasta ``limit`` trabajos para ``worker`` durante ``timeout`` segundos.
+    """
+    timeout = settings.JOB_VISIBILITY_TIMEOUT if timeout is None else timeout
+    now = timezone.now()
+    lease = {
+        'status': 'running',
+        'locked_by': worker,
+        'locked_until': now + timedelta(seconds=timeout),
+        'attempts': F('attempts') + 1,
+    }
+    jobs = Job.objects.using(using)
+    candidates = jobs.filter(available(now)).order_by('run_at', 'pk')
+
+    if connections[using].features.has_select_for_update_skip_locked:
+        with transaction.atomic(using=using):
+            pks = list(candidates.select_for_update(skip_locked=True).values_list('pk', flat=True)[:limit])
+            if pks:
+                jobs.filter(pk__in=pks).update(**lease)
+    else:
+        pks = []
+        for pk, attempts in candidates.values_list('pk', 'attempts')[:limit]:
+            # Si otro worker lo reclamó antes, ya no cumple la condición.
+            if jobs.filter(available(now), pk=pk, attempts=attempts).update(**lease):
+                pks.append(pk)
+
+    if not pks:
+        return []
+    return list(jobs.filter(pk__in=pks, locked_by=worker).order_by('run_at', 'pk'))
+
+
+def _owned(job, using):
+    """El trabajo sigue reclamado por quien lo ejecutó (no lo retomó otro)."""
+    return Job.objects.using(using).filter(pk=job.pk, locked_by=job.locked_by, attempts=job.attempts)
+
+
+def complete(job, result=None, using='default'):
+    return _owned(job, using).update(
+        status='done', result=result, finished_at=timezone.now(), locked_until=None,
+    )
+
+
+def fail(job, error, using='default'):
+    """Reintentar más tarde o, sin intentos restantes, dejarlo fallido."""
+    now = timezone.now()
+    if job.attempts >= job.max_attempts:
+        values = {'status': 'failed', 'finished_at': now}
+    else:
+        delay = settings.JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+        values = {'status': 'queued', 'run_at': now + timedelta(seconds=delay)}
+    return _owned(job, using).update(last_error=error, locked_until=None, locked_by='', **values)
+
+
+def execute(name, payload):
+    """Ejecutar un trabajo; corre en un hilo o un proceso del pool."""
+    return import_string(name)(**payload)
+
+
+def _execute_in_thread(name, payload):
+    try:
+        return execute(name, payload)
+    finally:
+        # Cada hilo abre sus propias conexiones.
+        connections.close_all()
+
+
+class SyncExecutor:
+    """Ejecuta en el hilo del worker (tests y depuración)."""
+    def submit(self, fn, *args):
+        future = Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+        return future
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return None
+
+
+class Worker:
+    """
+    Bucle del comando ``run_jobs``: reclamar, ejecutar en el pool, confirmar.
+
+    Solo el hilo principal escribe en la tabla de trabajos; los trabajos en
+    ejecución renuevan su bloqueo cada ``timeout / 2`` segundos.
+    """
+    def __init__(self, concurrency=4, pool='thread', timeout=None, poll_interval=1.0, using='default', name=None):
+        self.concurrency = concurrency
+        self.pool = pool
+        self.timeout = settings.JOB_VISIBILITY_TIMEOUT if timeout is None else timeout
+        self.poll_interval = poll_interval
+        self.using = using
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+
+    def executor(self):
+        if self.pool == 'process':
+            # spawn: los procesos hijos no heredan las conexiones abiertas. El
+            # initializer no puede venir de este módulo (importa modelos).
+            return ProcessPoolExecutor(
+                self.concurrency, mp_context=get_context('spawn'), initializer=django.setup,
+            )
+        if self.pool == 'sync':
+            return SyncExecutor()
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix='job')
+
+    def run(self, once=False):
+        """
+        Procesar trabajos; con ``once`` termina cuando no queda ninguno listo.
+
+        Retorna el número de trabajos procesados.
+        """
+        task = _execute_in_thread if self.pool == 'thread' else execute
+        running = {}
+        processed = 0
+        renew_at = time.monotonic() + self.timeout / 2
+        with self.executor() as executor:
+            while True:
+                free = self.concurrency - len(running)
+                for job in claim_jobs(self.name, free, self.timeout, self.using) if free > 0 else []:
+                    if job.attempts > job.max_attempts:
+                        # Se reclamó tras vencer su bloqueo demasiadas veces.
+                        fail(job, 'visibility timeout exceeded', self.using)
+                        processed += 1
+                        continue
+                    running[executor.submit(task, job.name, job.payload)] = job
+
+                if not running:
+                    if once:
+                        return processed
+                    time.sleep(self.poll_interval)
+                    continue
+
+                done, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self.finish(running.pop(future), future)
+                    processed += 1
+                if running and time.monotonic() >= renew_at:
+                    self.renew(running.values())
+                    renew_at = time.monotonic() + self.timeout / 2
+
+    def renew(self, jobs):
+        Job.objects.using(self.using).filter(
+            pk__in=[job.pk for job in jobs], locked_by=self.name,
+        ).update(locked_until=timezone.now() + timedelta(seconds=self.timeout))
+
+    def finish(self, job, future):
+        error = future.exception()
+        if error is None:
+            if not complete(job, future.result(), self.using):
+                logger.warning('El trabajo %s terminó después de perder su bloqueo', job.pk)
+            return
+        logger.error('Falló el trabajo %s (%s), intento %s', job.pk, job.name, job.attempts, exc_info=error)
+        fail(job, ''.join(traceback.format_exception(error)), self.using)
+        if isinstance(error, BrokenExecutor):
+            # Murió un proceso del pool: el resto de trabajos fallaría igual.
+            raise error
+
+
+# Trabajos de la app tasks
+
+def archive_tasks(days=None, batch_size=1000):
+    """Archivar las tareas completadas antiguas (ver tasks.archival)."""
+    return {'archived': archive_completed_tasks(days=days, batch_size=batch_size)}
+
+
+def prune_idempotency_keys():
+    """Borrar las respuestas de Idempotency-Key caducadas."""
+    return {'deleted': idempotency.prune_expired()}
+
+
+def export_tasks(user_id):
+    """
+    Exportar las tareas de un usuario a un NDJSON en ``default_storage``.
+
+    El archivo tiene el formato que acepta la importación.
+    """
+    rows = (
+        Task.objects.for_user(user_id)
+        .order_by('pk')
+        .values(*EXPORT_FIELDS)
+        .iterator(chunk_size=2000)
+    )
+    count = 0
+    # Se escribe a disco pasado 1 MB: la memoria no depende del número de tareas.
+    with tempfile.SpooledTemporaryFile(max_size=1024 * 1024) as buffer:
+        for row in rows:
+            buffer.write(json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False).encode() + b'\n')
+            count += 1
+        buffer.seek(0)
+        name = f'exports/{user_id}/{timezone.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:8]}.ndjson'
+        path = default_storage.save(name, File(buffer))
+    return {'path': path, 'tasks': count}
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.archival import archive_completed_tasks, task_databases
+
+
+class Command(BaseCommand):
+    """
+    Mover a la tabla de archivo las tareas completadas hace más de N días.
+    """
+    help = 'Archiva por lotes las tareas completadas antiguas. Se puede interrumpir y relanzar.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.TASK_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--max-batches', type=int, default=None, help='Límite de lotes por base de datos')
+        parser.add_argument('--database', action='append', dest='databases', help='Limitar a estos alias')
+
+    def handle(self, *args, **options):
+        databases = options['databases'] or task_databases()
+        start = time.perf_counter()
+        total = 0
+        for using in databases:
+            archived = archive_completed_tasks(
+                days=options['days'],
+                batch_size=options['batch_size'],
+                databases=[using],
+                max_batches=options['max_batches'],
+            )
+            total += archived
+            self.stdout.write(f'{using}: {archived} tareas archivadas')
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} tareas archivadas en {time.perf_counter() - start:.1f}s'
+        ))
@@ -0,0 +1,71 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.utils.module_loading import import_string
+
+from config.middleware import APIBypassMixin
+
+
+def full_middleware():
+    """Reconstruir la lista de middleware original, sin el bypass de la API."""
+    paths = []
+    for path in settings.MIDDLEWARE:
+        middleware_class = import_string(path)
+        if issubclass(middleware_class, APIBypassMixin):
+            mro = middleware_class.__mro__
+            base = mro[mro.index(APIBypassMixin) + 1]
+            path = f'{base.__module__}.{base.__qualname__}'
+        paths.append(path)
+    return paths
+
+
+class Command(BaseCommand):
+    """
+    Medir el coste por petición del middleware completo frente al ligero.
+    """
+    help = 'Compara el pipeline de middleware completo con el ligero en rutas /api/.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/tasks/')
+        parser.add_argument('--token', default='', help='Access token JWT para peticiones autenticadas')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['HTTP_AUTHORIZATION'] = f"Bearer {options['token']}"
+
+        results = {}
+        for label, middleware in (('full', full_middleware()), ('lean', list(settings.MIDDLEWARE))):
+            results[label] = self._measure(middleware, options, headers)
+
+        full, lean = results['full'], results['lean']
+        saved = full - lean
+        self.stdout.write(f"Ruta: {options['path']} ({options['requests']} peticiones x {options['rounds']} rondas)")
+        self.stdout.write(f'  completo: {full:8.1f} µs/petición')
+        self.stdout.write(f'  ligero:   {lean:8.1f} µs/petición')
+        self.stdout.write(self.style.SUCCESS(
+            f'  ahorro:   {saved:8.1f} µs/petición ({saved / full * 100:.1f}%)'
+        ))
+
+    def _measure(self, middleware, options, headers):
+        """Retornar la mediana de µs por petición entre rondas."""
+        factory = RequestFactory()
+        with override_settings(MIDDLEWARE=middleware):
+            handler = BaseHandler()
+            handler.load_middleware()
+            for _ in range(min(200, options['requests'])):
+                handler.get_response(factory.get(options['path'], **headers))
+
+            rounds = []
+            for _ in range(options['rounds']):
+                start = time.perf_counter()
+                for _ in range(options['requests']):
+                    handler.get_response(factory.get(options['path'], **headers))
+                rounds.append((time.perf_counter() - start) / options['requests'] * 1e6)
+        return statistics.median(rounds)
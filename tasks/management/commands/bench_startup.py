@@ -0,0 +1,203 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Memoria del proceso. ru_maxrss no sirve en Linux: conserva el pico del
+# proceso padre a través del fork + exec.
+MEMORY = '''
+def memory_kb():
+    """Pico de RSS y, si /proc lo permite, memoria privada y compartida."""
+    values = {}
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    values['peak'] = int(line.split()[1])
+        with open('/proc/self/smaps_rollup') as rollup:
+            for line in rollup:
+                name, _, rest = line.partition(':')
+                if name in ('Private_Clean', 'Private_Dirty', 'Shared_Clean', 'Shared_Dirty'):
+                    key = 'private' if name.startswith('Private') else 'shared'
+                    values[key] = values.get(key, 0) + int(rest.split()[0])
+    except OSError:
+        pass
+    if 'peak' not in values:
+        import resource
+        values['peak'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return values
+'''
+
+# Se ejecuta en un intérprete nuevo: lo que cuesta arrancar un worker.
+# Modos: "boot" (arranque sin preload), "fork" y "freeze" (preload en un
+# maestro y memoria del worker tras el fork, sin y con gc.freeze()).
+CHILD = MEMORY + '''
+import gc, json, os, sys, time
+mode, paths = sys.argv[1], sys.argv[2:]
+if mode == 'freeze':
+    gc.disable()
+start = time.perf_counter()
+import django
+django.setup()
+setup = time.perf_counter()
+from django.urls import get_resolver, resolve
+get_resolver().url_patterns
+for path in paths:
+    resolve(path)
+urls = time.perf_counter()
+result = {
+    'setup': setup - start,
+    'urls': urls - setup,
+    'modules': len(sys.modules),
+    'docs': sorted(name for name in sys.modules if name.startswith('drf_spectacular')),
+    'memory': memory_kb(),
+}
+if mode != 'boot':
+    from config.preload import after_fork, before_fork, warm_up
+    warm_up()
+    result['warm_up'] = time.perf_counter() - urls
+    if mode == 'freeze':
+        before_fork()
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        if mode == 'freeze':
+            after_fork()
+        # Lo que hará el worker tarde o temprano: recolectar y atender peticiones.
+        gc.collect()
+        for path in paths:
+            resolve(path)
+        os.write(write, json.dumps(memory_kb()).encode())
+        os._exit(0)
+    os.close(write)
+    os.waitpid(pid, 0)
+    with os.fdopen(read) as pipe:
+        result['worker'] = json.loads(pipe.read())
+print(json.dumps(result))
+'''
+
+BASELINE = MEMORY + '''
+import json, sys
+print(json.dumps({'memory': memory_kb(), 'modules': len(sys.modules)}))
+'''
+
+
+def run_child(code, args=(), python_options=()):
+    env = {**os.environ, 'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings')}
+    result = subprocess.run(
+        [sys.executable, *python_options, '-c', code, *args],
+        capture_output=True, text=True, env=env, cwd=settings.BASE_DIR,
+    )
+    if result.returncode:
+        raise CommandError(result.stderr.strip())
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+
+def import_times(stderr):
+    """Tiempo de importación propio (``-X importtime``) sumado por paquete raíz."""
+    totals = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line.split(':', 1)[1].split('|')
+        totals[name.strip().split('.')[0]] += int(self_us)
+    return totals
+
+
+def megabytes(kb):
+    return f'{kb / 1024:6.1f} MB' if kb is not None else '     -'
+
+
+class Command(BaseCommand):
+    """
+    Informe de arranque de un worker: tiempo de importación y memoria.
+    """
+    help = (
+        'Mide en procesos nuevos el tiempo de importación, el RSS y la memoria '
+        'privada de un worker tras el fork con preload (con y sin gc.freeze()).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5)
+        parser.add_argument(
+            '--path', action='append', dest='paths',
+            help='Rutas a resolver tras cargar la URLconf (por defecto las de ambos montajes)',
+        )
+        parser.add_argument('--imports', type=int, default=10, help='Paquetes más lentos de importar a mostrar (0: ninguno)')
+        parser.add_argument('--json', action='store_true', help='Imprimir las medianas en JSON')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/api/tasks/', '/api/tasks-auth/tasks/', '/api/tasks-auth/users/me/']
+        baseline, _ = run_child(BASELINE)
+        report = {'baseline': baseline}
+        # Sin os.fork (Windows) solo se mide el arranque.
+        modes = ('boot', 'fork', 'freeze') if hasattr(os, 'fork') else ('boot',)
+        for mode in modes:
+            runs = [run_child(CHILD, [mode, *paths])[0] for _ in range(options['runs'])]
+            report[mode] = self._median(runs)
+            if mode == 'boot':
+                report['docs'] = runs[0]['docs']
+        if options['imports']:
+            _, stderr = run_child(CHILD, ['boot', *paths], python_options=['-X', 'importtime'])
+            report['imports'] = dict(import_times(stderr).most_common(options['imports']))
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self._print(report, options)
+
+    def _median(self, runs):
+        def median(values):
+            values = [value for value in values if value is not None]
+            return statistics.median(values) if values else None
+
+        result = {key: median(run.get(key) for run in runs) for key in ('setup', 'urls', 'warm_up', 'modules')}
+        for group in ('memory', 'worker'):
+            if group in runs[0]:
+                result[group] = {key: median(run[group].get(key) for run in runs) for key in runs[0][group]}
+        return result
+
+    def _print(self, report, options):
+        boot, base = report['boot'], report['baseline']
+        self.stdout.write(f"Arranque ({options['runs']} procesos por modo, mediana; {sys.executable}):")
+        self.stdout.write(f"  django.setup(): {boot['setup'] * 1000:8.1f} ms")
+        self.stdout.write(f"  URLconf:        {boot['urls'] * 1000:8.1f} ms")
+        if 'fork' in report:
+            self.stdout.write(f"  warm_up():      {report['fork']['warm_up'] * 1000:8.1f} ms (en el maestro con preload)")
+        self.stdout.write(f"  módulos:        {boot['modules']:8.0f} (intérprete vacío: {base['modules']})")
+        # drf_spectacular, .apps y .checks los carga INSTALLED_APPS; el resto, generar el esquema.
+        self.stdout.write(f"  drf-spectacular: {len(report['docs'])} módulos ({', '.join(report['docs'])})")
+        peak = boot['memory']['peak']
+        self.stdout.write(
+            f"  RSS máximo:     {megabytes(peak)} "
+            f"(intérprete vacío: {megabytes(base['memory']['peak']).strip()}, "
+            f"+{(peak - base['memory']['peak']) / 1024:.1f} MB)"
+        )
+
+        if 'fork' in report:
+            self._print_workers(report)
+
+        if report.get('imports'):
+            self.stdout.write('Importación por paquete (-X importtime, tiempo propio):')
+            for package, micros in report['imports'].items():
+                self.stdout.write(f'  {package:28} {micros / 1000:7.1f} ms')
+
+    def _print_workers(self, report):
+        self.stdout.write('Worker con preload, tras gc.collect() (privada: solo suya; compartida: con el maestro):')
+        for mode, label in (('fork', 'sin gc.freeze'), ('freeze', 'con gc.freeze')):
+            worker = report[mode]['worker']
+            self.stdout.write(
+                f"  {label}: privada {megabytes(worker.get('private'))}, "
+                f"compartida {megabytes(worker.get('shared'))}"
+            )
+        unfrozen, frozen = report['fork']['worker'].get('private'), report['freeze']['worker'].get('private')
+        if unfrozen is not None and frozen is not None:
+            self.stdout.write(self.style.SUCCESS(
+                f'  gc.freeze ahorra {(unfrozen - frozen) / 1024:.1f} MB por worker'
+            ))
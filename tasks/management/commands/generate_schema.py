@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from config.schema import RENDERERS, code_version, schema_cache
+
+
+class Command(BaseCommand):
+    """
+    Precalcular el esquema OpenAPI para la versión actual del código.
+    """
+    help = 'Genera el esquema OpenAPI y lo guarda en SCHEMA_CACHE_DIR.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-missing', action='store_true',
+            help='No regenerar si ya existe el esquema de esta versión del código'
+        )
+
+    def handle(self, *args, **options):
+        version = code_version()
+        if options['if_missing'] and all(schema_cache.load(fmt) is not None for fmt in RENDERERS):
+            self.stdout.write(f'El esquema de la versión {version} ya existe.')
+            return
+
+        start = time.perf_counter()
+        schema_cache.generate()
+        elapsed = time.perf_counter() - start
+        for fmt in RENDERERS:
+            rendered = schema_cache.get(fmt)
+            self.stdout.write(
+                f'{schema_cache.path(fmt)}: {len(rendered.content)} bytes '
+                f'({len(rendered.compressed)} gzip), ETag {rendered.etag}'
+            )
+        self.stdout.write(self.style.SUCCESS(f'Esquema {version} generado en {elapsed:.2f}s'))
@@ -0,0 +1,152 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from tasks.models import ArchivedTask, Task
+from tasks.sharding import allocate_task_ids, copy_tasks, shard_for_user, task_shards
+
+
+# Tareas y archivadas comparten ids: un id no puede repetirse en ninguna de las dos tablas.
+MODELS = (Task, ArchivedTask)
+
+
+class Command(BaseCommand):
+    """
+    Mover las tareas (y las archivadas) de cada usuario al shard que le corresponde.
+
+    Cada lote se copia al shard destino (conservando ids y fechas) y después
+    se borra del origen solo lo que quedó copiado. Si el comando se
+    interrumpe, volver a ejecutarlo continúa donde se quedó.
+
+    Los ids que en el destino ya usa otra fila (ids repetidos entre shards de
+    antes de ``allocate_task_ids``) se cambian antes en el origen por ids
+    nuevos del destino. Un usuario nunca queda repartido entre dos shards: si
+    tras moverlo queda alguna fila suya en el origen, el comando se aborta.
+    """
+    help = 'Copia por lotes las tareas y tareas archivadas que están en un shard distinto al de su usuario.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help='Limitar a estos user_id')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0, help='Pausa en segundos entre lotes')
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        shards = task_shards()
+        if not shards:
+            raise CommandError('TASK_SHARDS está vacío: no hay sharding configurado.')
+
+        total_moved = total_remapped = 0
+        for source in shards:
+            for user_id in self.users_on(source, options['users']):
+                target = shard_for_user(user_id)
+                if target == source:
+                    continue
+                if options['dry_run']:
+                    counts = [model.objects.using(source).filter(user_id=user_id).count() for model in MODELS]
+                    self.stdout.write(f'user {user_id}: {counts[0]} tareas y {counts[1]} archivadas {source} -> {target}')
+                    continue
+                moved, remapped = self.move_user(user_id, source, target, options)
+                total_moved += moved
+                total_remapped += len(remapped)
+                self.stdout.write(f'user {user_id}: {moved} tareas {source} -> {target}')
+                if remapped:
+                    self.stderr.write(
+                        f'user {user_id}: ids ocupados en {target} por otra fila, reasignados: {remapped}'
+                    )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_moved} tareas movidas, {total_remapped} ids reasignados'
+        ))
+
+    def users_on(self, source, users):
+        user_ids = set()
+        for model in MODELS:
+            queryset = model.objects.using(source).order_by().values_list('user_id', flat=True).distinct()
+            if users:
+                queryset = queryset.filter(user_id__in=users)
+            user_ids.update(queryset)
+        return sorted(user_ids)
+
+    def move_user(self, user_id, source, target, options):
+        remapped = {}
+        for model in MODELS:
+            remapped.update(self.remap_taken_ids(model, user_id, source, target, options['batch_size']))
+        moved = sum(self.copy_rows(model, user_id, source, target, options) for model in MODELS)
+
+        left = sum(model.objects.using(source).filter(user_id=user_id).count() for model in MODELS)
+        if left:
+            raise CommandError(
+                f'user {user_id}: {left} filas siguen en {source} tras moverlo a {target}; '
+                f'el usuario queda repartido, volver a ejecutar el comando.'
+            )
+        return moved, remapped
+
+    def remap_taken_ids(self, model, user_id, source, target, batch_size):
+        """
+        Dar ids nuevos del destino a las filas cuyo id ya usa otra fila en él.
+
+        El cambio se hace en el origen antes de copiar, así que interrumpir el
+        comando no deja copias duplicadas.
+        """
+        other = ArchivedTask if model is Task else Task
+        remapped = {}
+        last_pk = 0
+        while True:
+            pks = list(
+                model.objects.using(source)
+                .filter(user_id=user_id, pk__gt=last_pk)
+                .order_by('pk').values_list('pk', flat=True)[:batch_size]
+            )
+            if not pks:
+                return remapped
+            last_pk = pks[-1]
+            # El mismo id y el mismo usuario en la misma tabla es una copia de
+            # una ejecución interrumpida, no un conflicto.
+            taken = set(
+                model.objects.using(target).filter(pk__in=pks)
+                .exclude(user_id=user_id).values_list('pk', flat=True)
+            )
+            taken.update(other.objects.using(target).filter(pk__in=pks).values_list('pk', flat=True))
+            if not taken:
+                continue
+            new_ids = allocate_task_ids(target, len(taken))
+            with transaction.atomic(using=source):
+                for old_id, new_id in zip(sorted(taken), new_ids):
+                    model.objects.using(source).filter(pk=old_id).update(id=new_id)
+                    remapped[old_id] = new_id
+
+    def copy_rows(self, model, user_id, source, target, options):
+        moved = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.using(source)
+                .filter(user_id=user_id, pk__gt=last_pk)
+                .order_by('pk')[:options['batch_size']]
+            )
+            if not batch:
+                return moved
+            last_pk = batch[-1].pk
+            pks = [row.pk for row in batch]
+
+            with transaction.atomic(using=target):
+                copy_tasks(batch, using=target)
+            copied = set(
+                model.objects.using(target)
+                .filter(pk__in=pks, user_id=user_id)
+                .values_list('pk', flat=True)
+            )
+            with transaction.atomic(using=source):
+                model.objects.using(source).filter(pk__in=copied).delete()
+
+            if len(copied) < len(pks):
+                missing = sorted(set(pks) - copied)
+                raise CommandError(
+                    f'user {user_id}: {model._meta.verbose_name_plural} {missing} no se copiaron a {target}; '
+                    f'el usuario queda repartido, volver a ejecutar el comando.'
+                )
+            moved += len(copied)
+            if options['sleep']:
+                time.sleep(options['sleep'])
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from tasks.jobs import Worker, enqueue
+
+
+class Command(BaseCommand):
+    """
+    Worker de la cola de trabajos en segundo plano (ver tasks.jobs).
+    """
+    help = 'Ejecuta los trabajos encolados. Se pueden lanzar varios workers a la vez.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Trabajos simultáneos por worker')
+        parser.add_argument('--pool', choices=['thread', 'process', 'sync'], default='thread',
+                            help='process para trabajos de CPU; sync ejecuta en el hilo principal')
+        parser.add_argument('--visibility-timeout', type=int, default=None,
+                            help='Segundos hasta que otro worker retoma un trabajo no renovado')
+        parser.add_argument('--poll-interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help='Terminar cuando no queden trabajos listos')
+        parser.add_argument('--enqueue', metavar='FUNCIÓN', help='Encolar esta función (ruta) y salir')
+
+    def handle(self, *args, **options):
+        if options['enqueue']:
+            job = enqueue(options['enqueue'])
+            self.stdout.write(self.style.SUCCESS(f'Trabajo {job.pk} encolado'))
+            return
+
+        worker = Worker(
+            concurrency=options['concurrency'],
+            pool=options['pool'],
+            timeout=options['visibility_timeout'],
+            poll_interval=options['poll_interval'],
+        )
+        self.stdout.write(f'Worker {worker.name} ({options["pool"]} x {options["concurrency"]})')
+        try:
+            processed = worker.run(once=options['once'])
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Worker detenido'))
+            return
+        self.stdout.write(self.style.SUCCESS(f'{processed} trabajos procesados'))
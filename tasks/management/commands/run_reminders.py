@@ -0,0 +1,49 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from tasks.reminders import ReminderScheduler
+
+
+class Command(BaseCommand):
+    """
+    Enviar los recordatorios de due_date con una rueda de temporización.
+    """
+    help = 'Worker de recordatorios de vencimiento. Un solo proceso; se puede interrumpir y relanzar.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tick', type=float, default=1.0, help='Resolución en segundos')
+        parser.add_argument('--slots', type=int, default=3600, help='Casillas de la rueda (horizonte = tick * slots)')
+        parser.add_argument('--lead', type=float, default=settings.TASK_REMINDER_LEAD_SECONDS,
+                            help='Segundos de antelación respecto a due_date')
+        parser.add_argument('--refresh', type=float, default=5.0, help='Segundos entre lecturas de cambios')
+        parser.add_argument('--once', action='store_true', help='Cargar, enviar lo vencido y salir')
+
+    def handle(self, *args, **options):
+        now = time.time()
+        scheduler = ReminderScheduler(
+            now, tick=options['tick'], slots=options['slots'], lead=options['lead'],
+        )
+        loaded = scheduler.load_window(now)
+        self.stdout.write(f'{loaded} recordatorios programados hasta {scheduler.wheel.horizon:.0f}')
+        if options['once']:
+            sent = scheduler.tick(now)
+            self.stdout.write(self.style.SUCCESS(f'{len(sent)} recordatorios enviados'))
+            return
+
+        next_refresh = now + options['refresh']
+        try:
+            while True:
+                now = time.time()
+                if now >= next_refresh:
+                    scheduler.refresh_changes(now)
+                    scheduler.load_window(now)
+                    next_refresh = now + options['refresh']
+                sent = scheduler.tick(now)
+                if sent:
+                    self.stdout.write(f'{len(sent)} recordatorios enviados')
+                # Dormir hasta el siguiente tick.
+                time.sleep(max(0.0, options['tick'] - time.time() % options['tick']))
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Worker de recordatorios detenido'))
@@ -0,0 +1,175 @@
+import random
+import time
+from datetime import datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.sharding import allocate_task_ids, shard_for_user, task_shards
+
+
+STATUSES = (('pending', 35), ('in_progress', 20), ('completed', 45))
+PRIORITIES = (('low', 30), ('medium', 50), ('high', 20))
+VERBS = ('Revisar', 'Preparar', 'Enviar', 'Actualizar', 'Llamar a', 'Documentar', 'Probar', 'Planificar')
+NOUNS = ('informe', 'cliente', 'presupuesto', 'reunión', 'despliegue', 'factura', 'contrato', 'sprint')
+# Orden de las columnas en las filas generadas.
+COLUMNS = (
+    'user', 'title', 'description', 'status', 'priority',
+    'due_date', 'created_at', 'updated_at', 'completed_at',
+)
+
+
+class Command(BaseCommand):
+    """
+    Generar usuarios y tareas de prueba en volumen para benchmarks.
+
+    Con la misma ``--seed`` y la misma fecha ``--until`` se generan siempre
+    los mismos datos. Todos los usuarios comparten un hash de contraseña
+    calculado una sola vez.
+    """
+    help = 'Genera usuarios y tareas con bulk inserts por lotes (datos reproducibles con --seed).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--tasks', type=int, default=100000, help='Total de tareas')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--prefix', default='seed_', help='Prefijo de los usernames')
+        parser.add_argument('--password', default='seed-password', help='Contraseña de todos los usuarios')
+        parser.add_argument('--whales', type=float, default=0.01, help='Fracción de usuarios con muchas tareas')
+        parser.add_argument('--whale-share', type=float, default=0.5, help='Fracción de las tareas que reciben')
+        parser.add_argument('--days', type=int, default=365, help='Antigüedad máxima de las tareas')
+        parser.add_argument('--until', help='Fecha (YYYY-MM-DD) de la tarea más reciente; por defecto hoy')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['whales'] < 1 or not 0 <= options['whale_share'] < 1:
+            raise CommandError('--whales y --whale-share deben estar en [0, 1).')
+        if User.objects.filter(username__startswith=options['prefix']).exists():
+            raise CommandError(f"Ya hay usuarios con el prefijo {options['prefix']!r}: usa otro --prefix.")
+
+        rng = random.Random(options['seed'])
+        until = self.parse_until(options['until'])
+        start = time.perf_counter()
+
+        user_ids = self.create_users(options)
+        self.stdout.write(f'{len(user_ids)} usuarios en {time.perf_counter() - start:.1f}s')
+
+        created = self.create_tasks(rng, user_ids, until, options)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(user_ids)} usuarios y {created} tareas en {elapsed:.1f}s '
+            f'({created / elapsed:.0f} tareas/s)'
+        ))
+
+    def parse_until(self, value):
+        day = datetime.strptime(value, '%Y-%m-%d').date() if value else timezone.now().date()
+        return datetime.combine(day, datetime.min.time(), tzinfo=timezone.get_current_timezone())
+
+    def create_users(self, options):
+        """Crear los usuarios y retornar sus ids en orden."""
+        password = make_password(options['password'])
+        prefix = options['prefix']
+        batch_size = options['batch_size']
+        user_ids = []
+        for offset in range(0, options['users'], batch_size):
+            usernames = [f'{prefix}{index}' for index in range(offset, min(offset + batch_size, options['users']))]
+            User.objects.bulk_create([
+                User(username=username, email=f'{username}@example.com', password=password)
+                for username in usernames
+            ])
+            # Releer los ids: no todos los backends (MySQL) los retornan en bulk_create.
+            user_ids.extend(
+                User.objects.filter(username__in=usernames).order_by('pk').values_list('pk', flat=True)
+            )
+        return user_ids
+
+    def user_weights(self, user_ids, options):
+        """Pesos acumulados: unos pocos usuarios "ballena" concentran ``whale_share``."""
+        whales = round(len(user_ids) * options['whales'])
+        if not whales or whales == len(user_ids):
+            return None
+        whale_weight = options['whale_share'] / whales
+        rest_weight = (1 - options['whale_share']) / (len(user_ids) - whales)
+        cumulative = []
+        total = 0
+        for index in range(len(user_ids)):
+            total += whale_weight if index < whales else rest_weight
+            cumulative.append(total)
+        return cumulative
+
+    def create_tasks(self, rng, user_ids, until, options):
+        batch_size = options['batch_size']
+        weights = self.user_weights(user_ids, options)
+        statuses, status_weights = zip(*STATUSES)
+        priorities, priority_weights = zip(*PRIORITIES)
+        span = options['days'] * 86400
+        shards = {user_id: shard_for_user(user_id) or 'default' for user_id in user_ids}
+        adapters = {alias: connections[alias].ops.adapt_datetimefield_value for alias in set(shards.values())}
+        pending = {}
+        created = 0
+        next_report = 100000
+
+        for offset in range(0, options['tasks'], batch_size):
+            count = min(batch_size, options['tasks'] - offset)
+            owners = rng.choices(user_ids, cum_weights=weights, k=count)
+            for number, user_id in enumerate(owners, start=offset):
+                created_at = until - timedelta(seconds=rng.randrange(span))
+                status = rng.choices(statuses, status_weights)[0]
+                completed_at = None
+                if status == 'completed':
+                    completed_at = min(created_at + timedelta(seconds=rng.randrange(14 * 86400)), until)
+                due_date = None
+                if rng.random() < 0.6:
+                    due_date = created_at + timedelta(days=rng.randint(1, 30), hours=rng.randint(0, 23))
+                alias = shards[user_id]
+                adapt = adapters[alias]
+                pending.setdefault(alias, []).append((
+                    user_id,
+                    f'{rng.choice(VERBS)} {rng.choice(NOUNS)} #{number}',
+                    None if rng.random() < 0.5 else 'Tarea generada por seed_data',
+                    status,
+                    rng.choices(priorities, priority_weights)[0],
+                    adapt(due_date),
+                    adapt(created_at),
+                    adapt(completed_at or created_at),
+                    adapt(completed_at),
+                ))
+
+            for alias, tasks in pending.items():
+                if len(tasks) >= batch_size:
+                    created += self.insert(tasks, alias)
+                    pending[alias] = []
+            if created >= next_report:
+                self.stdout.write(f'  {created} tareas...')
+                next_report = created + 100000
+
+        for alias, tasks in pending.items():
+            if tasks:
+                created += self.insert(tasks, alias)
+        return created
+
+    def insert(self, rows, alias):
+        """
+        Insertar filas ya preparadas con ``executemany``.
+
+        ``bulk_create`` reemplazaría ``created_at``/``updated_at`` por la fecha
+        actual, y compilar el insert con el ORM cuesta más que generar los datos.
+        """
+        connection = connections[alias]
+        quote = connection.ops.quote_name
+        # Con sharding los ids salen de la secuencia del shard, no del autoincremento.
+        columns = ('id', *COLUMNS) if task_shards() else COLUMNS
+        sql = 'INSERT INTO %s (%s) VALUES (%s)' % (
+            quote(Task._meta.db_table),
+            ', '.join(quote(Task._meta.get_field(name).column) for name in columns),
+            ', '.join(['%s'] * len(columns)),
+        )
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            if task_shards():
+                rows = [(pk, *row) for pk, row in zip(allocate_task_ids(alias, len(rows)), rows)]
+            cursor.executemany(sql, rows)
+        return len(rows)
@@ -0,0 +1,65 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from config.slow_queries import SNAPSHOT_PREFIX, collect_samples, summarize
+
+
+class Command(BaseCommand):
+    """
+    Mostrar las consultas lentas muestreadas por los workers.
+    """
+    help = 'Muestra las consultas SQL lentas agrupadas por SQL normalizado y vista de origen.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--origin', help='Filtrar por vista de origen (prefijo), p. ej. api:api-task-by-status')
+        parser.add_argument('--limit', type=int, default=20)
+        parser.add_argument('--recent', action='store_true', help='Listar muestras individuales en vez del resumen')
+        parser.add_argument('--json', action='store_true', help='Salida en JSON')
+        parser.add_argument('--clear', action='store_true', help='Borrar las muestras volcadas a disco')
+
+    def handle(self, *args, **options):
+        directory = settings.METRICS_MULTIPROC_DIR
+        if not directory:
+            self.stderr.write(
+                'METRICS_MULTIPROC_DIR no está configurado: los workers no comparten sus muestras.'
+            )
+            return
+
+        if options['clear']:
+            removed = 0
+            for filename in os.listdir(directory):
+                if filename.startswith(f'{SNAPSHOT_PREFIX}-'):
+                    os.remove(os.path.join(directory, filename))
+                    removed += 1
+            self.stdout.write(self.style.SUCCESS(f'{removed} archivos de muestras eliminados'))
+            return
+
+        samples = collect_samples()
+        if options['origin']:
+            samples = [sample for sample in samples if sample['origin'].startswith(options['origin'])]
+        rows = samples if options['recent'] else summarize(samples)
+        rows = rows[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(rows, indent=2))
+            return
+
+        if not rows:
+            self.stdout.write('No hay consultas lentas registradas.')
+            return
+
+        for row in rows:
+            if options['recent']:
+                self.stdout.write(
+                    f"{row['duration_ms']:>10.1f} ms  rows={row['rows']}  "
+                    f"[{row['database']}] {row['origin']}"
+                )
+            else:
+                self.stdout.write(
+                    f"{row['total_ms']:>10.1f} ms total  {row['count']:>5}x  "
+                    f"max={row['max_ms']:.1f} ms  rows={row['max_rows']}  {row['origin']}"
+                )
+            self.stdout.write(f"    {row['sql']}")
@@ -0,0 +1,196 @@
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .archival import CombinedTaskList
+from . import idempotency, importing, jobs
+from .models import ArchivedTask
+from .serializers import JobSerializer, TaskTransitionSerializer
+from .transitions import TRANSITIONS, apply_transition
+
+
+class IdempotencyMixin:
+    """
+    Cabecera ``Idempotency-Key`` en las acciones de escritura del ViewSet.
+
+    Un reintento con la misma clave recibe la respuesta original (los mismos
+    bytes) sin volver a ejecutar la acción; ver tasks.idempotency.
+    """
+    idempotent_actions = ('create', 'mark_completed', 'start', 'reopen', 'transition', 'import_tasks', 'export')
+    idempotency_record = None
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        key = request.headers.get(idempotency.HEADER)
+        if not key or self.action not in self.idempotent_actions:
+            return
+        self.idempotency_record, response = idempotency.begin(request, key)
+        if response is not None:
+            # Igual que as_view() con los ViewSets: sustituir el handler del método.
+            setattr(self, request.method.lower(), lambda request, *args, **kwargs: response)
+
+    def extend_idempotency_lock(self):
+        """En acciones largas: mantener reservada la clave mientras siguen en curso."""
+        if self.idempotency_record is not None:
+            idempotency.extend(self.idempotency_record)
+
+    def handle_exception(self, exc):
+        try:
+            return super().handle_exception(exc)
+        except Exception:
+            if self.idempotency_record is not None:
+                idempotency.release(self.idempotency_record)
+                self.idempotency_record = None
+            raise
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.idempotency_record is not None:
+            idempotency.finish(self.idempotency_record, response)
+            self.idempotency_record = None
+        return response
+
+
+class IncludeArchivedMixin:
+    """
+    Soporte de ``?include_archived=true`` para los ViewSets de tareas.
+
+    Sin el parámetro solo se consulta la tabla activa, que es la pequeña.
+    """
+    archived_actions = ('list', 'by_status', 'by_priority')
+
+    def include_archived(self):
+        value = self.request.query_params.get('include_archived', '')
+        return self.action in self.archived_actions and value.lower() in ('1', 'true', 'yes')
+
+    def with_archived(self, queryset, **filters):
+        """Añadir las tareas archivadas que cumplan ``filters`` si se pidieron."""
+        if not self.include_archived():
+            return queryset
+        archived = ArchivedTask.objects.for_user(self.request.user).filter(**filters)
+        return CombinedTaskList(queryset, archived)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action == 'list':
+            return self.with_archived(queryset)
+        return queryset
+
+
+class TaskImportMixin:
+    """
+    Acción ``POST .../tasks/import/`` para importar un CSV o NDJSON.
+
+    El archivo va en el campo ``file`` (multipart); el formato se deduce de la
+    extensión o se indica con ``?file_format=csv|ndjson``. Django guarda en disco
+    las subidas grandes, y el archivo se procesa en lotes sin cargarlo entero.
+    """
+    import_batch_size = 500
+
+    @action(detail=False, methods=['post'], url_path='import', parser_classes=[MultiPartParser])
+    def import_tasks(self, request):
+        """Importar tareas desde un archivo CSV o NDJSON."""
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'file parameter required'}, status=status.HTTP_400_BAD_REQUEST)
+        fmt = request.query_params.get('file_format') or importing.detect_format(upload.name, upload.content_type)
+        if fmt not in importing.FORMATS:
+            return Response(
+                {'error': 'format must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        result = importing.import_tasks(
+            upload.file, request.user, fmt,
+            serializer_class=self.get_serializer_class(),
+            batch_size=self.import_batch_size,
+            # Con Idempotency-Key, que un reintento no la tome a mitad de la importación.
+            on_batch=getattr(self, 'extend_idempotency_lock', None),
+        )
+        if result['failed'] and not result['created']:
+            return Response(result, status=status.HTTP_400_BAD_REQUEST)
+        return Response(result, status=status.HTTP_201_CREATED)
+
+
+class TaskExportMixin:
+    """
+    Acción ``POST .../tasks/export/``: encola la exportación a NDJSON y
+    responde 202 con el trabajo, que se consulta en ``.../jobs/<id>/``.
+    """
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def export(self, request):
+        """Exportar las tareas del usuario en segundo plano."""
+        job = jobs.enqueue(jobs.export_tasks, user=request.user, user_id=request.user.pk)
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class TaskTransitionMixin:
+    """
+    Transiciones de estado (completar, empezar, reabrir) como un solo UPDATE
+    condicional; ver tasks.transitions.
+
+    Aplicar una transición a una tarea que ya está en el estado destino no
+    hace nada y retorna la tarea (mark_completed es idempotente); desde un
+    estado no permitido retorna 409.
+    """
+    def transition_task(self, request, pk, transition):
+        try:
+            # Un pk no numérico falla ya al construir el filtro.
+            queryset = self.get_queryset().filter(**{self.lookup_field: pk})
+            tasks = apply_transition(queryset, transition, user=request.user)
+        except (TypeError, ValueError):
+            raise NotFound()
+        if tasks:
+            task = tasks[0]
+        else:
+            # No cambió nada: no existe, ya estaba en el destino o no se permite.
+            task = queryset.first()
+            if task is None:
+                raise NotFound()
+            if task.status != TRANSITIONS[transition][0]:
+                return Response(
+                    {'error': f'cannot {transition} a task with status {task.status}'},
+                    status=status.HTTP_409_CONFLICT,
+                )
+        self.check_object_permissions(request, task)
+        return Response(self.get_serializer(task).data)
+
+    @action(detail=True, methods=['patch'], permission_classes=[IsAuthenticated])
+    def mark_completed(self, request, pk=None):
+        """Marcar una tarea como completada."""
+        return self.transition_task(request, pk, 'complete')
+
+    @action(detail=True, methods=['patch'], permission_classes=[IsAuthenticated])
+    def start(self, request, pk=None):
+        """Pasar una tarea pendiente a en progreso."""
+        return self.transition_task(request, pk, 'start')
+
+    @action(detail=True, methods=['patch'], permission_classes=[IsAuthenticated])
+    def reopen(self, request, pk=None):
+        """Volver a dejar pendiente una tarea completada o en progreso."""
+        return self.transition_task(request, pk, 'reopen')
+
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def transition(self, request):
+        """
+        Aplicar una transición a varias tareas: las de ``ids`` y/o las que
+        cumplan ``status``/``priority``, o todas con ``"all": true``. Las que
+        no la admiten se ignoran.
+        """
+        serializer = TaskTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        filters = {key: data[key] for key in ('status', 'priority') if key in data}
+        if 'ids' in data:
+            filters['pk__in'] = data['ids']
+
+        tasks = apply_transition(
+            self.get_queryset().filter(**filters), data['transition'], user=request.user
+        )
+        return Response({
+            'transition': data['transition'],
+            'updated': len(tasks),
+            'tasks': self.get_serializer(tasks, many=True).data,
+        })
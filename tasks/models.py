@@ -1,5 +1,53 @@
-from django.db import models
+from django.db import models, router
 from django.contrib.auth.models import User
+from django.utils import timezone
+
+from .sharding import allocate_task_ids, shard_for_user, task_shards
+
+
+class TaskQuerySet(models.QuerySet):
+    """
+    QuerySet de tareas consciente del sharding por usuario.
+    """
+    def for_user(self, user):
+        """Tareas de un usuario, leídas desde su shard."""
+        user_id = getattr(user, 'pk', user)
+        if isinstance(user, models.Model):
+            # Combinada con la del related manager (user.tasks), que asigna
+            # ``user`` a cada tarea: task.user no hace una consulta por fila.
+            # select_related no sirve: en los shards no está la tabla auth_user.
+            accessor = self.model._meta.get_field('user').remote_field.get_accessor_name()
+            queryset = self & getattr(user, accessor).all()
+        else:
+            queryset = self.filter(user_id=user_id)
+        alias = shard_for_user(user_id)
+        if alias is not None:
+            queryset = queryset.using(alias)
+        return queryset
+    
+    def create(self, **kwargs):
+        """
+        Crear la tarea en el shard de su usuario.
+        
+        ``QuerySet.create`` guarda con ``using=self.db`` y sin pista de
+        instancia, así que el router no llegaría a ver el usuario.
+        """
+        if self._db is None:
+            user_id = kwargs.get('user_id', getattr(kwargs.get('user'), 'pk', None))
+            alias = shard_for_user(user_id) if user_id is not None else None
+            if alias is not None:
+                return self.using(alias).create(**kwargs)
+        return super().create(**kwargs)
+    
+    def bulk_create(self, objs, *args, **kwargs):
+        """Con sharding, dar a las tareas nuevas ids de ``allocate_task_ids``."""
+        objs = list(objs)
+        if self.model._meta.auto_field is not None and task_shards():
+            new = [obj for obj in objs if obj.pk is None]
+            if new:
+                for obj, pk in zip(new, allocate_task_ids(self.db, len(new))):
+                    obj.pk = pk
+        return super().bulk_create(objs, *args, **kwargs)
 
 
 class Task(models.Model):
@@ -18,7 +66,8 @@ class Task(models.Model):
         ('high', 'Alta'),
     ]
     
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks')
+    # Sin constraint en la base: con sharding la tarea puede vivir en otra base que auth_user.
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tasks', db_constraint=False)
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True, null=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
@@ -26,11 +75,159 @@ class Task(models.Model):
     due_date = models.DateTimeField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Se mantiene en save(); lo usa el archivado de tareas completadas.
+    completed_at = models.DateTimeField(blank=True, null=True)
+    
+    objects = TaskQuerySet.as_manager()
     
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Tarea'
         verbose_name_plural = 'Tareas'
+        indexes = [
+            models.Index(fields=['status', 'completed_at'], name='task_status_completed_idx'),
+            # Recordatorios: ventana de vencimientos y cambios incrementales.
+            models.Index(fields=['due_date'], name='task_due_date_idx'),
+            models.Index(fields=['updated_at'], name='task_updated_at_idx'),
+            # Admin: orden por -created_at (con -pk), date_hierarchy y búsqueda "^title".
+            models.Index(fields=['created_at', 'id'], name='task_created_at_idx'),
+            models.Index(fields=['title'], name='task_title_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.user.username}"
+    
+    def save(self, *args, **kwargs):
+        """
+        Registrar cuándo se completó la tarea (mark_completed o actualización).
+        """
+        if self.status == 'completed':
+            if self.completed_at is None:
+                self.completed_at = timezone.now()
+        else:
+            self.completed_at = None
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'status' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'completed_at'}
+        if self._state.adding and self.pk is None and task_shards():
+            # Con sharding el id no sale del autoincremento del shard.
+            using = kwargs.get('using') or router.db_for_write(Task, instance=self)
+            self.pk = allocate_task_ids(using, 1)[0]
+            kwargs['force_insert'] = True
+        super().save(*args, **kwargs)
+
+
+class ArchivedTask(models.Model):
+    """
+    Tarea completada movida fuera de la tabla principal.
+    
+    Conserva el id y las fechas originales; ver tasks.archival.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_tasks', db_constraint=False)
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True, null=True)
+    status = models.CharField(max_length=20, choices=Task.STATUS_CHOICES)
+    priority = models.CharField(max_length=20, choices=Task.PRIORITY_CHOICES)
+    due_date = models.DateTimeField(blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    completed_at = models.DateTimeField(blank=True, null=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+    
+    objects = TaskQuerySet.as_manager()
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Tarea archivada'
+        verbose_name_plural = 'Tareas archivadas'
+        indexes = [
+            models.Index(fields=['user', '-created_at'], name='archivedtask_user_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} - {self.user.username}"
+
+
+class TaskIdSequence(models.Model):
+    """
+    Siguiente id de ``Task`` de un shard; una fila en cada shard (ver
+    tasks.sharding.allocate_task_ids).
+    """
+    next_id = models.BigIntegerField()
+    
+    class Meta:
+        verbose_name = 'Secuencia de ids de tareas'
+        verbose_name_plural = 'Secuencias de ids de tareas'
+    
+    def __str__(self):
+        return f"{self._state.db}: {self.next_id}"
+
+
+class Job(models.Model):
+    """
+    Trabajo en segundo plano de la cola en base de datos (ver tasks.jobs).
+    """
+    STATUS_CHOICES = [
+        ('queued', 'En cola'),
+        ('running', 'En ejecución'),
+        ('done', 'Terminado'),
+        ('failed', 'Fallido'),
+    ]
+    
+    # Ruta del callable, p. ej. 'tasks.jobs.export_tasks'.
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict, blank=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    # No se ejecuta antes de run_at (reintentos con espera).
+    run_at = models.DateTimeField(default=timezone.now)
+    # Mientras un worker lo ejecuta: si no termina antes de locked_until, otro lo retoma.
+    locked_until = models.DateTimeField(blank=True, null=True)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    result = models.JSONField(blank=True, null=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'Trabajo'
+        verbose_name_plural = 'Trabajos'
+        indexes = [
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class IdempotencyKey(models.Model):
+    """
+    Respuesta guardada de una escritura con ``Idempotency-Key`` (ver tasks.idempotency).
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    # sha256 de método, ruta y cuerpo: la misma clave con otra petición es un error.
+    fingerprint = models.CharField(max_length=64)
+    # Sin status_code la petición original aún no terminó.
+    status_code = models.PositiveSmallIntegerField(blank=True, null=True)
+    content = models.BinaryField(blank=True, default=b'')
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Clave de idempotencia'
+        verbose_name_plural = 'Claves de idempotencia'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'key'], name='idempotency_user_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['expires_at'], name='idempotency_expires_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.key} ({self.user_id})"
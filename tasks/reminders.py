@@ -0,0 +1,230 @@
+"""
+Recordatorios de ``Task.due_date``.
+
+``ReminderScheduler`` mantiene en memoria, en una ``TimingWheel``, los
+recordatorios que vencen dentro del horizonte de la rueda (``slots * tick``
+segundos). Los carga por ventanas con el índice de ``due_date`` y se
+mantiene al día leyendo solo las tareas modificadas (índice de
+``updated_at``). Cada tick visita un único slot, así que su coste no depende
+de cuántos recordatorios haya pendientes. Los recordatorios se entregan a un
+sink configurable (``TASK_REMINDER_SINK``).
+
+Se asume un solo proceso worker (``python manage.py run_reminders``).
+"""
+
+import logging
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .archival import task_databases
+from .models import Task
+
+
+logger = logging.getLogger(__name__)
+
+
+class TimingWheel:
+    """
+    Rueda de temporización con ``slots`` casillas de ``tick`` segundos.
+
+    Solo admite vencimientos dentro de una vuelta de la rueda, así que cada
+    casilla contiene entradas de un único tick y se vacía entera al pasar
+    por ella: programar, cancelar y avanzar un tick son O(1) (más las
+    entradas que vencen).
+    """
+    def __init__(self, tick=1.0, slots=3600, start=0.0):
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]
+        self.current = int(start // tick)
+        self.index = {}
+
+    @property
+    def horizon(self):
+        """Instante (timestamp) a partir del cual no se admiten entradas."""
+        return (self.current + len(self.slots)) * self.tick
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def schedule(self, key, when, payload):
+        """
+        Programar ``key`` para ``when`` (timestamp), reemplazando la anterior.
+
+        Lo vencido va al tick actual. Retorna False si ``when`` queda fuera del
+        horizonte.
+        """
+        tick = max(int(when // self.tick), self.current)
+        if tick >= self.current + len(self.slots):
+            return False
+        self.cancel(key)
+        self.slots[tick % len(self.slots)][key] = payload
+        self.index[key] = tick
+        return True
+
+    def cancel(self, key):
+        tick = self.index.pop(key, None)
+        if tick is not None:
+            self.slots[tick % len(self.slots)].pop(key, None)
+
+    def advance(self, now):
+        """Avanzar hasta ``now`` y retornar ``[(key, payload)]`` vencidos."""
+        target = int(now // self.tick)
+        expired = []
+        # Si el proceso se retrasó más de una vuelta, basta con vaciar cada casilla una vez.
+        self.current = max(self.current, target - len(self.slots) + 1)
+        while self.current <= target:
+            slot = self.slots[self.current % len(self.slots)]
+            if slot:
+                for key in slot:
+                    del self.index[key]
+                expired.extend(slot.items())
+                slot.clear()
+            self.current += 1
+        return expired
+
+
+class LoggingSink:
+    """Sink por defecto: escribe cada recordatorio en el log ``tasks.reminders``."""
+    def send(self, reminders):
+        for reminder in reminders:
+            logger.info(
+                'Recordatorio: tarea %(task_id)s "%(title)s" del usuario %(user_id)s vence %(due_date)s',
+                reminder,
+            )
+
+
+def get_sink():
+    return import_string(settings.TASK_REMINDER_SINK)()
+
+
+def _timestamp(value):
+    return value.timestamp()
+
+
+def _datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+class ReminderScheduler:
+    """
+    Programa recordatorios ``lead`` segundos antes de cada ``due_date``.
+
+    Todos los métodos reciben ``now`` (timestamp) para poder probarlos sin
+    esperar.
+    """
+    # Margen al releer cambios: commits con updated_at algo anterior al último visto.
+    change_overlap = 5.0
+
+    def __init__(self, now, sink=None, tick=1.0, slots=3600, lead=0.0, databases=None, chunk_size=2000):
+        self.wheel = TimingWheel(tick, slots, start=now)
+        self.sink = sink if sink is not None else get_sink()
+        self.lead = lead
+        self.databases = databases or task_databases()
+        self.chunk_size = chunk_size
+        # Vencimientos ya cargados: [inicio, loaded_until). La primera ventana
+        # empieza en ``now``: lo que vence antes de ``now + lead`` (p. ej. tras
+        # reiniciar el proceso) se recuerda en el primer tick.
+        self.loaded_until = now
+        self.changes_since = {using: now for using in self.databases}
+        # Recordatorios ya enviados (clave -> vencimiento), en orden de envío.
+        self.sent = {}
+
+    def pending(self):
+        return Task.objects.exclude(status='completed')
+
+    def _schedule(self, using, pk, due_date):
+        remind_at = _timestamp(due_date) - self.lead
+        return self.wheel.schedule((using, pk), remind_at, _timestamp(due_date))
+
+    def forget_sent(self, now):
+        """Olvidar los recordatorios enviados de tareas ya vencidas."""
+        while self.sent:
+            key = next(iter(self.sent))
+            if self.sent[key] >= now:
+                break
+            del self.sent[key]
+
+    def load_window(self, now):
+        """Cargar los vencimientos que acaban de entrar en el horizonte."""
+        self.forget_sent(now)
+        until = self.wheel.horizon + self.lead
+        if until <= self.loaded_until:
+            return 0
+        loaded = 0
+        for using in self.databases:
+            rows = (
+                self.pending().using(using)
+                .filter(due_date__gte=_datetime(self.loaded_until), due_date__lt=_datetime(until))
+                .order_by()
+                .values_list('pk', 'due_date')
+            )
+            for pk, due_date in rows.iterator(chunk_size=self.chunk_size):
+                loaded += self._schedule(using, pk, due_date)
+        self.loaded_until = until
+        return loaded
+
+    def refresh_changes(self, now):
+        """Aplicar las tareas modificadas desde la última lectura."""
+        changed = 0
+        for using in self.databases:
+            since = self.changes_since[using] - self.change_overlap
+            rows = (
+                Task.objects.using(using)
+                .filter(updated_at__gte=_datetime(since))
+                .order_by()
+                .values_list('pk', 'status', 'due_date', 'updated_at')
+            )
+            latest = self.changes_since[using]
+            for pk, status, due_date, updated_at in rows.iterator(chunk_size=self.chunk_size):
+                latest = max(latest, _timestamp(updated_at))
+                key = (using, pk)
+                due = _timestamp(due_date) if due_date is not None else None
+                if due is not None and self.sent.get(key) == due:
+                    # Otro cambio (p. ej. el título) de una tarea ya recordada.
+                    continue
+                if status == 'completed' or due is None or due < now or due >= self.loaded_until:
+                    # Sin recordatorio pendiente dentro de la ventana: las fechas
+                    # lejanas se cargarán con load_window cuando entren.
+                    self.wheel.cancel(key)
+                else:
+                    # Si ya pasó la hora del recordatorio, sale en el próximo tick.
+                    self._schedule(using, pk, due_date)
+                changed += 1
+            self.changes_since[using] = latest
+        return changed
+
+    def tick(self, now):
+        """Avanzar la rueda y enviar los recordatorios vencidos."""
+        expired = self.wheel.advance(now)
+        if not expired:
+            return []
+        by_database = {}
+        for (using, pk), due in expired:
+            by_database.setdefault(using, {})[pk] = due
+
+        reminders = []
+        for using, expected in by_database.items():
+            # Confirmar contra la base: la tarea pudo borrarse o cambiar desde el último refresh.
+            rows = (
+                self.pending().using(using)
+                .filter(pk__in=list(expected))
+                .values('pk', 'user_id', 'title', 'due_date')
+            )
+            for row in rows:
+                if _timestamp(row['due_date']) != expected[row['pk']]:
+                    continue
+                self.sent[(using, row['pk'])] = expected[row['pk']]
+                reminders.append({
+                    'task_id': row['pk'],
+                    'user_id': row['user_id'],
+                    'title': row['title'],
+                    'due_date': row['due_date'].isoformat(),
+                })
+        if reminders:
+            self.sink.send(reminders)
+        return reminders
@@ -0,0 +1,20 @@
+import time
+
+from rest_framework.renderers import JSONRenderer
+
+from config.metrics import current_request_stats
+
+
+class MeasuredJSONRenderer(JSONRenderer):
+    """
+    Renderizador JSON que acumula el tiempo de serialización de la petición.
+    """
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            stats = current_request_stats.get()
+            if stats is not None:
+                stats.serialization_time += time.perf_counter() - start
+
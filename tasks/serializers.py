@@ -1,9 +1,35 @@
+import time
+
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.contrib.auth.models import User
-from .models import Task
+from config.metrics import current_request_stats, serializing
+from .claims import ProfileRefreshToken
+from .models import Job, Task
+from .transitions import TRANSITIONS
+
+
+class MeasuredSerializerMixin:
+    """
+    Serializador que suma su ``to_representation`` al tiempo de serialización.
+
+    Solo cuenta la llamada más externa: los serializadores anidados ya están
+    dentro de la de su padre.
+    """
+    def to_representation(self, instance):
+        stats = current_request_stats.get()
+        if stats is None or serializing.get():
+            return super().to_representation(instance)
+        token = serializing.set(True)
+        start = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serialization_time += time.perf_counter() - start
+            serializing.reset(token)
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo User.
     """
@@ -28,7 +54,7 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class UserDetailSerializer(serializers.ModelSerializer):
+class UserDetailSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     """
     Serializador detallado del usuario con sus tareas.
     """
@@ -45,7 +71,19 @@ class UserDetailSerializer(serializers.ModelSerializer):
         return TaskSerializer(tasks, many=True).data
 
 
-class TaskSerializer(serializers.ModelSerializer):
+class UpdateFieldsMixin:
+    """
+    Al actualizar, escribir solo los campos recibidos (y ``updated_at``), para
+    no pisar un cambio de estado concurrente con valores leídos antes.
+    """
+    def update(self, instance, validated_data):
+        for attr, value in validated_data.items():
+            setattr(instance, attr, value)
+        instance.save(update_fields=[*validated_data, 'updated_at'])
+        return instance
+
+
+class TaskSerializer(MeasuredSerializerMixin, UpdateFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para el modelo Task.
     """
@@ -66,7 +104,7 @@ class TaskSerializer(serializers.ModelSerializer):
         return super().create(validated_data)
 
 
-class TaskUpdateSerializer(serializers.ModelSerializer):
+class TaskUpdateSerializer(UpdateFieldsMixin, serializers.ModelSerializer):
     """
     Serializador para actualizar tareas.
     """
@@ -75,10 +113,46 @@ class TaskUpdateSerializer(serializers.ModelSerializer):
         fields = ['title', 'description', 'status', 'priority', 'due_date']
 
 
-class TaskListSerializer(serializers.ModelSerializer):
+class TaskListSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
     """
     Serializador simplificado para listar tareas.
     """
     class Meta:
         model = Task
         fields = ['id', 'title', 'status', 'priority', 'due_date', 'created_at']
+
+
+class TaskTransitionSerializer(serializers.Serializer):
+    """
+    Transición de estado para varias tareas.
+    """
+    transition = serializers.ChoiceField(choices=list(TRANSITIONS))
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False, max_length=1000)
+    status = serializers.ChoiceField(choices=Task.STATUS_CHOICES, required=False)
+    priority = serializers.ChoiceField(choices=Task.PRIORITY_CHOICES, required=False)
+    # Sin ids, status ni priority la transición se aplica a todas las tareas:
+    # hay que pedirlo explícitamente.
+    all = serializers.BooleanField(required=False, default=False)
+
+    def validate(self, attrs):
+        if not attrs['all'] and not any(key in attrs for key in ('ids', 'status', 'priority')):
+            raise serializers.ValidationError('Indica ids, status o priority, o "all": true para todas las tareas.')
+        return attrs
+
+
+class JobSerializer(MeasuredSerializerMixin, serializers.ModelSerializer):
+    """
+    Estado de un trabajo en segundo plano.
+    """
+    class Meta:
+        model = Job
+        fields = ['id', 'name', 'status', 'attempts', 'max_attempts', 'run_at',
+                  'result', 'last_error', 'created_at', 'finished_at']
+        read_only_fields = fields
+
+
+class ProfileTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """
+    Login: tokens con el claim de perfil.
+    """
+    token_class = ProfileRefreshToken
@@ -0,0 +1,155 @@
+"""
+Particionado de ``Task`` entre varias bases de datos por ``user_id``.
+
+Todas las consultas de tareas están acotadas a un usuario, así que cada
+usuario vive entero en un shard de ``TASK_SHARDS``. El shard se elige con
+rendezvous hashing: añadir un shard solo mueve a los usuarios que pasan a
+corresponderle a él, el resto conserva su shard.
+
+Los ids de las tareas no salen del autoincremento de cada shard, que se
+repetiría entre shards, sino de ``allocate_task_ids``: así una tarea se
+puede mover de shard (o archivar) sin chocar con otra fila.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.db.models import Max, Prefetch, prefetch_related_objects
+from django.db.models.constants import OnConflict
+
+
+# Modelos que viven en el shard de su usuario.
+SHARDED_MODELS = {'tasks.Task', 'tasks.ArchivedTask'}
+
+def task_shards():
+    """Alias de las bases de datos con tareas; vacío si no hay sharding."""
+    return getattr(settings, 'TASK_SHARDS', ())
+
+
+def _weight(alias, user_id):
+    digest = hashlib.blake2b(f'{alias}:{user_id}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def shard_for_user(user_id, shards=None):
+    """
+    Retornar el alias del shard de un usuario, o ``None`` sin sharding.
+    """
+    shards = task_shards() if shards is None else shards
+    if not shards:
+        return None
+    if len(shards) == 1:
+        return shards[0]
+    return max(shards, key=lambda alias: _weight(alias, user_id))
+
+
+def allocate_task_ids(using, count):
+    """
+    Reservar ``count`` ids de ``Task`` para el shard ``using``.
+
+    Cada shard reparte ``offset + k * TASK_ID_STEP``, con ``offset`` su
+    posición en ``TASK_SHARDS``, así que dos shards nunca dan el mismo id. La
+    reserva va en la transacción del insert: si este se deshace, ella también.
+    """
+    from .models import TaskIdSequence
+
+    step = settings.TASK_ID_STEP
+    sequences = TaskIdSequence.objects.using(using)
+    with transaction.atomic(using=using):
+        sequence = sequences.select_for_update().filter(pk=1).first()
+        if sequence is None:
+            try:
+                with transaction.atomic(using=using):
+                    sequence = sequences.create(pk=1, next_id=_first_task_id(using, step))
+            except IntegrityError:
+                # Otro proceso creó la secuencia a la vez.
+                sequence = sequences.select_for_update().get(pk=1)
+        start = sequence.next_id
+        sequence.next_id = start + count * step
+        sequence.save(using=using, update_fields=['next_id'])
+    return range(start, sequence.next_id, step)
+
+
+def _first_task_id(using, step):
+    """Primer id del shard: mayor que cualquier id existente y con su offset."""
+    from .models import ArchivedTask, Task
+
+    shards = task_shards()
+    offset = shards.index(using)
+    if offset >= step:
+        raise ImproperlyConfigured(f'TASK_ID_STEP ({step}) debe ser mayor que el número de shards.')
+    top = 0
+    for alias in shards:
+        for model in (Task, ArchivedTask):
+            top = max(top, model.objects.using(alias).aggregate(top=Max('pk'))['top'] or 0)
+    return top + 1 + (offset - top - 1) % step
+
+
+def copy_tasks(tasks, using):
+    """
+    Insertar copias exactas de ``tasks`` (mismo id y fechas) en ``using``.
+
+    Sirve para ``Task`` y ``ArchivedTask``. ``bulk_create`` recalcula
+    ``created_at``/``updated_at``; el insert en modo raw conserva los valores
+    originales. Los ids ya existentes se ignoran, así que copiar dos veces el
+    mismo lote no duplica filas.
+    """
+    model = type(tasks[0])
+    fields = list(model._meta.local_concrete_fields)
+    model._base_manager.using(using)._insert(
+        tasks, fields=fields, raw=True, using=using, on_conflict=OnConflict.IGNORE,
+    )
+
+
+def prefetch_user_tasks(users):
+    """
+    ``prefetch_related('tasks')`` para una lista de usuarios, con una consulta
+    por shard: ``prefetch_related`` consultaría todos en el shard del primero.
+    """
+    from .models import Task
+
+    groups = {}
+    for user in users:
+        groups.setdefault(shard_for_user(user.pk), []).append(user)
+    for alias, group in groups.items():
+        queryset = Task.objects.all() if alias is None else Task.objects.using(alias)
+        prefetch_related_objects(group, Prefetch('tasks', queryset=queryset))
+
+
+class TaskShardRouter:
+    """
+    Router que envía las tareas (y las archivadas) al shard de su usuario.
+
+    Las consultas sin pista de instancia (``Task.objects.filter(...)``) no
+    saben a qué usuario pertenecen: hay que usar ``Task.objects.for_user()``.
+    Para el resto de modelos el router no opina y decide el siguiente.
+    """
+    def _shard(self, model, **hints):
+        if model._meta.label not in SHARDED_MODELS or not task_shards():
+            return None
+        instance = hints.get('instance')
+        if isinstance(instance, User):
+            return shard_for_user(instance.pk)
+        user_id = getattr(instance, 'user_id', None)
+        if user_id is not None:
+            return shard_for_user(user_id)
+        return None
+
+    db_for_read = _shard
+    db_for_write = _shard
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Task.user apunta a auth_user en default aunque la tarea esté en otro shard.
+        labels = {obj1._meta.label, obj2._meta.label}
+        if task_shards() and User._meta.label in labels and labels & SHARDED_MODELS:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Los shards distintos de default solo guardan tablas de la app tasks.
+        if db != 'default' and db in task_shards():
+            return app_label == 'tasks'
+        return None
@@ -0,0 +1,40 @@
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .claims import forget_version, remember_version, task_summaries
+from .models import ArchivedTask, Task
+from .sharding import shard_for_user
+
+
+@receiver(pre_delete, sender=User)
+def delete_sharded_tasks(sender, instance, using, **kwargs):
+    """
+    Borrar las tareas del usuario que viven en un shard distinto al suyo.
+
+    El borrado en cascada de Django solo alcanza la base del usuario.
+    """
+    alias = shard_for_user(instance.pk)
+    if alias is not None and alias != using:
+        Task.objects.for_user(instance).delete()
+        ArchivedTask.objects.for_user(instance).delete()
+
+
+@receiver(post_save, sender=User)
+def bump_profile_version(sender, instance, **kwargs):
+    """
+    Los tokens emitidos con el perfil anterior dejan de servir ``me`` desde el claim.
+    """
+    remember_version(instance)
+
+
+@receiver(post_delete, sender=User)
+def forget_profile_version(sender, instance, **kwargs):
+    """Sin versión en la caché, ``me`` lee el usuario borrado y responde 401."""
+    forget_version(instance.pk)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_summary(sender, instance, **kwargs):
+    task_summaries.invalidate(instance.user_id)
@@ -0,0 +1,113 @@
+"""
+Presupuestos de rendimiento por endpoint para los tests.
+
+Cada ``Budget`` fija el máximo de consultas SQL de una petición y, si se
+indica, su latencia máxima como múltiplo de la latencia de una petición de
+referencia medida en el mismo proceso, de modo que el test no depende de lo
+rápida que sea la máquina de CI. Con ``PERF_LATENCY_BUDGETS=0`` solo se
+comprueban las consultas.
+"""
+
+import os
+import statistics
+import time
+from contextlib import ExitStack
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+
+LATENCY_BUDGETS = os.environ.get('PERF_LATENCY_BUDGETS', '1') != '0'
+
+
+class Budget:
+    """
+    Presupuesto de un endpoint.
+
+    ``path`` y ``data`` se formatean/llaman con el contexto del test (ids de
+    las tareas, etc.); ``latency`` es el múltiplo permitido de la referencia.
+    """
+    def __init__(self, name, method, path, queries, latency=None, data=None, status=200, format='json'):
+        self.name = name
+        self.method = method
+        self.path = path
+        self.queries = queries
+        self.latency = latency
+        self.data = data
+        self.status = status
+        self.format = format
+
+    def request(self, client, context):
+        data = self.data(context) if callable(self.data) else self.data
+        return getattr(client, self.method)(self.path.format(**context), data, format=self.format)
+
+
+def seed(**options):
+    """Cargar datos con el comando ``seed_data`` (mismos datos en cada ejecución)."""
+    defaults = {
+        'users': 40, 'tasks': 2000, 'whales': 0.05, 'whale_share': 0.5,
+        'batch_size': 1000, 'seed': 7, 'until': '2026-01-01', 'stdout': StringIO(),
+    }
+    call_command('seed_data', **{**defaults, **options})
+
+
+class EndpointBudgetMixin:
+    """
+    Mixin de ``TestCase`` para comprobar una lista de ``Budget``.
+    """
+    # Petición de referencia para las latencias relativas.
+    baseline = None
+    timing_rounds = 9
+
+    def timed(self, budget, client, context):
+        start = time.perf_counter()
+        budget.request(client, context)
+        return time.perf_counter() - start
+
+    def latency_ratio(self, budget, client, context):
+        """
+        Mediana de la latencia del endpoint dividida por la de la referencia.
+
+        Las dos peticiones se alternan para que el ruido de la máquina (otros
+        procesos, frecuencia de la CPU) afecte por igual a ambas.
+        """
+        budget.request(client, context)
+        reference, timings = [], []
+        for _ in range(self.timing_rounds):
+            reference.append(self.timed(self.baseline, client, context))
+            timings.append(self.timed(budget, client, context))
+        return statistics.median(timings) / statistics.median(reference)
+
+    def count_queries(self, budget, client, context):
+        with ExitStack() as stack:
+            contexts = [
+                stack.enter_context(CaptureQueriesContext(connections[alias]))
+                for alias in sorted(self.databases)
+            ]
+            response = budget.request(client, context)
+        queries = [query['sql'] for capture in contexts for query in capture.captured_queries]
+        return response, queries
+
+    def assertBudgets(self, budgets, client, context):
+        for budget in budgets:
+            with self.subTest(endpoint=budget.name):
+                response, queries = self.count_queries(budget, client, context)
+                self.assertEqual(
+                    response.status_code, budget.status,
+                    f'{budget.name}: {getattr(response, "data", response.content)}',
+                )
+                self.assertLessEqual(
+                    len(queries), budget.queries,
+                    f'{budget.name}: {len(queries)} consultas (presupuesto {budget.queries}):\n'
+                    + '\n'.join(queries),
+                )
+                if not LATENCY_BUDGETS or self.baseline is None or budget.latency is None:
+                    continue
+                ratio = self.latency_ratio(budget, client, context)
+                if ratio > budget.latency:
+                    self.fail(
+                        f'{budget.name}: {ratio:.1f}x la latencia de {self.baseline.path} '
+                        f'(presupuesto {budget.latency}x)'
+                    )
@@ -1,3 +1,1207 @@
-from django.test import TestCase
+import gc
+import gzip
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from io import BytesIO, StringIO
+from itertools import count
+from unittest.mock import patch
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework.viewsets import ViewSetMixin
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import views as api_views
+from config.db_routers import PrimaryReplicaRouter, RoutingState, routing_state
+from config.preload import after_fork, before_fork
+from config.schema import code_version, schema_cache
+from . import idempotency, jobs
+from .claims import task_summaries
+from .importing import import_tasks
+from .admin import DateProbeQuerySet, EstimatedCountPaginator
+from .archival import CombinedTaskList, archive_batch, archive_completed_tasks
+from .models import ArchivedTask, IdempotencyKey, Job, Task
+from .reminders import ReminderScheduler, TimingWheel
+from .serializers import TaskSerializer
+from .sharding import shard_for_user
+from .testing import Budget, EndpointBudgetMixin, seed
+from .transitions import apply_transition, supports_update_returning
+from .views import JobViewSet, TaskViewSet, UserViewSet
+
+
+class ReplicaRoutingTests(TestCase):
+    """
+    Enrutado primario/réplica con dos bases SQLite (config.test_settings).
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='ana', password='secreto123')
+        # La réplica no se replica sola en los tests: copiar el usuario.
+        User.objects.using('replica').create(
+            id=self.user.id, username='ana', password=self.user.password
+        )
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+
+    def test_outside_requests_use_primary(self):
+        self.assertEqual(PrimaryReplicaRouter().db_for_read(Task), 'default')
+
+    def test_safe_request_reads_from_replica(self):
+        token = routing_state.set(RoutingState(use_replica=True))
+        try:
+            self.assertEqual(PrimaryReplicaRouter().db_for_read(Task), 'replica')
+        finally:
+            routing_state.reset(token)
+
+    def test_list_is_served_from_replica(self):
+        Task.objects.using('replica').create(user_id=self.user.id, title='En réplica')
+        Task.objects.create(user=self.user, title='Solo en primario')
+
+        response = self.client.get('/api/tasks/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([task['title'] for task in response.data['results']], ['En réplica'])
+
+    def test_user_reads_own_writes_after_creating(self):
+        response = self.client.post('/api/tasks/', {'title': 'Nueva'}, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get('/api/tasks/')
+
+        self.assertEqual([task['title'] for task in response.data['results']], ['Nueva'])
+
+    def test_pin_only_affects_the_writer(self):
+        other = User.objects.create_user(username='beto', password='secreto123')
+        User.objects.using('replica').create(id=other.id, username='beto', password=other.password)
+        Task.objects.using('replica').create(user_id=other.id, title='En réplica')
+        self.client.post('/api/tasks/', {'title': 'Nueva'}, format='json')
+
+        other_client = APIClient()
+        other_client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(other).access_token}'
+        )
+        response = other_client.get('/api/tasks/')
+
+        self.assertEqual([task['title'] for task in response.data['results']], ['En réplica'])
+
+    def test_registered_user_reads_from_primary(self):
+        # 'nuevo' aún no llegó a la réplica: leerlo de ella daría 401.
+        response = self.client.post('/api/tasks-auth/auth/register/', {
+            'username': 'nuevo', 'password': 'secreto123',
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        response = client.get('/api/users/me/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['username'], 'nuevo')
+
+    def test_login_pins_the_user(self):
+        User.objects.create_user(username='carla', password='secreto123')
+        response = APIClient().post('/api/tasks-auth/auth/login/', {
+            'username': 'carla', 'password': 'secreto123',
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(client.get('/api/tasks/').status_code, 200)
+
+    @override_settings(DATABASE_REPLICAS=['replica', 'shard_1'])
+    def test_one_replica_per_request(self):
+        token = routing_state.set(RoutingState(use_replica=True))
+        try:
+            with patch('config.db_routers.random.choice', side_effect=['replica', 'shard_1']):
+                router = PrimaryReplicaRouter()
+                self.assertEqual([router.db_for_read(Task), router.db_for_read(User)], ['replica', 'replica'])
+        finally:
+            routing_state.reset(token)
+
+
+SHARDS = ['default', 'shard_1', 'shard_2']
+
+
+@override_settings(TASK_SHARDS=SHARDS, DATABASE_REPLICAS=[])
+class TaskShardingTests(TestCase):
+    """
+    Sharding de tareas por user_id con tres bases SQLite.
+    """
+    databases = {'default', 'shard_1', 'shard_2'}
+
+    def _user_on(self, alias):
+        """Crear usuarios hasta obtener uno cuyo shard sea ``alias``."""
+        while True:
+            user = User.objects.create_user(username=f'user{User.objects.count()}', password='secreto123')
+            if shard_for_user(user.pk) == alias:
+                return user
+
+    def test_mapping_is_stable_when_adding_a_shard(self):
+        before = {user_id: shard_for_user(user_id, SHARDS[:2]) for user_id in range(1, 2001)}
+        after = {user_id: shard_for_user(user_id, SHARDS) for user_id in range(1, 2001)}
+
+        moved = [user_id for user_id in before if before[user_id] != after[user_id]]
+
+        self.assertTrue(all(after[user_id] == 'shard_2' for user_id in moved))
+        self.assertLess(len(moved), 2000 * 0.45)
+
+    def test_api_writes_and_reads_from_the_user_shard(self):
+        user = self._user_on('shard_1')
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+
+        response = client.post('/api/tasks/', {'title': 'En shard'}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Task.objects.using('shard_1').filter(title='En shard').exists())
+        self.assertFalse(Task.objects.using('default').filter(title='En shard').exists())
+
+        response = client.get('/api/tasks/')
+        self.assertEqual([task['title'] for task in response.data['results']], ['En shard'])
+
+        task_id = response.data['results'][0]['id']
+        response = client.patch(f'/api/tasks/{task_id}/mark_completed/')
+        self.assertEqual(response.data['status'], 'completed')
+
+    def test_for_user_reads_the_shard_with_the_known_user(self):
+        user, other = self._user_on('shard_1'), self._user_on('shard_1')
+        Task.objects.create(user=user, title='Suya')
+        Task.objects.create(user=other, title='Ajena')
+
+        tasks = list(Task.objects.filter(status='pending').for_user(user))
+        self.assertEqual([task.title for task in tasks], ['Suya'])
+        with self.assertNumQueries(0, using='default'):
+            self.assertIs(tasks[0].user, user)
+        self.assertEqual(ArchivedTask.objects.for_user(user).db, 'shard_1')
+        self.assertEqual(list(Task.objects.for_user(user.pk).values_list('title', flat=True)), ['Suya'])
+
+    def test_rebalance_moves_tasks_in_batches_preserving_ids_and_dates(self):
+        user = self._user_on('shard_2')
+        with override_settings(TASK_SHARDS=[]):
+            for index in range(5):
+                Task.objects.create(user=user, title=f'Tarea {index}')
+        original = {task.pk: task.created_at for task in Task.objects.filter(user=user)}
+
+        call_command('rebalance_task_shards', batch_size=2, stdout=StringIO())
+
+        self.assertFalse(Task.objects.using('default').filter(user=user).exists())
+        moved = {task.pk: task.created_at for task in Task.objects.using('shard_2').filter(user=user)}
+        self.assertEqual(moved, original)
+
+    def test_task_ids_are_unique_across_shards(self):
+        ids = {}
+        for alias in SHARDS:
+            user = self._user_on(alias)
+            created = [Task.objects.create(user=user, title='Una').pk]
+            created += [task.pk for task in Task.objects.db_manager(alias).bulk_create([Task(user=user, title='Otra')])]
+            response = self.client.post('/api/tasks/', {'title': 'API'}, format='json',
+                                        HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+            created.append(response.data['id'])
+            ids[alias] = created
+        for index, alias in enumerate(SHARDS):
+            self.assertEqual({pk % settings.TASK_ID_STEP for pk in ids[alias]}, {index})
+            self.assertEqual(set(Task.objects.using(alias).values_list('pk', flat=True)), set(ids[alias]))
+
+    def test_rebalance_remaps_colliding_ids_and_moves_archived_tasks(self):
+        user = self._user_on('shard_2')
+        other = self._user_on('shard_2')
+        with override_settings(TASK_SHARDS=[]):
+            # Autoincremento por shard de antes de allocate_task_ids: los ids se repiten.
+            mine = [Task.objects.create(user=user, title=f'Mía {index}') for index in range(3)]
+            taken = Task.objects.using('shard_2').create(user=other, title='Ajena')
+        ArchivedTask.objects.using('default').create(
+            id=mine[-1].pk + 1, user=user, title='Archivada', status='completed', priority='low',
+            created_at=timezone.now(), updated_at=timezone.now(),
+        )
+        ArchivedTask.objects.using('shard_2').create(
+            id=mine[1].pk, user=other, title='Ajena archivada', status='completed', priority='low',
+            created_at=timezone.now(), updated_at=timezone.now(),
+        )
+        self.assertEqual(taken.pk, mine[0].pk)
+
+        err = StringIO()
+        call_command('rebalance_task_shards', batch_size=2, stdout=StringIO(), stderr=err)
+
+        for model in (Task, ArchivedTask):
+            self.assertFalse(model.objects.using('default').filter(user=user).exists())
+        titles = sorted(Task.objects.using('shard_2').filter(user=user).values_list('title', flat=True))
+        self.assertEqual(titles, ['Mía 0', 'Mía 1', 'Mía 2'])
+        self.assertEqual(ArchivedTask.objects.using('shard_2').get(user=user).title, 'Archivada')
+        self.assertEqual(Task.objects.using('shard_2').get(pk=taken.pk).title, 'Ajena')
+        self.assertIn('reasignados', err.getvalue())
+        self.assertEqual(Task.objects.using('shard_2').get(user=user, title='Mía 2').pk, mine[2].pk)
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(user).access_token}')
+        response = client.get('/api/tasks/?include_archived=true')
+        self.assertEqual(response.data['count'], 4)
+
+    def test_rebalance_aborts_instead_of_splitting_a_user(self):
+        user = self._user_on('shard_2')
+        with override_settings(TASK_SHARDS=[]):
+            Task.objects.create(user=user, title='Atascada')
+
+        with patch('tasks.management.commands.rebalance_task_shards.copy_tasks'):
+            with self.assertRaisesMessage(CommandError, 'queda repartido'):
+                call_command('rebalance_task_shards', stdout=StringIO())
+        self.assertTrue(Task.objects.using('default').filter(user=user).exists())
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class TaskTransitionTests(TestCase):
+    """
+    Transiciones de estado como un UPDATE condicional.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='secreto123')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+        self.task = Task.objects.create(user=self.user, title='Tarea')
+
+    def test_complete_is_a_single_update_returning_the_task(self):
+        with self.assertNumQueries(1):
+            tasks = apply_transition(Task.objects.for_user(self.user), 'complete', user=self.user)
+
+        self.assertEqual([task.pk for task in tasks], [self.task.pk])
+        self.assertEqual(tasks[0].status, 'completed')
+        self.assertIsNotNone(tasks[0].completed_at)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.completed_at, tasks[0].completed_at)
+
+    def test_fallback_without_returning(self):
+        done = Task.objects.create(user=self.user, title='Hecha', status='completed')
+        with patch('tasks.transitions.supports_update_returning', return_value=False):
+            with CaptureQueriesContext(connection) as queries:
+                tasks = apply_transition(Task.objects.for_user(self.user), 'start', user=self.user)
+
+        self.assertEqual([task.pk for task in tasks], [self.task.pk])
+        self.assertEqual(tasks[0].status, 'in_progress')
+        # Los pks, un UPDATE condicional y la relectura; sin SELECT ... FOR UPDATE.
+        self.assertEqual([query['sql'].split()[0] for query in queries], ['SELECT', 'UPDATE', 'SELECT'])
+        self.assertNotIn('FOR UPDATE', queries[0]['sql'])
+        self.assertIn('"status" IN', queries[1]['sql'])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'in_progress')
+        done.refresh_from_db()
+        self.assertEqual(done.status, 'completed')
+
+        with patch('tasks.transitions.supports_update_returning', return_value=False):
+            with self.assertNumQueries(1):
+                self.assertEqual(apply_transition(Task.objects.for_user(self.user), 'start'), [])
+
+    def test_bulk_status_filter_without_returning(self):
+        Task.objects.create(user=self.user, title='Otra')
+        with patch('tasks.transitions.supports_update_returning', return_value=False):
+            response = self.client.post(
+                '/api/tasks/transition/', {'transition': 'complete', 'status': 'pending'}, format='json'
+            )
+
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual([task['status'] for task in response.data['tasks']], ['completed', 'completed'])
+        self.assertEqual(set(Task.objects.values_list('status', flat=True)), {'completed'})
+
+    def test_update_returning_capability_by_vendor(self):
+        self.assertEqual(supports_update_returning(connection), sqlite3.sqlite_version_info >= (3, 35))
+        for vendor in ('mysql', 'oracle'):
+            with patch.object(connection, 'vendor', vendor):
+                self.assertFalse(supports_update_returning(connection))
+
+    def test_non_numeric_pk_is_not_found(self):
+        for url in (
+            '/api/tasks/abc/mark_completed/',
+            '/api/tasks/abc/start/',
+            '/api/tasks-auth/tasks/abc/start/',
+            '/api/tasks-auth/tasks/abc/reopen/',
+            '/api/tasks/abc/',
+        ):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.patch(url).status_code, 404)
+
+    def test_mark_completed_is_idempotent(self):
+        url = f'/api/tasks/{self.task.pk}/mark_completed/'
+        first = self.client.patch(url)
+        second = self.client.patch(url)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.data['status'], 'completed')
+        self.assertEqual(second.data['updated_at'], first.data['updated_at'])
+
+    def test_invalid_transition_conflicts(self):
+        self.client.patch(f'/api/tasks/{self.task.pk}/mark_completed/')
+
+        response = self.client.patch(f'/api/tasks-auth/tasks/{self.task.pk}/start/')
+
+        self.assertEqual(response.status_code, 409)
+        response = self.client.patch(f'/api/tasks-auth/tasks/{self.task.pk}/reopen/')
+        self.assertEqual(response.data['status'], 'pending')
+        self.task.refresh_from_db()
+        self.assertIsNone(self.task.completed_at)
+
+    def test_other_users_task_is_not_found(self):
+        other = User.objects.create_user(username='beto', password='secreto123')
+        task = Task.objects.create(user=other, title='Ajena')
+
+        response = self.client.patch(f'/api/tasks/{task.pk}/mark_completed/')
+
+        self.assertEqual(response.status_code, 404)
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'pending')
+
+    def test_bulk_transition_only_touches_matching_tasks(self):
+        urgent = Task.objects.create(user=self.user, title='Urgente', priority='high')
+        done = Task.objects.create(user=self.user, title='Hecha', priority='high', status='completed')
+
+        response = self.client.post(
+            '/api/tasks/transition/', {'transition': 'start', 'priority': 'high'}, format='json'
+        )
+
+        self.assertEqual(response.data['updated'], 1)
+        self.assertEqual([task['id'] for task in response.data['tasks']], [urgent.pk])
+        done.refresh_from_db()
+        self.assertEqual(done.status, 'completed')
+
+    def test_bulk_transition_without_filters_requires_all(self):
+        response = self.client.post('/api/tasks/transition/', {'transition': 'complete'}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, 'pending')
+
+        response = self.client.post('/api/tasks/transition/', {'transition': 'complete', 'all': True}, format='json')
+        self.assertEqual(response.data['updated'], 1)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class ArchivalTests(TestCase):
+    """
+    Archivado por lotes y ``?include_archived`` (tasks.archival).
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='secreto123')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+        self.now = timezone.now()
+
+    def task(self, title, days_ago, status='completed', completed_days_ago=None):
+        task = Task.objects.create(
+            user=self.user, title=title, status=status,
+            completed_at=self.now - timedelta(days=completed_days_ago) if completed_days_ago is not None else None,
+        )
+        Task.objects.filter(pk=task.pk).update(created_at=self.now - timedelta(days=days_ago))
+        task.refresh_from_db()
+        return task
+
+    def test_batch_moves_only_old_completed_tasks(self):
+        old = self.task('Vieja', 90, completed_days_ago=60)
+        self.task('Reciente', 5, completed_days_ago=1)
+        self.task('Pendiente', 90, status='pending')
+
+        archived, cursor = archive_batch(self.now - timedelta(days=30), 10, 'default')
+
+        self.assertEqual((archived, cursor), (1, None))
+        self.assertEqual(sorted(Task.objects.values_list('title', flat=True)), ['Pendiente', 'Reciente'])
+        row = ArchivedTask.objects.get()
+        self.assertEqual((row.pk, row.created_at, row.completed_at), (old.pk, old.created_at, old.completed_at))
+
+    def test_conflicting_id_stays_active_and_later_batches_continue(self):
+        tasks = [self.task(f'Vieja {index}', 90, completed_days_ago=60) for index in range(5)]
+        other = User.objects.create_user(username='otro', password='secreto123')
+        ArchivedTask.objects.create(
+            id=tasks[0].pk, user=other, title='Ajena', status='completed', priority='low',
+            created_at=self.now, updated_at=self.now,
+        )
+
+        with self.assertLogs('tasks.archival', 'WARNING') as logs:
+            archived = archive_completed_tasks(days=30, batch_size=2)
+
+        self.assertEqual(archived, 4)
+        self.assertIn(str(tasks[0].pk), logs.output[0])
+        self.assertEqual(list(Task.objects.values_list('pk', flat=True)), [tasks[0].pk])
+        self.assertEqual(ArchivedTask.objects.get(pk=tasks[0].pk).title, 'Ajena')
+        self.assertEqual(ArchivedTask.objects.filter(user=self.user).count(), 4)
+
+    def test_command_output(self):
+        for index in range(3):
+            self.task(f'Vieja {index}', 90, completed_days_ago=60)
+        out = StringIO()
+        call_command('archive_tasks', days=30, batch_size=2, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'default: 3 tareas archivadas')
+        self.assertTrue(lines[1].startswith('3 tareas archivadas en '))
+
+        out = StringIO()
+        call_command('archive_tasks', days=30, stdout=out)
+        self.assertEqual(out.getvalue().splitlines()[0], 'default: 0 tareas archivadas')
+
+    def test_include_archived_merges_both_tables(self):
+        for index in range(8):
+            self.task(f'Activa {index}', index * 2, status='pending')
+        for index in range(8):
+            self.task(f'Archivada {index}', index * 2 + 1, completed_days_ago=40)
+        archive_completed_tasks(days=30)
+
+        response = self.client.get('/api/tasks/')
+        self.assertEqual(response.data['count'], 8)
+
+        response = self.client.get('/api/tasks/?include_archived=true')
+        self.assertEqual(response.data['count'], 16)
+        titles = [task['title'] for task in response.data['results']]
+        self.assertEqual(titles[:4], ['Activa 0', 'Archivada 0', 'Activa 1', 'Archivada 1'])
+        response = self.client.get('/api/tasks/?include_archived=true&page=2')
+        self.assertEqual([task['title'] for task in response.data['results']][-1], 'Archivada 7')
+
+        response = self.client.get('/api/tasks/by_status/?status=completed&include_archived=1')
+        self.assertEqual(len(response.data), 8)
+        # Sin el parámetro las acciones de detalle no ven las archivadas.
+        archived = ArchivedTask.objects.first()
+        self.assertEqual(self.client.get(f'/api/tasks/{archived.pk}/?include_archived=true').status_code, 404)
+
+    def test_combined_list_slicing(self):
+        for index in range(3):
+            self.task(f'Activa {index}', index * 2, status='pending')
+            self.task(f'Archivada {index}', index * 2 + 1, completed_days_ago=40)
+        archive_completed_tasks(days=30)
+        combined = CombinedTaskList(Task.objects.for_user(self.user), ArchivedTask.objects.for_user(self.user))
+
+        self.assertEqual(len(combined), 6)
+        self.assertEqual([task.title for task in combined[1:4]], ['Archivada 0', 'Activa 1', 'Archivada 1'])
+        self.assertEqual(combined[5].title, 'Archivada 2')
+        self.assertEqual([task.title for task in combined][0], 'Activa 0')
+
+
+class TimingWheelTests(TestCase):
+    """
+    Rueda de temporización de los recordatorios.
+    """
+    def test_schedule_cancel_and_advance(self):
+        wheel = TimingWheel(tick=1.0, slots=10, start=100.0)
+        self.assertTrue(wheel.schedule('a', 103.5, 'A'))
+        self.assertTrue(wheel.schedule('b', 105.0, 'B'))
+        self.assertTrue(wheel.schedule('c', 104.0, 'C'))
+        wheel.cancel('c')
+
+        self.assertEqual(wheel.advance(103.9), [('a', 'A')])
+        self.assertEqual(wheel.advance(104.9), [])
+        self.assertEqual(wheel.advance(120.0), [('b', 'B')])
+        self.assertEqual(len(wheel), 0)
+
+    def test_horizon_and_past_due(self):
+        wheel = TimingWheel(tick=1.0, slots=10, start=100.0)
+
+        self.assertFalse(wheel.schedule('lejos', 110.0, None))
+        self.assertTrue(wheel.schedule('vencida', 50.0, None))
+        self.assertEqual(wheel.advance(100.0), [('vencida', None)])
+
+
+class ListSink:
+    def __init__(self):
+        self.sent = []
+
+    def send(self, reminders):
+        self.sent.extend(reminders)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class ReminderSchedulerTests(TestCase):
+    """
+    Recordatorios de due_date: carga por ventanas, cambios y verificación.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='secreto123')
+        self.now = timezone.now().timestamp()
+        self.sink = ListSink()
+        self.scheduler = ReminderScheduler(self.now, sink=self.sink, tick=1.0, slots=60, lead=10.0)
+
+    def due(self, seconds):
+        return datetime.fromtimestamp(self.now + seconds, tz=dt_timezone.utc)
+
+    def test_reminder_fires_once_before_due_date(self):
+        task = Task.objects.create(user=self.user, title='Informe', due_date=self.due(30))
+        Task.objects.create(user=self.user, title='Lejana', due_date=self.due(3600))
+        self.assertEqual(self.scheduler.load_window(self.now), 1)
+
+        self.assertEqual(self.scheduler.tick(self.now + 15), [])
+        sent = self.scheduler.tick(self.now + 20)
+
+        self.assertEqual([reminder['task_id'] for reminder in sent], [task.pk])
+        self.assertEqual(self.sink.sent, sent)
+        # Editar otro campo no vuelve a programarlo.
+        task.title = 'Informe final'
+        task.save()
+        self.scheduler.refresh_changes(self.now + 21)
+        self.assertEqual(self.scheduler.tick(self.now + 29), [])
+
+    def test_completed_task_is_not_reminded(self):
+        task = Task.objects.create(user=self.user, title='Informe', due_date=self.due(30))
+        self.scheduler.load_window(self.now)
+        Task.objects.filter(pk=task.pk).update(status='completed')
+
+        self.assertEqual(self.scheduler.tick(self.now + 25), [])
+
+    def test_changed_due_date_is_rescheduled(self):
+        task = Task.objects.create(user=self.user, title='Informe', due_date=self.due(30))
+        self.scheduler.load_window(self.now)
+        task.due_date = self.due(40)
+        task.save()
+        new = Task.objects.create(user=self.user, title='Nueva', due_date=self.due(15))
+
+        self.assertEqual(self.scheduler.refresh_changes(self.now + 1), 2)
+        self.assertEqual([r['task_id'] for r in self.scheduler.tick(self.now + 20)], [new.pk])
+        self.assertEqual([r['task_id'] for r in self.scheduler.tick(self.now + 30)], [task.pk])
+
+    def test_restart_reminds_tasks_already_inside_the_lead(self):
+        soon = Task.objects.create(user=self.user, title='Ya casi', due_date=self.due(5))
+        later = Task.objects.create(user=self.user, title='Después', due_date=self.due(30))
+        Task.objects.create(user=self.user, title='Vencida', due_date=self.due(-5))
+        restarted = ReminderScheduler(self.now, sink=self.sink, tick=1.0, slots=60, lead=10.0)
+
+        self.assertEqual(restarted.load_window(self.now), 2)
+        self.assertEqual([r['task_id'] for r in restarted.tick(self.now)], [soon.pk])
+        self.assertEqual([r['task_id'] for r in restarted.tick(self.now + 20)], [later.pk])
+
+
+def failing_job(**payload):
+    raise RuntimeError('falla')
+
+
+@override_settings(DATABASE_REPLICAS=[], JOB_RETRY_BACKOFF=10)
+class JobQueueTests(TestCase):
+    """
+    Cola de trabajos: reclamo exclusivo, reintentos y visibility timeout.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='secreto123')
+
+    def test_claims_are_exclusive_with_and_without_skip_locked(self):
+        for skip_locked in (False, True):
+            Job.objects.all().delete()
+            for _ in range(3):
+                jobs.enqueue(jobs.archive_tasks)
+            features = 'django.db.backends.sqlite3.features.DatabaseFeatures'
+            with patch(f'{features}.has_select_for_update_skip_locked', skip_locked):
+                first = jobs.claim_jobs('w1', 2)
+                second = jobs.claim_jobs('w2', 2)
+
+            self.assertEqual(len(first), 2)
+            self.assertEqual(len(second), 1)
+            self.assertFalse({job.pk for job in first} & {job.pk for job in second})
+            self.assertEqual(first[0].attempts, 1)
+
+    def test_failed_job_is_retried_with_backoff_then_fails(self):
+        job = jobs.enqueue(failing_job, max_attempts=2)
+        worker = jobs.Worker(pool='sync', name='w1')
+
+        with self.assertLogs('tasks.jobs', 'ERROR'):
+            self.assertEqual(worker.run(once=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertIn('RuntimeError', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        with self.assertLogs('tasks.jobs', 'ERROR'):
+            worker.run(once=True)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 2))
+
+    def test_expired_lock_is_reclaimed_and_stale_worker_cannot_finish(self):
+        job = jobs.enqueue(jobs.archive_tasks)
+        [stale] = jobs.claim_jobs('w1', 1, timeout=60)
+        self.assertEqual(jobs.claim_jobs('w2', 1), [])
+
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now())
+        [retaken] = jobs.claim_jobs('w2', 1)
+
+        self.assertEqual(retaken.attempts, 2)
+        self.assertEqual(jobs.complete(stale, {}), 0)
+        self.assertEqual(jobs.complete(retaken, {'archived': 0}), 1)
+
+    def test_export_is_enqueued_and_downloadable(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+        Task.objects.create(user=self.user, title='Exportada')
+
+        response = client.post('/api/tasks-auth/tasks/export/')
+        self.assertEqual(response.status_code, 202)
+        job_url = f"/api/tasks-auth/jobs/{response.data['id']}/"
+        self.assertEqual(client.get(f'{job_url}download/').status_code, 409)
+
+        with self.settings(MEDIA_ROOT=tempfile.mkdtemp()):
+            jobs.Worker(pool='sync').run(once=True)
+            self.assertEqual(client.get(job_url).data['result']['tasks'], 1)
+            download = client.get(f'{job_url}download/')
+            content = b''.join(download.streaming_content)
+            download.close()
+
+        self.assertIn(b'"title": "Exportada"', content)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class TaskAdminTests(TestCase):
+    """
+    Changelist del admin de tareas sobre tablas grandes.
+    """
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='secreto123')
+        self.client.force_login(self.admin)
+        self.owners = [User.objects.create_user(username=f'dueño{index}') for index in range(3)]
+
+    def add_tasks(self, count):
+        for index in range(count):
+            Task.objects.create(user=self.owners[index % 3], title=f'Tarea {index}')
+
+    def changelist_queries(self, query=''):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(f'/admin/tasks/task/{query}')
+        self.assertEqual(response.status_code, 200)
+        return len(captured)
+
+    def test_changelist_queries_do_not_grow_with_rows(self):
+        self.add_tasks(3)
+        few = self.changelist_queries()
+        self.add_tasks(30)
+
+        self.assertEqual(self.changelist_queries(), few)
+        self.assertLessEqual(self.changelist_queries('?q=Tarea+1'), few)
+
+    def test_date_hierarchy_matches_distinct_dates(self):
+        for created_at in ('2024-12-31T23:30:00Z', '2025-01-01T00:10:00Z', '2025-03-15T12:00:00Z'):
+            task = Task.objects.create(user=self.owners[0], title='Fechada')
+            Task.objects.filter(pk=task.pk).update(created_at=created_at)
+        probe = DateProbeQuerySet(Task)
+
+        for kind in ('year', 'month', 'day'):
+            self.assertEqual(
+                probe.datetimes('created_at', kind), list(Task.objects.datetimes('created_at', kind))
+            )
+        self.assertEqual(self.changelist_queries('?created_at__year=2025'), self.changelist_queries())
+
+    def test_paginator_uses_estimate_on_unfiltered_tables(self):
+        self.add_tasks(3)
+        with patch('tasks.admin.estimate_rows', return_value=2_000_000), self.assertNumQueries(0):
+            self.assertEqual(EstimatedCountPaginator(Task.objects.all(), 100).count, 2_000_000)
+
+        paginator = EstimatedCountPaginator(Task.objects.filter(title__startswith='Tarea'), 100)
+        paginator.count_limit = 2
+        self.assertEqual(paginator.count, 2)
+
+
+@override_settings(TASK_SHARDS=SHARDS, DATABASE_REPLICAS=[])
+class ShardedTaskAdminTests(TestCase):
+    """
+    Admin de tareas con sharding: un shard por changelist.
+    """
+    databases = {'default', 'shard_1', 'shard_2'}
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_superuser(username='admin', password='secreto123'))
+        self.tasks = {}
+        while len(self.tasks) < 2:
+            user = User.objects.create_user(username=f'dueño{User.objects.count()}')
+            alias = shard_for_user(user.pk)
+            if alias in ('default', 'shard_1') and alias not in self.tasks:
+                self.tasks[alias] = Task.objects.create(user=user, title=f'En {alias}')
+
+    def changelist(self, query=''):
+        response = self.client.get(f'/admin/tasks/task/{query}')
+        self.assertEqual(response.status_code, 200)
+        return [task.title for task in response.context['cl'].result_list]
+
+    def test_changelist_lists_one_shard(self):
+        self.assertEqual(self.changelist(), ['En default'])
+        self.assertEqual(self.changelist('?shard=shard_1'), ['En shard_1'])
+        self.assertEqual(self.changelist('?shard=shard_2'), [])
+        self.assertEqual(self.client.get('/admin/tasks/task/?shard=otro').status_code, 302)
+
+    def test_search_by_username_without_auth_user_on_the_shard(self):
+        task = self.tasks['shard_1']
+        self.assertEqual(self.changelist(f'?shard=shard_1&q={task.user.username}'), ['En shard_1'])
+        self.assertEqual(self.changelist('?shard=shard_1&q=En'), ['En shard_1'])
+        self.assertEqual(self.changelist('?shard=shard_1&q=nadie'), [])
+
+    def test_change_view_finds_the_task_in_its_shard(self):
+        task = self.tasks['shard_1']
+        response = self.client.get(f'/admin/tasks/task/{task.pk}/change/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['original'], task)
+        self.assertIn('user', response.context['adminform'].readonly_fields)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class IdempotencyKeyTests(TestCase):
+    """
+    Reintentos con Idempotency-Key en las escrituras de tareas.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='secreto123')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+
+    def post(self, path, data, key='clave-1'):
+        return self.client.post(path, data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retried_create_replays_the_original_response(self):
+        first = self.post('/api/tasks-auth/tasks/', {'title': 'Una vez'})
+        # Autenticación y lectura de la clave: ni la vista ni Task.
+        with self.assertNumQueries(2):
+            retry = self.post('/api/tasks-auth/tasks/', {'title': 'Una vez'})
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(Task.objects.filter(title='Una vez').count(), 1)
+
+    def test_mark_completed_replay_and_key_reuse(self):
+        task = Task.objects.create(user=self.user, title='Tarea')
+        url = f'/api/tasks/{task.pk}/mark_completed/'
+        first = self.client.patch(url, HTTP_IDEMPOTENCY_KEY='completar')
+        Task.objects.filter(pk=task.pk).update(status='pending')
+
+        retry = self.client.patch(url, HTTP_IDEMPOTENCY_KEY='completar')
+        other = self.post('/api/tasks/', {'title': 'Otra'}, key='completar')
+
+        self.assertEqual(retry.content, first.content)
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'pending')
+        self.assertEqual(other.status_code, 422)
+
+    def test_in_progress_key_conflicts_until_its_lock_expires(self):
+        self.post('/api/tasks/', {'title': 'A'})
+        IdempotencyKey.objects.update(status_code=None)
+
+        self.assertEqual(self.post('/api/tasks/', {'title': 'A'}).status_code, 409)
+        IdempotencyKey.objects.update(expires_at=timezone.now())
+        self.assertEqual(self.post('/api/tasks/', {'title': 'A'}).status_code, 201)
+        self.assertEqual(Task.objects.filter(title='A').count(), 2)
+
+    def test_failed_request_releases_the_key(self):
+        with patch('tasks.views.TaskViewSet.perform_create', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.post('/api/tasks-auth/tasks/', {'title': 'Falla'})
+
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self.post('/api/tasks-auth/tasks/', {'title': 'Falla'}).status_code, 201)
+
+    def test_import_fingerprint_includes_the_file(self):
+        def upload(content):
+            return self.client.post(
+                '/api/tasks/import/', {'file': SimpleUploadedFile('tareas.csv', content)},
+                format='multipart', HTTP_IDEMPOTENCY_KEY='importar',
+            )
+
+        first = upload(b'title\nUna\n')
+        retry = upload(b'title\nUna\n')
+        other = upload(b'title\nOtra\n')
+
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(other.status_code, 422)
+        self.assertEqual(list(Task.objects.values_list('title', flat=True)), ['Una'])
+
+    def test_import_extends_its_lock_after_each_batch(self):
+        with patch('tasks.idempotency.extend') as extend, patch.object(TaskViewSet, 'import_batch_size', 1):
+            response = self.client.post(
+                '/api/tasks-auth/tasks/import/', {'file': SimpleUploadedFile('tareas.csv', b'title\nA\nB\nC\n')},
+                format='multipart', HTTP_IDEMPOTENCY_KEY='larga',
+            )
+        self.assertEqual(response.json()['created'], 3)
+        self.assertEqual(extend.call_count, 3)
+
+    @override_settings(IDEMPOTENCY_LOCK_SECONDS=60)
+    def test_extend_writes_only_past_half_the_lock(self):
+        now = timezone.now()
+        record = IdempotencyKey.objects.create(
+            user=self.user, key='larga', fingerprint='x', expires_at=now + timedelta(seconds=50),
+        )
+        with self.assertNumQueries(0):
+            idempotency.extend(record)
+
+        IdempotencyKey.objects.update(expires_at=now + timedelta(seconds=10))
+        record.refresh_from_db()
+        idempotency.extend(record)
+        record.refresh_from_db()
+        self.assertGreater(record.expires_at, now + timedelta(seconds=55))
+
+        # Caducó y otro reintento tomó la clave: no se prolonga la suya.
+        stale = IdempotencyKey(pk=record.pk, expires_at=now - timedelta(seconds=1))
+        idempotency.extend(stale)
+        self.assertEqual(IdempotencyKey.objects.get().expires_at, record.expires_at)
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class TaskImportTests(TestCase):
+    """
+    Importación de CSV y NDJSON: función, acción ``import`` y comando.
+    """
+    def setUp(self):
+        self.user = User.objects.create_user(username='ana', password='secreto123')
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+
+    def run_import(self, content, fmt, **kwargs):
+        return import_tasks(BytesIO(content.encode()), self.user, fmt, TaskSerializer, **kwargs)
+
+    def test_csv_rows_and_errors_by_line(self):
+        result = self.run_import(
+            'title,priority,status,due_date\n'
+            'Primera,high,,\n'
+            'Mala,urgente,,\n'
+            'Hecha,,completed,2030-01-01T10:00:00Z\n',
+            'csv',
+        )
+
+        self.assertEqual((result['created'], result['failed']), (2, 1))
+        self.assertEqual(result['errors'][0]['line'], 3)
+        self.assertIn('priority', result['errors'][0]['errors'])
+        first, done = Task.objects.filter(user=self.user).order_by('pk')
+        self.assertEqual((first.title, first.priority, first.due_date), ('Primera', 'high', None))
+        self.assertEqual(done.status, 'completed')
+        self.assertIsNotNone(done.completed_at)
+
+    def test_ndjson_rows_and_errors_by_line(self):
+        errors = []
+        result = self.run_import(
+            '{"title": "Una"}\n'
+            '\n'
+            '{"title": \n'
+            '["no", "objeto"]\n'
+            '{"description": "sin título"}\n'
+            '{"title": "Dos", "priority": "low"}\n',
+            'ndjson', on_error=lambda line, detail: errors.append(line),
+        )
+
+        self.assertEqual((result['created'], result['failed']), (2, 3))
+        self.assertEqual([error['line'] for error in result['errors']], [3, 4, 5])
+        self.assertEqual(errors, [3, 4, 5])
+        self.assertIn('JSON inválido', str(result['errors'][0]['errors']))
+        self.assertIn('title', result['errors'][2]['errors'])
+        self.assertEqual(
+            list(Task.objects.filter(user=self.user).order_by('pk').values_list('title', 'priority')),
+            [('Una', 'medium'), ('Dos', 'low')],
+        )
+
+    def test_chunks_cross_batch_boundaries(self):
+        rows = ''.join(f'{{"title": "Fila {index}"}}\n' for index in range(1, 6))
+        rows = rows.replace('"Fila 3"', '""')
+        with CaptureQueriesContext(connection) as queries:
+            result = self.run_import(rows, 'ndjson', batch_size=2)
+
+        inserts = [query['sql'] for query in queries if query['sql'].startswith('INSERT')]
+        # Lotes [1, 2], [3 (inválida), 4] y [5]: un INSERT por lote.
+        self.assertEqual(len(inserts), 3)
+        self.assertEqual((result['created'], result['failed']), (4, 1))
+        self.assertEqual(result['errors'][0]['line'], 3)
+        self.assertEqual(
+            list(Task.objects.filter(user=self.user).order_by('pk').values_list('title', flat=True)),
+            ['Fila 1', 'Fila 2', 'Fila 4', 'Fila 5'],
+        )
+
+    def test_import_action(self):
+        def upload(content, name='tareas.csv'):
+            return self.client.post(
+                '/api/tasks/import/', {'file': SimpleUploadedFile(name, content.encode())}, format='multipart'
+            )
+
+        created = upload('title\nDesde CSV\n')
+        self.assertEqual(created.status_code, 201)
+        self.assertEqual(created.json(), {'created': 1, 'failed': 0, 'errors': []})
+        self.assertEqual(upload('title,priority\nMala,urgente\n').status_code, 400)
+        self.assertEqual(upload('{}', name='tareas.txt').json(), {'error': 'format must be csv or ndjson'})
+        response = self.client.post('/api/tasks/import/', {}, format='multipart')
+        self.assertEqual(response.json(), {'error': 'file parameter required'})
+
+    def test_import_tasks_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'tareas.ndjson')
+            with open(path, 'w') as handle:
+                handle.write('{"title": "A"}\n{"title": "B", "status": "otro"}\n{"title": "C"}\n')
+            stdout, stderr = StringIO(), StringIO()
+            call_command('import_tasks', path, user='ana', batch_size=2, stdout=stdout, stderr=stderr)
+
+            self.assertIn('2 tareas importadas, 1 filas con errores', stdout.getvalue())
+            self.assertIn('línea 2: {"status"', stderr.getvalue())
+            self.assertEqual(Task.objects.filter(user=self.user).count(), 2)
+            with self.assertRaisesMessage(CommandError, 'No existe el usuario nadie.'):
+                call_command('import_tasks', path, user='nadie')
+            with self.assertRaisesMessage(CommandError, 'No se pudo deducir el formato'):
+                call_command('import_tasks', os.path.join(directory, 'tareas.txt'), user=str(self.user.pk))
+
+
+@override_settings(DATABASE_REPLICAS=[], ME_FROM_TOKEN=True)
+class ProfileClaimTests(TestCase):
+    """
+    users/me/ servido desde el claim de perfil del token.
+    """
+    def setUp(self):
+        cache.clear()
+        task_summaries.clear()
+        self.user = User.objects.create_user(username='ana', password='secreto123', first_name='Ana')
+        login = self.client.post(
+            '/api/tasks-auth/auth/login/', {'username': 'ana', 'password': 'secreto123'},
+            content_type='application/json',
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {login.data['access']}")
+
+    def test_me_is_served_from_the_claim(self):
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/users/me/')
+
+        self.assertEqual(response.data, {
+            'id': self.user.pk, 'username': 'ana', 'email': '', 'first_name': 'Ana', 'last_name': '',
+        })
+
+    def test_task_summary_is_cached_and_invalidated_by_writes(self):
+        Task.objects.create(user=self.user, title='Una')
+        with self.assertNumQueries(1):
+            self.client.get('/api/tasks-auth/users/me/')
+        with self.assertNumQueries(0):
+            first = self.client.get('/api/tasks-auth/users/me/')
+        self.client.patch(f'/api/tasks/{Task.objects.get().pk}/mark_completed/')
+
+        second = self.client.get('/api/tasks-auth/users/me/')
+
+        self.assertEqual(first.data['task_summary'], {'pending': 1, 'in_progress': 0, 'completed': 0, 'total': 1})
+        self.assertEqual(second.data['task_summary']['completed'], 1)
+        self.assertEqual(second.data['first_name'], 'Ana')
+
+    def test_profile_change_bumps_the_version(self):
+        self.user.first_name = 'Ana María'
+        self.user.save()
+
+        response = self.client.get('/api/users/me/')
+
+        self.assertEqual(response.data['first_name'], 'Ana María')
+        with self.assertNumQueries(1):
+            self.client.get('/api/users/me/')
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_deleted_user_is_rejected(self):
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        self.user.delete()
+
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+        self.assertEqual(self.client.get('/api/tasks-auth/users/me/').status_code, 401)
+
+
+new_usernames = (f'nuevo{index}' for index in count())
+
+
+def registration(context):
+    return {'username': next(new_usernames), 'email': 'nuevo@example.com', 'password': 'secreto123'}
+
+
+def csv_upload(context):
+    return {'file': SimpleUploadedFile('tareas.csv', b'title,priority\nA,high\nB,low\n', content_type='text/csv')}
+
+
+# Consultas: autenticación (1) + las del endpoint. Latencia: múltiplo de GET users/me/ de api,
+# con ~1.5x de margen sobre lo medido; los usuarios (UserDetailSerializer) y by_status/by_priority
+# serializan sin paginar las tareas de seed_0 (y users-list, las de todos).
+TASKS_BUDGETS = [
+    Budget('users-list', 'get', '/api/tasks-auth/users/', queries=4, latency=60),
+    Budget('users-retrieve', 'get', '/api/tasks-auth/users/{user}/', queries=3, latency=25),
+    Budget('users-me', 'get', '/api/tasks-auth/users/me/', queries=2, latency=25),
+    Budget('users-logout', 'post', '/api/tasks-auth/users/logout/', queries=1, latency=3),
+    Budget('tasks-list', 'get', '/api/tasks-auth/tasks/', queries=3, latency=4),
+    Budget('tasks-list-archived', 'get', '/api/tasks-auth/tasks/?include_archived=true', queries=5, latency=5),
+    Budget('tasks-create', 'post', '/api/tasks-auth/tasks/', queries=2, latency=3, data={'title': 'Nueva'}, status=201),
+    Budget('tasks-retrieve', 'get', '/api/tasks-auth/tasks/{task}/', queries=2, latency=3),
+    Budget('tasks-update', 'put', '/api/tasks-auth/tasks/{task}/', queries=3, latency=3, data={'title': 'Editada'}),
+    Budget('tasks-partial-update', 'patch', '/api/tasks-auth/tasks/{task}/', queries=3, latency=3, data={'priority': 'low'}),
+    Budget('tasks-by-status', 'get', '/api/tasks-auth/tasks/by_status/?status=pending', queries=2, latency=12),
+    Budget('tasks-by-priority', 'get', '/api/tasks-auth/tasks/by_priority/?priority=high', queries=2, latency=8),
+    Budget('tasks-mark-completed', 'patch', '/api/tasks-auth/tasks/{task}/mark_completed/', queries=3, latency=4),
+    Budget('tasks-reopen', 'patch', '/api/tasks-auth/tasks/{task}/reopen/', queries=3, latency=4),
+    Budget('tasks-start', 'patch', '/api/tasks-auth/tasks/{task}/start/', queries=3, latency=4),
+    Budget('tasks-transition', 'post', '/api/tasks-auth/tasks/transition/', queries=2, latency=3, data={
+        'transition': 'complete', 'priority': 'high',
+    }),
+    Budget('tasks-import', 'post', '/api/tasks-auth/tasks/import/', queries=4, data=csv_upload, status=201, format='multipart'),
+    Budget('tasks-destroy', 'delete', '/api/tasks-auth/tasks/{doomed}/', queries=3, status=204),
+    Budget('auth-register', 'post', '/api/tasks-auth/auth/register/', queries=3, latency=4, data=registration, status=201),
+    Budget('auth-login', 'post', '/api/tasks-auth/auth/login/', queries=1, latency=4, data={
+        'username': 'seed_0', 'password': 'seed-password',
+    }),
+    Budget('auth-refresh', 'post', '/api/tasks-auth/auth/refresh/', queries=1, latency=3, data=lambda context: {
+        'refresh': context['refresh'],
+    }),
+]
+
+
+
+class StartupTests(SimpleTestCase):
+    """
+    Arranque de los workers: drf-spectacular diferido y preload (config.preload).
+    """
+    def test_extra_actions_match_drf(self):
+        for viewset in (TaskViewSet, UserViewSet, JobViewSet, api_views.TaskViewSet, api_views.UserViewSet):
+            with self.subTest(viewset=f'{viewset.__module__}.{viewset.__name__}'):
+                # La implementación de DRF (con getmembers) sobre la misma clase.
+                expected = ViewSetMixin.get_extra_actions.__func__(viewset)
+                self.assertEqual(viewset.get_extra_actions(), expected)
+
+    def test_urlconf_does_not_load_schema_tooling(self):
+        code = (
+            'import sys, django; django.setup()\n'
+            'from config.preload import warm_up; warm_up()\n'
+            'print(sorted(name for name in sys.modules if name.startswith("drf_spectacular")))'
+        )
+        result = subprocess.run(
+            [sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=settings.BASE_DIR,
+            env={**os.environ, 'DJANGO_SETTINGS_MODULE': 'config.test_settings'},
+        )
+        self.assertEqual(result.stdout.strip(), "['drf_spectacular', 'drf_spectacular.apps', 'drf_spectacular.checks']")
+
+    def test_docs_views_load_on_first_request(self):
+        self.assertEqual(self.client.get('/swagger/').status_code, 200)
+        from drf_spectacular.drainage import GENERATOR_STATS
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(SCHEMA_CACHE_DIR=directory):
+            with GENERATOR_STATS.silence():
+                response = self.client.get('/api/schema/?format=json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/api/tasks-auth/tasks/', json.loads(response.content)['paths'])
+
+    def test_fork_hooks(self):
+        self.addCleanup(gc.enable)
+        self.addCleanup(gc.unfreeze)
+        gc.disable()
+        before_fork()
+        self.assertGreater(gc.get_freeze_count(), 0)
+        # El maestro no se queda con el GC desactivado.
+        self.assertTrue(gc.isenabled())
+        gc.disable()
+        after_fork()
+        self.assertTrue(gc.isenabled())
+
+
+class SchemaDocsTests(SimpleTestCase):
+    """
+    Esquema precalculado: ETag y 304, negociación de gzip e invalidación por versión.
+    """
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.enterContext(override_settings(SCHEMA_CACHE_DIR=self.directory, CODE_VERSION='v1'))
+        code_version.cache_clear()
+        self.addCleanup(code_version.cache_clear)
+        # Sin esquemas en memoria de otros tests con las mismas versiones.
+        schema_cache._rendered.clear()
+        self.addCleanup(schema_cache._rendered.clear)
+
+    def store(self, version, fmt, content):
+        with open(os.path.join(self.directory, f'openapi-{version}.{fmt}'), 'wb') as handle:
+            handle.write(content)
+
+    def test_etag_and_not_modified(self):
+        self.store('v1', 'json', b'{"openapi": "v1"}')
+        response = self.client.get('/api/schema/?format=json')
+        self.assertEqual(response.content, b'{"openapi": "v1"}')
+        self.assertEqual(response['Cache-Control'], 'public, max-age=0, must-revalidate')
+        etag = response['ETag']
+
+        response = self.client.get('/api/schema/?format=json', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        response = self.client.get('/api/schema/?format=json', HTTP_IF_NONE_MATCH='"otro"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_gzip_follows_accept_encoding(self):
+        self.store('v1', 'json', b'{"openapi": "v1"}')
+        for header, compressed in (
+            ('gzip, deflate, br', True),
+            ('br;q=1.0, gzip;q=0.5', True),
+            ('*', True),
+            ('gzip;q=0', False),
+            ('gzip;q=0.000, *;q=1', False),
+            ('identity', False),
+            ('', False),
+        ):
+            with self.subTest(header=header):
+                response = self.client.get('/api/schema/?format=json', HTTP_ACCEPT_ENCODING=header)
+                self.assertEqual(response.has_header('Content-Encoding'), compressed)
+                body = gzip.decompress(response.content) if compressed else response.content
+                self.assertEqual(body, b'{"openapi": "v1"}')
+                self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_new_code_version_regenerates_and_drops_stale_files(self):
+        from drf_spectacular.drainage import GENERATOR_STATS
+
+        self.store('v1', 'json', b'{"openapi": "v1"}')
+        self.assertEqual(schema_cache.get('json').content, b'{"openapi": "v1"}')
+        self.assertIsNone(schema_cache.load('yaml'))
+
+        with override_settings(CODE_VERSION='v2'):
+            code_version.cache_clear()
+            with GENERATOR_STATS.silence():
+                response = self.client.get('/api/schema/?format=json')
+            self.assertIn('/api/tasks/', json.loads(response.content)['paths'])
+            self.assertEqual(sorted(os.listdir(self.directory)), ['openapi-v2.json', 'openapi-v2.yaml'])
+            self.assertEqual(schema_cache.load('json'), response.content)
+
+            out = StringIO()
+            call_command('generate_schema', '--if-missing', stdout=out)
+            self.assertEqual(out.getvalue(), 'El esquema de la versión v2 ya existe.\n')
+
+
+@override_settings(DATABASE_REPLICAS=[])
+class TasksPerformanceBudgetTests(EndpointBudgetMixin, TestCase):
+    """
+    Presupuestos de consultas y latencia de la app tasks y de la autenticación
+    sobre datos de seed_data.
+    """
+    baseline = Budget('baseline', 'get', '/api/users/me/', queries=1)
+
+    @classmethod
+    def setUpTestData(cls):
+        seed()
+        # seed_0 es uno de los usuarios "ballena" (cientos de tareas).
+        cls.user = User.objects.get(username='seed_0')
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}'
+        )
+
+    def test_endpoints_within_budget(self):
+        context = {
+            'user': self.user.pk,
+            'task': Task.objects.create(user=self.user, title='Objetivo').pk,
+            'doomed': Task.objects.create(user=self.user, title='A borrar').pk,
+            'refresh': str(RefreshToken.for_user(self.user)),
+        }
+        self.assertBudgets(TASKS_BUDGETS, self.client, context)
@@ -0,0 +1,112 @@
+"""
+Transiciones de estado de las tareas en una sola sentencia.
+
+``apply_transition`` ejecuta un ``UPDATE ... WHERE <filtros> AND status IN
+(<origen>)``: solo cambian las tareas que estaban en un estado válido, sin
+leerlas antes, y la base de datos resuelve las carreras entre peticiones.
+Solo se escriben ``status``, ``completed_at`` y ``updated_at``. En SQLite y
+PostgreSQL el mismo ``UPDATE`` retorna las filas con ``RETURNING``; en MySQL
+y MariaDB, que no lo admiten en ``UPDATE``, se leen antes los pks y después
+se releen las filas que cambió.
+"""
+
+from django.db import connections, router, transaction
+from django.db.models.sql import UpdateQuery
+from django.utils import timezone
+
+from .claims import task_summaries
+from .models import Task
+
+
+# transición -> (estado destino, estados de origen permitidos)
+TRANSITIONS = {
+    'complete': ('completed', ('pending', 'in_progress')),
+    'start': ('in_progress', ('pending',)),
+    'reopen': ('pending', ('completed', 'in_progress')),
+}
+
+
+def supports_update_returning(connection):
+    """``UPDATE ... RETURNING``: PostgreSQL y SQLite >= 3.35 (no MySQL ni MariaDB)."""
+    if connection.vendor == 'postgresql':
+        return True
+    if connection.vendor == 'sqlite':
+        return connection.Database.sqlite_version_info >= (3, 35)
+    return False
+
+
+def _update_values(target, now):
+    return {
+        'status': target,
+        'completed_at': now if target == 'completed' else None,
+        # update() no aplica auto_now.
+        'updated_at': now,
+    }
+
+
+def _update_returning(queryset, values, using):
+    """Un solo ``UPDATE ... RETURNING`` construido con el compilador de Django."""
+    connection = connections[using]
+    query = queryset.query.chain(UpdateQuery)
+    query.add_update_values(values)
+    query.clear_select_clause()
+    query.clear_ordering(force=True)
+    compiler = query.get_compiler(using)
+    sql, params = compiler.as_sql()
+
+    fields = Task._meta.local_concrete_fields
+    returning, returning_params = connection.ops.return_insert_columns(fields)
+    with connection.cursor() as cursor:
+        cursor.execute(f'{sql} {returning}', (*params, *returning_params))
+        rows = cursor.fetchall()
+
+    # Mismas conversiones que al leer (p. ej. fechas de SQLite).
+    columns = [field.get_col(Task._meta.db_table) for field in fields]
+    converters = compiler.get_converters(columns)
+    if converters:
+        rows = compiler.apply_converters(rows, converters)
+    names = [field.attname for field in fields]
+    return [Task.from_db(using, names, row) for row in rows]
+
+
+def _update_then_select(queryset, sources, values, using):
+    """
+    Sin RETURNING: leer los pks de las tareas que admiten la transición, el
+    mismo ``UPDATE`` condicional sobre ellos y releer las que quedaron con el
+    estado y el ``updated_at`` que acaba de escribir.
+
+    La relectura no reutiliza ``queryset``: un filtro ``status`` del llamador
+    (la acción ``transition``) ya no se cumpliría tras el ``UPDATE``.
+    """
+    pks = list(queryset.using(using).filter(status__in=sources).values_list('pk', flat=True))
+    if not pks:
+        return []
+    tasks = Task.objects.using(using).filter(pk__in=pks)
+    if not tasks.filter(status__in=sources).update(**values):
+        return []
+    return list(tasks.filter(status=values['status'], updated_at=values['updated_at']))
+
+
+def apply_transition(queryset, transition, user=None):
+    """
+    Aplicar ``transition`` a las tareas de ``queryset`` que la admitan.
+
+    Retorna las tareas modificadas, ya con su nuevo estado. ``user`` (el
+    dueño de las tareas) se asigna a ``task.user`` para no consultarlo.
+    """
+    target, sources = TRANSITIONS[transition]
+    using = queryset._db or router.db_for_write(Task, **queryset._hints)
+    values = _update_values(target, timezone.now())
+
+    if supports_update_returning(connections[using]):
+        with transaction.mark_for_rollback_on_error(using=using):
+            tasks = _update_returning(queryset.filter(status__in=sources), values, using)
+    else:
+        tasks = _update_then_select(queryset, sources, values, using)
+
+    for user_id in {task.user_id for task in tasks}:
+        task_summaries.invalidate(user_id)
+    if user is not None:
+        for task in tasks:
+            task.user = user
+    return sorted(tasks, key=lambda task: task.pk)
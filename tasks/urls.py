@@ -4,7 +4,8 @@ from .views import (
     RegisterView,
     CustomTokenObtainPairView,
     UserViewSet,
-    TaskViewSet
+    TaskViewSet,
+    JobViewSet
 )
 from rest_framework_simplejwt.views import TokenRefreshView
 
@@ -12,6 +13,7 @@ from rest_framework_simplejwt.views import TokenRefreshView
 router = DefaultRouter()
 router.register(r'users', UserViewSet, basename='user')
 router.register(r'tasks', TaskViewSet, basename='task')
+router.register(r'jobs', JobViewSet, basename='job')
 
 app_name = 'tasks'
 
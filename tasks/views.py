@@ -3,16 +3,24 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from django.contrib.auth.models import User
-from .models import Task
+from django.core.files.storage import default_storage
+from django.http import FileResponse
+from config.db_routers import pin_request_user
+from .claims import ProfileRefreshToken
+from .mixins import TaskExportMixin
+from .models import Job, Task
+from .sharding import prefetch_user_tasks
 from .serializers import (
     UserSerializer,
     UserDetailSerializer,
     TaskSerializer,
     TaskUpdateSerializer,
-    TaskListSerializer
+    TaskListSerializer,
+    JobSerializer
 )
+from .viewsets import BaseTaskViewSet, BaseUserViewSet, LazySchemaMixin
 
 
 class RegisterView(generics.CreateAPIView):
@@ -30,9 +38,10 @@ class RegisterView(generics.CreateAPIView):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user = serializer.save()
+        pin_request_user(user.pk)
         
-        # Generar tokens JWT
-        refresh = RefreshToken.for_user(user)
+        # Generar tokens JWT (con el claim de perfil)
+        refresh = ProfileRefreshToken.for_user(user)
         
         return Response({
             'message': 'Usuario registrado exitosamente',
@@ -52,30 +61,36 @@ class CustomTokenObtainPairView(TokenObtainPairView):
         """
         Obtener tokens con información adicional del usuario.
         """
-        response = super().post(request, *args, **kwargs)
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
         
-        if response.status_code == 200:
-            user = User.objects.get(username=request.data.get('username'))
-            response.data['user'] = UserSerializer(user).data
+        pin_request_user(serializer.user.pk)
         
-        return response
+        # El serializador ya cargó el usuario al autenticar: no volver a consultarlo.
+        data = dict(serializer.validated_data)
+        data['user'] = UserSerializer(serializer.user).data
+        return Response(data, status=status.HTTP_200_OK)
 
 
-class UserViewSet(viewsets.ReadOnlyModelViewSet):
+class UserViewSet(BaseUserViewSet):
     """
     ViewSet para obtener información de usuarios.
     """
-    queryset = User.objects.all()
     serializer_class = UserDetailSerializer
-    permission_classes = [IsAuthenticated]
+    # Con ME_FROM_TOKEN, ``me`` incluye el recuento de tareas por estado.
+    me_task_summary = True
     
-    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
-    def me(self, request):
+    def paginate_queryset(self, queryset):
         """
-        Obtener información del usuario autenticado.
+        Cargar las tareas de toda la página de una vez (una consulta por shard).
         """
-        serializer = self.get_serializer(request.user)
-        return Response(serializer.data)
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            prefetch_user_tasks(page)
+        return page
     
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
     def logout(self, request):
@@ -88,76 +103,48 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         )
 
 
-class TaskViewSet(viewsets.ModelViewSet):
+class TaskViewSet(TaskExportMixin, BaseTaskViewSet):
     """
     ViewSet para gestionar tareas.
     Permite crear, listar, actualizar y eliminar tareas.
     """
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
+    # Serializadores según la acción
+    action_serializers = {
+        'list': TaskListSerializer,
+        'update': TaskUpdateSerializer,
+        'partial_update': TaskUpdateSerializer,
+    }
+    filter_errors = {
+        'status': 'Status parameter is required',
+        'priority': 'Priority parameter is required',
+    }
+
+
+class JobViewSet(LazySchemaMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet para consultar los trabajos en segundo plano del usuario.
+    """
+    serializer_class = JobSerializer
     permission_classes = [IsAuthenticated]
     
     def get_queryset(self):
         """
-        Retornar solo las tareas del usuario autenticado.
-        """
-        return Task.objects.filter(user=self.request.user)
-    
-    def get_serializer_class(self):
-        """
-        Usar diferentes serializadores según la acción.
-        """
-        if self.action == 'list':
-            return TaskListSerializer
-        elif self.action in ['update', 'partial_update']:
-            return TaskUpdateSerializer
-        return TaskSerializer
-    
-    def perform_create(self, serializer):
-        """
-        Asignar el usuario actual a la tarea creada.
+        Retornar solo los trabajos del usuario autenticado.
         """
-        serializer.save(user=self.request.user)
+        return Job.objects.filter(user=self.request.user)
     
-    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
-    def by_status(self, request):
-        """
-        Filtrar tareas por estado.
-        Query param: ?status=pending
-        """
-        status_filter = request.query_params.get('status')
-        if status_filter:
-            queryset = self.get_queryset().filter(status=status_filter)
-            serializer = self.get_serializer(queryset, many=True)
-            return Response(serializer.data)
-        return Response(
-            {'error': 'Status parameter is required'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
-    def by_priority(self, request):
-        """
-        Filtrar tareas por prioridad.
-        Query param: ?priority=high
-        """
-        priority_filter = request.query_params.get('priority')
-        if priority_filter:
-            queryset = self.get_queryset().filter(priority=priority_filter)
-            serializer = self.get_serializer(queryset, many=True)
-            return Response(serializer.data)
-        return Response(
-            {'error': 'Priority parameter is required'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-    
-    @action(detail=True, methods=['patch'], permission_classes=[IsAuthenticated])
-    def mark_completed(self, request, pk=None):
-        """
-        Marcar una tarea como completada.
-        """
-        task = self.get_object()
-        task.status = 'completed'
-        task.save()
-        serializer = self.get_serializer(task)
-        return Response(serializer.data)
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated])
+    def download(self, request, pk=None):
+        """
+        Descargar el archivo generado por un trabajo terminado (p. ej. export).
+        """
+        job = self.get_object()
+        path = (job.result or {}).get('path') if job.status == 'done' else None
+        if not path:
+            return Response(
+                {'error': f'job has no file (status {job.status})'},
+                status=status.HTTP_409_CONFLICT
+            )
+        return FileResponse(default_storage.open(path, 'rb'), as_attachment=True)
@@ -0,0 +1,123 @@
+"""
+ViewSets base de tareas y usuarios, compartidos por ``/api/`` y ``/api/tasks-auth/``.
+
+Las consultas, los filtros y las acciones viven aquí una sola vez; cada
+montaje (api.views, tasks.views) solo elige sus serializadores, sus mensajes
+de error y las acciones extra que expone.
+"""
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from rest_framework import status, viewsets
+from rest_framework.decorators import MethodMapper, action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .authentication import ProfileClaimJWTAuthentication
+from .claims import me_data, task_summaries
+from .mixins import IdempotencyMixin, IncludeArchivedMixin, TaskImportMixin, TaskTransitionMixin
+from .models import Task
+
+
+class LazySchemaMixin:
+    """
+    ``get_extra_actions`` sin ``inspect.getmembers()``.
+
+    El router lo llama al construir las URLs, y ``getmembers`` lee todos los
+    atributos de la clase, también el descriptor ``schema`` de DRF, que
+    importa ``DEFAULT_SCHEMA_CLASS`` (drf-spectacular). Leyendo el ``__dict__``
+    de cada clase, drf-spectacular solo se carga al generar el esquema.
+    """
+    @classmethod
+    def get_extra_actions(cls):
+        members = {}
+        for klass in reversed(cls.__mro__):
+            members.update(vars(klass))
+        # Las mismas comprobaciones que ViewSetMixin.get_extra_actions.
+        actions = []
+        for name, method in sorted(members.items()):
+            if not (hasattr(method, 'mapping') and isinstance(method.mapping, MethodMapper)):
+                continue
+            assert method.__name__ == name, (
+                f'Expected function (`{method.__name__}`) to match its attribute name (`{name}`).'
+            )
+            actions.append(method)
+        return actions
+
+
+class BaseUserViewSet(LazySchemaMixin, viewsets.ReadOnlyModelViewSet):
+    """
+    Usuarios de solo lectura y ``me``.
+
+    ``me_task_summary``: con ME_FROM_TOKEN, añadir el recuento de tareas por estado.
+    """
+    queryset = User.objects.all()
+    permission_classes = [IsAuthenticated]
+    me_task_summary = False
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+            authentication_classes=[ProfileClaimJWTAuthentication])
+    def me(self, request):
+        """Obtener información del usuario autenticado (con ME_FROM_TOKEN, del token)."""
+        if settings.ME_FROM_TOKEN:
+            data = me_data(request.user)
+            if self.me_task_summary:
+                data['task_summary'] = task_summaries.get(data['id'])
+            return Response(data)
+        serializer = self.get_serializer(request.user)
+        return Response(serializer.data)
+
+
+class BaseTaskViewSet(LazySchemaMixin, IdempotencyMixin, IncludeArchivedMixin, TaskImportMixin,
+                      TaskTransitionMixin, viewsets.ModelViewSet):
+    """
+    CRUD de las tareas del usuario autenticado, con filtros por estado y prioridad.
+
+    - ``action_serializers``: serializador por acción; el resto usa ``serializer_class``.
+    - ``filter_errors``: mensaje de error de ``by_<campo>`` sin el parámetro.
+    """
+    permission_classes = [IsAuthenticated]
+    action_serializers = {}
+    filter_errors = {
+        'status': 'status parameter required',
+        'priority': 'priority parameter required',
+    }
+
+    def get_queryset(self):
+        """Retornar solo las tareas del usuario autenticado."""
+        return Task.objects.for_user(self.request.user)
+
+    def get_serializer_class(self):
+        return self.action_serializers.get(self.action, self.serializer_class)
+
+    def perform_create(self, serializer):
+        """Asignar el usuario autenticado como propietario de la tarea."""
+        serializer.save(user=self.request.user)
+
+    def filter_by(self, request, field):
+        """Tareas (y archivadas, si se piden) con ``field`` igual al query param."""
+        value = request.query_params.get(field)
+        if not value:
+            return Response(
+                {'error': self.filter_errors[field]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        queryset = self.with_archived(self.get_queryset().filter(**{field: value}), **{field: value})
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def by_status(self, request):
+        """
+        Filtrar tareas por estado.
+        Query param: ?status=pending
+        """
+        return self.filter_by(request, 'status')
+
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
+    def by_priority(self, request):
+        """
+        Filtrar tareas por prioridad.
+        Query param: ?priority=high
+        """
+        return self.filter_by(request, 'priority')